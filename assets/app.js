@@ -0,0 +1,345 @@
+// Generate particles for background
+function createParticles() {
+    const particlesContainer = document.querySelector('.particles');
+    const particleCount = 50;
+
+    for (let i = 0; i < particleCount; i++) {
+        const particle = document.createElement('div');
+        particle.className = 'particle';
+
+        // Random size and position
+        const size = Math.random() * 4 + 1;
+        const posX = Math.random() * 100;
+        const posY = Math.random() * 100;
+        const delay = Math.random() * 20;
+        const duration = 15 + Math.random() * 20;
+
+        particle.style.width = size + 'px';
+        particle.style.height = size + 'px';
+        particle.style.left = posX + '%';
+        particle.style.top = posY + '%';
+        particle.style.animationDelay = delay + 's';
+        particle.style.animationDuration = duration + 's';
+
+        // Random color
+        const colors = [
+            'rgba(67, 97, 238, 0.3)',
+            'rgba(6, 214, 160, 0.3)',
+            'rgba(255, 209, 102, 0.3)',
+            'rgba(239, 71, 111, 0.3)'
+        ];
+        particle.style.background = colors[Math.floor(Math.random() * colors.length)];
+
+        particlesContainer.appendChild(particle);
+    }
+}
+
+// Notification System
+function showNotification(type, title, message, duration = 5000) {
+    const container = document.getElementById('notificationContainer');
+    const notification = document.createElement('div');
+    notification.className = 'notification ' + type;
+
+    const icons = {
+        success: 'fas fa-check-circle',
+        warning: 'fas fa-exclamation-triangle',
+        error: 'fas fa-times-circle',
+        info: 'fas fa-info-circle'
+    };
+
+    notification.innerHTML = `
+        <div class="notification-icon">
+            <i class="${icons[type]}"></i>
+        </div>
+        <div class="notification-content">
+            <div class="notification-title">${title}</div>
+            <div class="notification-message">${message}</div>
+        </div>
+        <button class="notification-close" onclick="this.parentElement.remove()">
+            <i class="fas fa-times"></i>
+        </button>
+    `;
+
+    container.appendChild(notification);
+
+    // Auto remove after duration
+    setTimeout(() => {
+        if (notification.parentNode === container) {
+            notification.style.animation = 'slideInRight 0.3s ease-out reverse';
+            setTimeout(() => notification.remove(), 300);
+        }
+    }, duration);
+}
+
+// Chat functionality
+function setupChat() {
+    const chatMessages = document.querySelector('.chat-messages');
+    if (chatMessages) {
+        chatMessages.scrollTop = chatMessages.scrollHeight;
+
+        // Auto resize textareas
+        const textareas = document.querySelectorAll('textarea');
+        textareas.forEach(textarea => {
+            textarea.addEventListener('input', function() {
+                this.style.height = 'auto';
+                this.style.height = (this.scrollHeight) + 'px';
+            });
+        });
+
+        // Smooth scroll to bottom on new messages
+        const observer = new MutationObserver(() => {
+            chatMessages.scrollTo({
+                top: chatMessages.scrollHeight,
+                behavior: 'smooth'
+            });
+        });
+
+        observer.observe(chatMessages, { childList: true });
+    }
+}
+
+// Live order chat: new messages arrive over Server-Sent Events and are sent
+// as JSON, so the page never reloads. Without EventSource the form posts as before.
+function setupLiveChat() {
+    const area = document.querySelector('[data-chat-order]');
+    if (!area || !window.EventSource || !window.fetch) return;
+    const order = encodeURIComponent(area.dataset.chatOrder);
+
+    function lastMessageId() {
+        const ids = Array.from(area.querySelectorAll('[data-message-id]')).map(el => Number(el.dataset.messageId));
+        return ids.length ? Math.max(...ids) : 0;
+    }
+
+    function appendMessage(message) {
+        if (area.querySelector('[data-message-id="' + message.id + '"]')) return;
+        const empty = area.querySelector('[data-chat-empty]');
+        if (empty) empty.remove();
+        const div = document.createElement('div');
+        div.className = 'chat-message ' + (message.sender === 'user' ? 'user-message' : 'bot-message');
+        div.dataset.messageId = message.id;
+        const meta = document.createElement('small');
+        meta.className = 'text-muted';
+        meta.textContent = (message.sender === 'user' ? area.dataset.userLabel : area.dataset.adminLabel) + ' • ' + message.created;
+        const text = document.createElement('p');
+        text.className = 'mb-0';
+        text.textContent = message.message;
+        div.append(meta, text);
+        area.appendChild(div);
+        area.scrollTo({ top: area.scrollHeight, behavior: 'smooth' });
+    }
+
+    // The browser reconnects on its own, resuming after the last event id it saw
+    const source = new EventSource('/chat/' + order + '/events?after=' + lastMessageId());
+    source.addEventListener('message', event => appendMessage(JSON.parse(event.data)));
+
+    const form = document.querySelector('[data-chat-form]');
+    if (!form) return;
+    form.addEventListener('submit', async function(e) {
+        e.preventDefault();
+        const input = this.querySelector('[name=message]');
+        const text = input.value.trim();
+        if (!text) return;
+        input.disabled = true;
+        try {
+            const response = await fetch('/chat/' + order + '/messages', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ message: text })
+            });
+            const message = await response.json();
+            if (!message.success) throw new Error(message.error);
+            appendMessage(message);
+            input.value = '';
+        } catch (error) {
+            showNotification('error', 'Message Not Sent', error.message);
+        } finally {
+            input.disabled = false;
+            input.focus();
+        }
+    });
+}
+
+// Form validation with notifications
+function setupFormValidation() {
+    const forms = document.querySelectorAll('form:not([data-chat-form])');  // chat sends report their own errors
+    forms.forEach(form => {
+        form.addEventListener('submit', function(e) {
+            const requiredFields = this.querySelectorAll('[required]');
+            let isValid = true;
+
+            requiredFields.forEach(field => {
+                if (!field.value.trim()) {
+                    isValid = false;
+                    field.classList.add('is-invalid');
+
+                    // Add error styling
+                    const errorMsg = document.createElement('div');
+                    errorMsg.className = 'invalid-feedback';
+                    errorMsg.textContent = 'This field is required';
+
+                    if (!field.nextElementSibling || !field.nextElementSibling.classList.contains('invalid-feedback')) {
+                        field.parentNode.insertBefore(errorMsg, field.nextSibling);
+                    }
+
+                    // Show notification
+                    showNotification('error', 'Validation Error', 'Please fill in all required fields');
+                } else {
+                    field.classList.remove('is-invalid');
+                    const errorMsg = field.nextElementSibling;
+                    if (errorMsg && errorMsg.classList.contains('invalid-feedback')) {
+                        errorMsg.remove();
+                    }
+                }
+            });
+
+            if (!isValid) {
+                e.preventDefault();
+                return false;
+            }
+
+            // Show success notification
+            showNotification('success', 'Success', 'Form submitted successfully');
+        });
+    });
+}
+
+// Initialize animations
+function initAnimations() {
+    // Animate elements on scroll
+    const observerOptions = {
+        threshold: 0.1,
+        rootMargin: '0px 0px -50px 0px'
+    };
+
+    const observer = new IntersectionObserver((entries) => {
+        entries.forEach(entry => {
+            if (entry.isIntersecting) {
+                entry.target.classList.add('animate-slide-up');
+            }
+        });
+    }, observerOptions);
+
+    // Observe all cards and sections
+    document.querySelectorAll('.template-card, .card, section').forEach(el => {
+        observer.observe(el);
+    });
+}
+
+// Fix for iOS scroll
+function fixIOSScroll() {
+    if (/iPad|iPhone|iPod/.test(navigator.userAgent)) {
+        document.body.style.height = '100%';
+        document.body.style.overflow = 'auto';
+        document.body.style.webkitOverflowScrolling = 'touch';
+    }
+}
+
+// Disable zooming for mobile
+document.addEventListener('wheel', function(e) {
+    if (e.ctrlKey) {
+        e.preventDefault();
+    }
+}, { passive: false });
+
+document.addEventListener('keydown', function(e) {
+    if (e.ctrlKey && (e.key === '+' || e.key === '-' || e.key === '0')) {
+        e.preventDefault();
+    }
+});
+
+document.addEventListener('touchstart', function(e) {
+    if (e.touches.length > 1) {
+        e.preventDefault();
+    }
+}, { passive: false });
+
+let lastTouchEnd = 0;
+document.addEventListener('touchend', function(e) {
+    const now = (new Date()).getTime();
+    if (now - lastTouchEnd <= 300) {
+        e.preventDefault();
+    }
+    lastTouchEnd = now;
+}, false);
+
+// Prevent double tap zoom
+document.addEventListener('dblclick', function(e) {
+    e.preventDefault();
+}, { passive: false });
+
+// Fab button functionality
+const fab = document.querySelector('.fab');
+if (fab) {
+    fab.addEventListener('click', function() {
+        const navItems = document.querySelectorAll('.nav-item');
+        const currentPath = window.location.pathname;
+        let targetUrl = '/dashboard';
+
+        navItems.forEach(item => {
+            if (item.classList.contains('active')) {
+                const href = item.getAttribute('href');
+                if (href !== currentPath) {
+                    targetUrl = href;
+                }
+            }
+        });
+
+        window.location.href = targetUrl;
+    });
+}
+
+// Login prompt function
+function showLoginPrompt() {
+    showNotification('info', 'Login Required', 'Please login to access this feature', 3000);
+}
+
+// Check if user is logged in for protected actions
+document.addEventListener('click', function(e) {
+    const target = e.target;
+    const protectedActions = ['/order-template/', '/custom-web', '/orders', '/account'];
+    const isProtected = protectedActions.some(action => 
+        target.href && target.href.includes(action) || 
+        target.closest('a') && target.closest('a').href && target.closest('a').href.includes(action)
+    );
+
+    if (!document.body.dataset.authenticated && isProtected && !window.location.pathname.startsWith('/login') && !window.location.pathname.startsWith('/signup')) {
+        e.preventDefault();
+        showLoginPrompt();
+    }
+});
+
+// Preview website function
+function previewWebsite(url) {
+    if (url) {
+        window.open(url, '_blank');
+    } else {
+        showNotification('info', 'Preview', 'No preview URL available for this template');
+    }
+}
+
+// Initialize everything when DOM is loaded
+document.addEventListener('DOMContentLoaded', function() {
+    createParticles();
+    setupChat();
+    setupLiveChat();
+    setupFormValidation();
+    initAnimations();
+    fixIOSScroll();
+
+    // Adjust chat input height
+    const chatInputs = document.querySelectorAll('.chat-input');
+    chatInputs.forEach(input => {
+        input.style.height = 'auto';
+        input.style.height = (input.scrollHeight) + 'px';
+    });
+
+    // Fix for iOS keyboard
+    if (/iPad|iPhone|iPod/.test(navigator.userAgent)) {
+        const inputs = document.querySelectorAll('input, textarea');
+        inputs.forEach(input => {
+            input.addEventListener('focus', function() {
+                window.scrollTo(0, this.offsetTop - 100);
+            });
+        });
+    }
+});
@@ -0,0 +1,58 @@
+"""
+Time to first byte, total time and peak Python memory for a website download
+built the old way (zip written to disk, then sent) versus streamed with
+stream_zip(), for a generated site of the given size.
+
+Usage: python benchmarks/bench_archive.py [site MB]
+"""
+import os, sys, tempfile, time, tracemalloc, zipfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.chdir(tempfile.mkdtemp())  # main creates its database and folders in the cwd
+import main
+
+def make_site(folder, megabytes):
+    """Half text (compressible), half images (already compressed)"""
+    os.makedirs(os.path.join(folder, "img"))
+    for i in range(megabytes):
+        if i % 2:
+            with open(os.path.join(folder, "img", f"photo{i}.jpg"), "wb") as f:
+                f.write(os.urandom(1024 * 1024))
+        else:
+            with open(os.path.join(folder, f"page{i}.html"), "w") as f:
+                f.write(f"<p>Section {i} of the generated site.</p>\n" * 24000)
+
+def zip_to_disk(folder, path):
+    with zipfile.ZipFile(path, "w") as zipf:
+        for arcname, file_path in main.website_files(folder):
+            zipf.write(file_path, arcname)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(main.ZIP_CHUNK_SIZE), b""):
+            yield chunk
+
+def measure(chunks):
+    tracemalloc.start()
+    start = time.perf_counter()
+    first = None
+    total = 0
+    for chunk in chunks:
+        if first is None:
+            first = time.perf_counter() - start
+        total += len(chunk)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return first * 1000, elapsed * 1000, peak / 1024, total / 1024 / 1024
+
+if __name__ == "__main__":
+    megabytes = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    folder = os.path.abspath("site")
+    make_site(folder, megabytes)
+    results = {
+        "zip to disk": measure(zip_to_disk(folder, os.path.abspath("site.zip"))),
+        "stream_zip": measure(main.stream_zip(main.website_files(folder))),
+    }
+    print(f"{megabytes} MB site")
+    print(f"{'method':<14}{'TTFB ms':>10}{'total ms':>10}{'peak KiB':>10}{'zip MB':>8}")
+    for name, (first, elapsed, peak, size) in results.items():
+        print(f"{name:<14}{first:>10.1f}{elapsed:>10.1f}{peak:>10.0f}{size:>8.1f}")
@@ -0,0 +1,50 @@
+"""
+Landing page and dashboard render time with the template card grid rebuilt on
+every request versus served from the fragment cache, for a catalog of N templates.
+
+Usage: python benchmarks/bench_catalog.py [templates] [requests per route]
+"""
+import os, sys, tempfile, time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.chdir(tempfile.mkdtemp())  # main creates its database and folders in the cwd
+import main
+
+def uncached_template_cards(member):
+    return main.render_template_cards(main.get_all_templates(), member)
+
+def time_route(client, route, n):
+    client.get(route)
+    start = time.perf_counter()
+    for _ in range(n):
+        client.get(route)
+    return (time.perf_counter() - start) / n * 1000
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    n = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    with main.app.app_context():
+        con = main.db()
+        con.executemany("""INSERT INTO templates
+            (name, description, category, features, original_price, discount_price, has_discount, tag, image_url, preview_url)
+            VALUES (?, ?, 'business', 'Responsive,SEO,Fast', 99, 79, 1, 'New', ?, '#')""",
+            [(f"Template {i}", "Benchmark template " * 5, f"missing-{i}.png") for i in range(count)])
+        con.commit()
+
+    anonymous = main.app.test_client()
+    member = main.app.test_client()
+    member.post("/signup", data=dict(fullname="Bench", email="bench@example.com", whatsapp="0", gender="Male",
+                                     dob="2000-01-01", profession="QA", password="bench", confirm_password="bench"))
+    member.post("/login", data=dict(email="bench@example.com", password="bench"))
+
+    cached = main.get_template_cards
+    main.get_template_cards = uncached_template_cards
+    before = {"/": time_route(anonymous, "/", n), "/dashboard": time_route(member, "/dashboard", n)}
+    main.get_template_cards = cached
+    after = {"/": time_route(anonymous, "/", n), "/dashboard": time_route(member, "/dashboard", n)}
+
+    print(f"{count} templates")
+    print(f"{'route':<14}{'rebuilt ms':>12}{'cached ms':>12}")
+    for route in before:
+        print(f"{route:<14}{before[route]:>12.3f}{after[route]:>12.3f}")
+    print(main.fragment_cache.stats())
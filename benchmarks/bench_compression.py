@@ -0,0 +1,43 @@
+"""
+CPU cost versus bytes saved for on-the-fly response compression at the
+gzip levels and brotli qualities COMPRESS_GZIP_LEVEL / COMPRESS_BROTLI_QUALITY
+can be set to, measured on rendered pages including a 200-order /admin/orders.
+
+Usage: python benchmarks/bench_compression.py [repeats]
+"""
+import gzip, os, sys, tempfile, time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.chdir(tempfile.mkdtemp())  # main creates its database and folders in the cwd
+import main
+
+def pages():
+    client = main.app.test_client()
+    home = client.get("/").get_data()
+    client.post("/signup", data=dict(fullname="Bench", email="bench@example.com", whatsapp="0", gender="Male",
+                                     dob="2000-01-01", profession="QA", password="bench", confirm_password="bench"))
+    client.post("/login", data=dict(email="bench@example.com", password="bench"))
+    for _ in range(200):
+        client.post("/order-template/1", data=dict(website_name="Bench", requirements=""))
+    dashboard = client.get("/dashboard").get_data()
+    admin = main.app.test_client()
+    admin.post("/login", data=dict(email=main.ADMIN_EMAIL, password=main.ADMIN_PASS))
+    return {"/": home, "/dashboard": dashboard, "/admin/orders": admin.get("/admin/orders").get_data()}
+
+def codecs():
+    for level in (1, 6, 9):
+        yield f"gzip-{level}", lambda data, level=level: gzip.compress(data, level)
+    if main.brotli:
+        for quality in (1, 4, 5, 8, 11):
+            yield f"br-{quality}", lambda data, quality=quality: main.brotli.compress(data, quality=quality)
+
+if __name__ == "__main__":
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    for route, body in pages().items():
+        print(f"{route}  ({len(body)} bytes)")
+        for name, compress in codecs():
+            start = time.perf_counter()
+            for _ in range(repeats):
+                size = len(compress(body))
+            ms = (time.perf_counter() - start) / repeats * 1000
+            print(f"  {name:<8} {ms:>8.2f} ms  {size:>8} bytes  {100 - size * 100 / len(body):>5.1f}% saved")
@@ -0,0 +1,57 @@
+"""
+Resubmitting a site after changing one file: bytes uploaded and archive
+rebuild time for a full zip resubmission versus a delta submission, whose
+archive build copies the unchanged entries from the previous archive.
+
+Usage: python benchmarks/bench_delta.py [site MB] [files]
+"""
+import hashlib, os, sys, tempfile, time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.chdir(tempfile.mkdtemp())  # main creates its database and folders in the cwd
+import main
+
+def make_manifest(megabytes, files):
+    """Store a generated site in the blob store; half compressible text, half random bytes"""
+    manifest = []
+    for i in range(files):
+        size = megabytes * 1024 * 1024 // files
+        data = os.urandom(size) if i % 2 else (f"<p>Section {i}</p>\n" * size)[:size].encode()
+        sha256 = hashlib.sha256(data).hexdigest()
+        if not os.path.exists(main.blob_path(sha256)):
+            os.makedirs(os.path.dirname(main.blob_path(sha256)), exist_ok=True)
+            with open(main.blob_path(sha256), "wb") as f:
+                f.write(data)
+        manifest.append((f"page{i}.html", sha256, size, 1700000000.0))
+    return sorted(manifest)
+
+def build(manifest, reuse_from=None):
+    path = os.path.abspath(f"site{time.perf_counter_ns()}.zip")
+    reuse = main.ArchiveReuse(reuse_from) if reuse_from else None
+    start = time.perf_counter()
+    with open(path, "wb") as f:
+        for chunk in main.stream_zip(main.manifest_files(manifest), reuse):
+            f.write(chunk)
+    return path, time.perf_counter() - start
+
+if __name__ == "__main__":
+    megabytes = int(sys.argv[1]) if len(sys.argv) > 1 else 128
+    files = int(sys.argv[2]) if len(sys.argv) > 2 else 256
+    with main.app.app_context():
+        manifest = make_manifest(megabytes, files)
+        first, _ = build(manifest)
+        changed = b"<p>fixed</p>"
+        sha256 = hashlib.sha256(changed).hexdigest()
+        os.makedirs(os.path.dirname(main.blob_path(sha256)), exist_ok=True)
+        with open(main.blob_path(sha256), "wb") as f:
+            f.write(changed)
+        manifest[0] = (manifest[0][0], sha256, len(changed), manifest[0][3])
+        full_path, full = build(manifest)
+        delta_path, delta = build(manifest, reuse_from=first)
+        with open(full_path, "rb") as a, open(delta_path, "rb") as b:
+            identical = a.read() == b.read()
+    print(f"{megabytes} MB in {files} files, one file changed")
+    print(f"{'resubmission':<14}{'uploaded':>12}{'rebuild ms':>12}")
+    print(f"{'full zip':<14}{os.path.getsize(first) / 1024 / 1024:>9.1f} MB{full * 1000:>12.1f}")
+    print(f"{'delta':<14}{len(changed):>10} B {delta * 1000:>12.1f}")
+    print(f"archives byte-identical: {identical}")
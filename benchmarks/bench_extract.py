@@ -0,0 +1,46 @@
+"""
+Files/sec and MB/sec extracting a generated site zip with ZipFile.extractall
+versus extract_website_zip() at 1 and EXTRACT_THREADS threads.
+
+Usage: python benchmarks/bench_extract.py [site MB] [files]
+"""
+import os, shutil, sys, tempfile, time, zipfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.chdir(tempfile.mkdtemp())  # main creates its database and folders in the cwd
+import main
+
+def make_zip(path, megabytes, files):
+    """Compressible pages of equal size spread over a few folders"""
+    page = (b"<div class='card'><p>Generated content for the benchmark.</p></div>\n" * 16000)[:megabytes * 1024 * 1024 // files]
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zipf:
+        for i in range(files):
+            zipf.writestr(f"section{i % 16}/page{i}.html", page)
+
+def extractall(path, folder):
+    start = time.perf_counter()
+    with zipfile.ZipFile(path) as zipf:
+        zipf.extractall(folder)
+        infos = [info for info in zipf.infolist() if not info.is_dir()]
+    return main.ExtractResult(len(infos), sum(info.file_size for info in infos), time.perf_counter() - start, None)
+
+def engine(threads):
+    def run(path, folder):
+        main.app.config['EXTRACT_THREADS'] = threads
+        return main.extract_website_zip(path, folder)
+    return run
+
+if __name__ == "__main__":
+    megabytes = int(sys.argv[1]) if len(sys.argv) > 1 else 256
+    files = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    path = os.path.abspath("site.zip")
+    make_zip(path, megabytes, files)
+    threads = max(main.app.config['EXTRACT_THREADS'], 2)
+    methods = {"extractall": extractall, "engine, 1 thread": engine(1), f"engine, {threads} threads": engine(threads)}
+    print(f"{megabytes} MB in {files} files, zip {os.path.getsize(path) / 1024 / 1024:.1f} MB")
+    print(f"{'method':<22}{'seconds':>9}{'files/s':>10}{'MB/s':>8}")
+    for name, run in methods.items():
+        folder = os.path.abspath("site")
+        shutil.rmtree(folder, ignore_errors=True)
+        result = run(path, folder)
+        print(f"{name:<22}{result.seconds:>9.2f}{result.files / result.seconds:>10.0f}{result.bytes / result.seconds / 1024 / 1024:>8.1f}")
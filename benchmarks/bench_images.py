@@ -0,0 +1,54 @@
+"""
+Image bytes a browser downloads for the dashboard card grid: the uploaded
+originals the cards used to reference versus the srcset candidate it picks
+from the resized variants, at 1x and 2x density, with and without WebP.
+
+Usage: python benchmarks/bench_images.py [templates] [upload width]
+"""
+import os, sys, tempfile, io, re, random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.chdir(tempfile.mkdtemp())  # main creates its database and folders in the cwd
+import main
+from PIL import Image, ImageFilter
+
+CARD_WIDTH = 400  # CSS pixels, matches the sizes attribute on desktop
+
+def photo(width, seed):
+    """A noisy gradient that compresses roughly like a screenshot or photo"""
+    rng = random.Random(seed)
+    noise = Image.effect_noise((width // 4, width // 6), 60).filter(ImageFilter.GaussianBlur(1))
+    base = Image.merge("RGB", [noise.point(lambda v, o=rng.randint(0, 80): min(255, v + o)) for _ in range(3)])
+    out = io.BytesIO()
+    base.resize((width, width * 2 // 3), Image.BICUBIC).save(out, "JPEG", quality=90)
+    return out.getvalue()
+
+def pick(srcset, density):
+    candidates = sorted((int(w.rstrip("w")), url) for url, w in (c.split() for c in srcset.split(", ")))
+    for width, url in candidates:
+        if width >= CARD_WIDTH * density:
+            return url
+    return candidates[-1][1]
+
+def size_of(url):
+    return os.path.getsize(os.path.join(main.app.config['UPLOAD_FOLDER'], url.split("/static/uploads/", 1)[1]))
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 12
+    width = int(sys.argv[2]) if len(sys.argv) > 2 else 1920
+    client = main.app.test_client()
+    client.post("/login", data=dict(email=main.ADMIN_EMAIL, password=main.ADMIN_PASS))
+    for i in range(count):
+        client.post("/admin/add-template", content_type="multipart/form-data", data=dict(
+            name=f"Bench {i}", description="", category="business", features="", original_price="99",
+            discount_price="79", tag="", preview_url="#", image=(io.BytesIO(photo(width, i)), f"bench-{i}.jpg")))
+
+    html = client.get("/dashboard").get_data(as_text=True)
+    pictures = re.findall(r'<picture><source type="image/webp" srcset="([^"]+)"[^>]*><img src="[^"]+" srcset="([^"]+)"', html)
+    originals = sum(size_of(f"/static/uploads/bench-{i}.jpg") for i in range(count))
+    print(f"{len(pictures)} cards, {width}px uploads")
+    print(f"{'served':<22}{'bytes':>12}{'vs original':>14}")
+    print(f"{'original upload':<22}{originals:>12}{'':>14}")
+    for label, index, density in (("jpeg 1x", 1, 1), ("jpeg 2x", 1, 2), ("webp 1x", 0, 1), ("webp 2x", 0, 2)):
+        total = sum(size_of(pick(srcsets[index], density)) for srcsets in pictures)
+        print(f"{label:<22}{total:>12}{total / originals:>13.1%}")
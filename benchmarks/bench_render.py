@@ -0,0 +1,47 @@
+"""
+Render time per route with the layout compiled once as "base.html" versus
+the previous render_template_string(BASE_TEMPLATE, ...) path.
+
+Usage: python benchmarks/bench_render.py [requests per route]
+"""
+import os, sys, tempfile, time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.chdir(tempfile.mkdtemp())  # main creates its database and folders in the cwd
+import main
+from flask import render_template_string
+
+ROUTES = ["/dashboard", "/orders", "/account", "/notifications", "/your-web", "/custom-web"]
+
+def legacy_render_base_template(title, content, unread_orders_count=0, scripts=""):
+    return render_template_string(main.BASE_TEMPLATE, title=title, content=content,
+                                  unread_orders_count=unread_orders_count, scripts=scripts)
+
+def time_routes(client, n):
+    timings = {}
+    for route in ROUTES:
+        client.get(route)  # warm the template cache
+        start = time.perf_counter()
+        for _ in range(n):
+            client.get(route)
+        timings[route] = (time.perf_counter() - start) / n * 1000
+    return timings
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    client = main.app.test_client()
+    client.post("/signup", data=dict(fullname="Bench", email="bench@example.com", whatsapp="0", gender="Male",
+                                     dob="2000-01-01", profession="QA", password="bench", confirm_password="bench"))
+    client.post("/login", data=dict(email="bench@example.com", password="bench"))
+    for _ in range(10):
+        client.post("/order-template/1", data=dict(website_name="Bench", requirements=""))
+
+    compiled = main.render_base_template
+    main.render_base_template = legacy_render_base_template
+    before = time_routes(client, n)
+    main.render_base_template = compiled
+    after = time_routes(client, n)
+
+    print(f"{'route':<16}{'string ms':>12}{'compiled ms':>14}")
+    for route in ROUTES:
+        print(f"{route:<16}{before[route]:>12.3f}{after[route]:>14.3f}")
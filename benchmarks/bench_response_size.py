@@ -0,0 +1,39 @@
+"""
+HTML bytes per route with the layout CSS/JS linked from static/dist versus
+inlined into every page as before. The inlined figure is reconstructed by
+substituting the source assets back in place of their <link>/<script> tags.
+
+Usage: python benchmarks/bench_response_size.py
+"""
+import gzip, os, re, sys, tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(tempfile.mkdtemp())  # main creates its database and folders in the cwd
+import main
+
+ROUTES = ["/", "/login", "/dashboard", "/orders", "/account", "/notifications", "/custom-web"]
+
+def inline_assets(html):
+    with open(os.path.join(ROOT, "assets", "app.css"), encoding="utf-8") as f:
+        css = f.read()
+    with open(os.path.join(ROOT, "assets", "app.js"), encoding="utf-8") as f:
+        js = f.read()
+    html = re.sub(r'<link href="/static/dist/app\.\w+\.css" rel="stylesheet">', lambda m: f"<style>\n{css}</style>", html)
+    return re.sub(r'<script src="/static/dist/app\.\w+\.js"></script>', lambda m: f"<script>\n{js}</script>", html)
+
+if __name__ == "__main__":
+    anonymous = main.app.test_client()
+    client = main.app.test_client()
+    client.post("/signup", data=dict(fullname="Bench", email="bench@example.com", whatsapp="0", gender="Male",
+                                     dob="2000-01-01", profession="QA", password="bench", confirm_password="bench"))
+    client.post("/login", data=dict(email="bench@example.com", password="bench"))
+
+    print(f"{'route':<16}{'inline':>10}{'linked':>10}{'saved':>8}{'inline gz':>12}{'linked gz':>12}")
+    for route in ROUTES:
+        html = (anonymous if route in ("/", "/login") else client).get(route).get_data(as_text=True)
+        before = inline_assets(html).encode("utf-8")
+        after = html.encode("utf-8")
+        saved = 100 - len(after) * 100 / len(before)
+        print(f"{route:<16}{len(before):>10}{len(after):>10}{saved:>7.0f}%"
+              f"{len(gzip.compress(before)):>12}{len(gzip.compress(after)):>12}")
@@ -0,0 +1,68 @@
+"""
+Concurrent read/write throughput of the SQLite storage profiles.
+
+Runs reader threads against the notifications table while a writer keeps
+inserting, once per profile in main.STORAGE_PROFILES, each on a scratch
+database. Usage: python benchmarks/bench_storage.py [seconds] [readers]
+"""
+import os, sys, tempfile, threading, time, sqlite3
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.chdir(tempfile.mkdtemp())  # main creates its database and folders in the cwd
+import main
+
+def run(profile, seconds, readers):
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    pool = main.ConnectionPool(path, readers + 1, main.STORAGE_PROFILES[profile])
+    con = pool.acquire()
+    con.execute("CREATE TABLE notifications(id INTEGER PRIMARY KEY, user_id INTEGER, message TEXT, is_read INTEGER DEFAULT 0)")
+    con.executemany("INSERT INTO notifications(user_id, message) VALUES(?,?)", [(i % 50, "seed") for i in range(5000)])
+    con.commit()
+    pool.release(con)
+
+    counts = {"reads": 0, "writes": 0, "locked": 0}
+    lock = threading.Lock()
+    deadline = time.time() + seconds
+
+    def reader():
+        con = pool.acquire()
+        n = locked = 0
+        while time.time() < deadline:
+            try:
+                con.execute("SELECT COUNT(*) FROM notifications WHERE user_id=? AND is_read=0", (n % 50,)).fetchone()
+                n += 1
+            except sqlite3.OperationalError:
+                locked += 1
+        pool.release(con)
+        with lock:
+            counts["reads"] += n
+            counts["locked"] += locked
+
+    def writer():
+        con = pool.acquire()
+        n = locked = 0
+        while time.time() < deadline:
+            try:
+                con.execute("INSERT INTO notifications(user_id, message) VALUES(?,?)", (n % 50, "bench"))
+                con.commit()
+                n += 1
+            except sqlite3.OperationalError:
+                con.rollback()
+                locked += 1
+        pool.release(con)
+        with lock:
+            counts["writes"] += n
+            counts["locked"] += locked
+
+    threads = [threading.Thread(target=reader) for _ in range(readers)] + [threading.Thread(target=writer)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    print(f"{profile:<10} reads/s {counts['reads'] / seconds:>10.0f}   writes/s {counts['writes'] / seconds:>8.0f}   locked {counts['locked']}")
+
+if __name__ == "__main__":
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 3
+    readers = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    for profile in main.STORAGE_PROFILES:
+        run(profile, seconds, readers)
@@ -0,0 +1,56 @@
+"""
+Upload throughput of admin_submit_folder's multipart form versus the chunked
+upload API, for a stored (incompressible) zip of the given size. The form is
+capped by MAX_CONTENT_LENGTH; the chunked API is not.
+
+Usage: python benchmarks/bench_upload.py [MB]
+"""
+import os, sys, tempfile, time, io, zipfile, hashlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.chdir(tempfile.mkdtemp())  # main creates its database and folders in the cwd
+import main
+
+def make_zip(megabytes):
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as z:
+        for i in range(megabytes):
+            z.writestr(f"img/photo{i}.jpg", os.urandom(1024 * 1024))
+    return buf.getvalue()
+
+def form_upload(client, order_id, data):
+    response = client.post("/admin/submit-folder", content_type="multipart/form-data",
+                           data=dict(order_id=order_id, folder=(io.BytesIO(data), "site.zip")))
+    return response.status_code == 302
+
+def chunked_upload(client, order_id, data):
+    status = client.post("/admin/uploads", json=dict(order_id=order_id, filename="site.zip", size=len(data))).json
+    size = status["chunk_size"]
+    for index in range(status["chunks"]):
+        chunk = data[index * size:(index + 1) * size]
+        client.put(f"/admin/uploads/{status['upload_id']}/chunks/{index}", data=chunk,
+                   headers={"X-Chunk-SHA256": hashlib.sha256(chunk).hexdigest()})
+    return client.post(f"/admin/uploads/{status['upload_id']}/finalize").status_code == 200
+
+if __name__ == "__main__":
+    megabytes = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    client = main.app.test_client()
+    client.post("/signup", data=dict(fullname="Bench", email="bench@example.com", whatsapp="0", gender="Male",
+                                     dob="2000-01-01", profession="QA", password="bench", confirm_password="bench"))
+    client.post("/login", data=dict(email="bench@example.com", password="bench"))
+    client.post("/order-template/1", data=dict(website_name="Bench", requirements=""))
+    with main.app.app_context():
+        order_id = main.db().execute("SELECT order_id FROM orders").fetchone()[0]
+    admin = main.app.test_client()
+    admin.post("/login", data=dict(email=main.ADMIN_EMAIL, password=main.ADMIN_PASS))
+
+    data = make_zip(megabytes)
+    print(f"{len(data) / 1024 / 1024:.0f} MB zip, {main.app.config['UPLOAD_CHUNK_SIZE'] // 1024 // 1024} MB chunks, "
+          f"MAX_CONTENT_LENGTH {main.app.config['MAX_CONTENT_LENGTH'] // 1024 // 1024} MB")
+    print(f"{'method':<10}{'ok':>6}{'seconds':>10}{'MB/s':>10}")
+    for name, upload in (("form", form_upload), ("chunked", chunked_upload)):
+        start = time.perf_counter()
+        ok = upload(admin, order_id, data)
+        elapsed = time.perf_counter() - start
+        rate = f"{len(data) / 1024 / 1024 / elapsed:.1f}" if ok else "-"
+        print(f"{name:<10}{str(ok):>6}{elapsed:>10.2f}{rate:>10}")
@@ -0,0 +1,16 @@
+# Gunicorn settings; `gunicorn main:app` run from this folder picks them up.
+import multiprocessing
+import os
+
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+
+# Order chat keeps a Server-Sent Events stream open per order page. Under
+# gevent an idle stream is a greenlet waiting on an Event, so one worker
+# holds CHAT_MAX_STREAMS (2000) of them with room left for ordinary
+# requests; a sync worker would be tied up by a single stream.
+worker_class = "gevent"
+worker_connections = 2200
+
+# Job threads become greenlets too. Zip extraction, archive builds, site
+# folder scans and the cross-process archive lock run on gevent's native
+# thread pool (main.run_blocking), so they don't hold up the event loop.
@@ -1,15 +1,84 @@
-from flask import Flask, render_template_string, request, redirect, jsonify, session, send_file
+from flask import Flask, render_template, request, redirect, jsonify, session, send_file, g, Response
 from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
 from flask_bcrypt import Bcrypt
-import sqlite3, uuid, datetime, json, time, random, os, zipfile, io
+import sqlite3, uuid, datetime, json, time, random, os, zipfile, io, threading, re, hashlib, math
 from werkzeug.utils import secure_filename
-import shutil
+from werkzeug.utils import send_file as werkzeug_send_file
+from werkzeug.security import safe_join
+from werkzeug.http import parse_accept_header
+from werkzeug.exceptions import NotFound
+from jinja2 import ChoiceLoader, DictLoader
+from markupsafe import escape
+import shutil, gzip, mimetypes, urllib.request, functools, contextlib, copy, tempfile
+from collections import namedtuple, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import click
+
+try:
+    import brotli  # optional: pre-built .br variants of static assets
+except ImportError:
+    brotli = None
+
+try:
+    import fcntl  # optional: serialize archive builds across worker processes
+except ImportError:
+    fcntl = None
+
+try:
+    import gevent.monkey, gevent.threadpool  # optional: gunicorn.conf.py's worker class
+except ImportError:
+    gevent = None
+
+try:
+    from PIL import Image  # optional: resized and WebP variants of uploaded images
+except ImportError:
+    Image = None
 
 app = Flask(__name__)
 app.secret_key = "secret-key-12345"
 app.config['UPLOAD_FOLDER'] = 'static/uploads'
 app.config['WEBSITE_FOLDER'] = 'static/websites'
+app.config['ARCHIVE_FOLDER'] = 'archives'  # prebuilt download zips, outside static so only download_website serves them
+app.config['BLOB_FOLDER'] = 'blobs'  # content-addressed site files; same filesystem as WEBSITE_FOLDER so sites can hardlink them
+app.config['BLOB_GC_GRACE'] = 3600  # seconds an unreferenced blob survives, covering submissions still being recorded
+app.config['UPLOAD_STAGING_FOLDER'] = 'upload_staging'  # chunked uploads being assembled
+app.config['UPLOAD_CHUNK_SIZE'] = 8 * 1024 * 1024  # must stay below MAX_CONTENT_LENGTH
+app.config['SUBMISSION_MAX_SIZE'] = 4 * 1024 * 1024 * 1024  # whole site via chunked upload
+app.config['UPLOAD_EXPIRY'] = 24 * 3600  # seconds an unfinished chunked upload is kept
+app.config['EXTRACT_MAX_ENTRIES'] = 20000
+app.config['EXTRACT_MAX_SIZE'] = 8 * 1024 * 1024 * 1024  # uncompressed bytes of one submitted site
+app.config['EXTRACT_MAX_RATIO'] = 200  # uncompressed / compressed, checked on entries of 1MB or more
+app.config['EXTRACT_THREADS'] = min(4, os.cpu_count() or 1)
+app.config['JOB_WORKER_THREADS'] = int(os.environ.get('JOB_WORKER_THREADS', 1))  # per web worker; 0 when `flask run-worker` runs instead
+app.config['JOB_MAX_ATTEMPTS'] = 5
+app.config['JOB_RETRY_DELAY'] = 5  # seconds before the first retry, doubled for each further attempt
+app.config['JOB_VISIBILITY_TIMEOUT'] = 900  # seconds a claimed job stays hidden before another worker may retry it
+app.config['JOB_POLL_INTERVAL'] = 2  # seconds an idle worker sleeps between looks at the queue
+app.config['CHAT_POLL_INTERVAL'] = 1  # seconds before a message sent through another worker reaches this one's streams
+app.config['CHAT_HEARTBEAT'] = 15  # seconds between keep-alive comments on an idle stream
+app.config['CHAT_STREAM_TIMEOUT'] = 300  # seconds before a stream ends and the browser reconnects
+app.config['CHAT_MAX_STREAMS'] = 2000  # open chat streams per worker
+app.config['FILE_DELIVERY'] = os.environ.get('FILE_DELIVERY', 'local')  # local, x-sendfile or x-accel-redirect
+app.config['FILE_DELIVERY_LOCATIONS'] = {  # folder -> internal location the front proxy serves it from
+    app.config['ARCHIVE_FOLDER']: '/_protected/archives/',
+    app.config['UPLOAD_FOLDER']: '/_protected/uploads/',
+    app.config['WEBSITE_FOLDER']: '/_protected/websites/',
+}
+app.config['ASSET_SOURCE_FOLDER'] = os.path.join(app.root_path, 'assets')  # unminified CSS/JS for the layout
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
+app.config['DB_POOL_SIZE'] = int(os.environ.get('DB_POOL_SIZE', 8))  # connections per worker
+app.config['DB_POOL_TIMEOUT'] = 10  # seconds to wait for a free connection
+app.config['DB_STORAGE_PROFILE'] = os.environ.get('DB_STORAGE_PROFILE', 'wal')  # see STORAGE_PROFILES
+app.config['DB_CHECKPOINT_INTERVAL'] = 300  # seconds between WAL checkpoints, 0 disables
+app.config['DB_COUNT_STATEMENTS'] = False  # report SQL statements per request in X-DB-Statements
+app.config['ORDERS_PAGE_SIZE'] = 20
+app.config['COMPRESS_MIN_SIZE'] = 1024  # bytes; smaller responses are sent as-is
+app.config['COMPRESS_MAX_SIZE'] = 4 * 1024 * 1024  # bytes; larger ones are sent as-is rather than buffered whole
+app.config['COMPRESS_GZIP_LEVEL'] = 6
+app.config['COMPRESS_BROTLI_QUALITY'] = 4
+app.config['FRAGMENT_CACHE_MAX_BYTES'] = 4 * 1024 * 1024  # rendered HTML kept per worker
+app.config['IMAGE_VARIANT_FOLDER'] = os.path.join(app.config['UPLOAD_FOLDER'], 'variants')
+app.config['IMAGE_VARIANT_QUALITY'] = 80
 
 bcrypt = Bcrypt(app)
 
@@ -24,9 +93,198 @@ ADMIN_PASS = "@#$5567"
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 os.makedirs(app.config['WEBSITE_FOLDER'], exist_ok=True)
 
+def write_file_atomic(path, data):
+    """Write bytes to path via a temp file and rename, so readers never see a partial file"""
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+def cooperative():
+    """Whether gevent has patched this worker, so a call that blocks the OS thread stalls every request and stream in it"""
+    return gevent is not None and gevent.monkey.is_module_patched("threading")
+
+def run_blocking(fn, *args):
+    """fn(*args), moved to a native thread of gevent's pool in a cooperative worker; fn must not need app or request context"""
+    if not cooperative():
+        return fn(*args)
+    return gevent.get_hub().threadpool.apply(fn, args)
+
+def map_blocking(fn, items, threads):
+    """list(map(fn, items)) on up to threads native threads, which a cooperative worker waits for without blocking"""
+    if cooperative():
+        pool = gevent.threadpool.ThreadPool(threads)
+        try:
+            return pool.map(fn, items)
+        finally:
+            pool.kill()
+    with ThreadPoolExecutor(threads, thread_name_prefix="blocking") as executor:
+        return list(executor.map(fn, items))
+
 # ---------------- DATABASE ----------------
+# PRAGMAs applied to every pooled connection, in order. busy_timeout comes
+# first so the journal_mode switch waits instead of failing under contention.
+STORAGE_PROFILES = {
+    "wal": {
+        "busy_timeout": 5000,
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -16000,  # negative means KiB
+        "mmap_size": 64 * 1024 * 1024,
+        "temp_store": "MEMORY",
+        "foreign_keys": "ON"
+    },
+    # The pre-WAL behaviour, kept for comparison and for filesystems without shared memory
+    "rollback": {
+        "busy_timeout": 5000,
+        "journal_mode": "DELETE",
+        "synchronous": "FULL",
+        "foreign_keys": "ON"
+    }
+}
+
+class ConnectionPool:
+    """Bounded pool of SQLite connections owned by a single worker process"""
+
+    def __init__(self, path, size, pragmas=None, timeout=10):
+        self.path = path
+        self.size = size
+        self.pragmas = pragmas or {}
+        self.timeout = timeout
+        self._cond = threading.Condition()
+        self._idle = []
+        self._open = 0
+        self._pid = os.getpid()
+        self.checkouts = 0
+        self.waits = 0
+        self.peak = 0
+
+    def _connect(self):
+        con = sqlite3.connect(self.path, check_same_thread=False)
+        for name, value in self.pragmas.items():
+            con.execute(f"PRAGMA {name}={value}")
+        return con
+
+    def _check_pid(self):
+        # Connections inherited through a gunicorn fork belong to the parent
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._idle = []
+            self._open = 0
+
+    def acquire(self):
+        with self._cond:
+            self._check_pid()
+            if not self._idle and self._open >= self.size:
+                self.waits += 1
+                if not self._cond.wait_for(lambda: self._idle or self._open < self.size, self.timeout):
+                    raise sqlite3.OperationalError("Timed out waiting for a database connection")
+            self.checkouts += 1
+            if self._idle:
+                return self._idle.pop()
+            self._open += 1
+            self.peak = max(self.peak, self._open)
+        try:
+            return self._connect()
+        except Exception:
+            with self._cond:
+                self._open -= 1
+                self._cond.notify()
+            raise
+
+    def release(self, con):
+        try:
+            # Never hand the next request a half-finished transaction
+            if con.in_transaction:
+                con.rollback()
+            healthy = True
+        except sqlite3.Error:
+            healthy = False
+        with self._cond:
+            if self._pid != os.getpid():
+                return
+            if healthy:
+                self._idle.append(con)
+            else:
+                self._open -= 1
+            self._cond.notify()
+
+    def stats(self):
+        with self._cond:
+            return {
+                "size": self.size,
+                "open": self._open,
+                "idle": len(self._idle),
+                "in_use": self._open - len(self._idle),
+                "peak": self.peak,
+                "checkouts": self.checkouts,
+                "waits": self.waits
+            }
+
+pool = ConnectionPool(DB, app.config['DB_POOL_SIZE'], STORAGE_PROFILES[app.config['DB_STORAGE_PROFILE']], app.config['DB_POOL_TIMEOUT'])
+
 def db():
-    return sqlite3.connect(DB)
+    """Connection for the current request, checked out of the pool on first use"""
+    if "db_con" not in g:
+        g.db_con = pool.acquire()
+        if app.config['DB_COUNT_STATEMENTS']:
+            g.db_statements = 0
+            g.db_con.set_trace_callback(_count_statement)
+    return g.db_con
+
+def _count_statement(sql):
+    g.db_statements += 1
+
+@app.after_request
+def report_db_statements(response):
+    if app.config['DB_COUNT_STATEMENTS']:
+        response.headers['X-DB-Statements'] = str(g.get("db_statements", 0))
+    return response
+
+@app.teardown_appcontext
+def release_db(exc):
+    con = g.pop("db_con", None)
+    if con is not None:
+        con.set_trace_callback(None)
+        pool.release(con)
+
+def checkpoint_db(mode="PASSIVE"):
+    """Copy committed WAL frames back into the database file"""
+    con = sqlite3.connect(DB, timeout=30)
+    try:
+        busy, log_frames, checkpointed = con.execute(f"PRAGMA wal_checkpoint({mode})").fetchone()
+    finally:
+        con.close()
+    return {"busy": busy, "log_frames": log_frames, "checkpointed": checkpointed}
+
+_checkpointer_lock = threading.Lock()
+_checkpointer_pid = None
+
+def _checkpoint_loop(interval):
+    while True:
+        time.sleep(interval)
+        try:
+            checkpoint_db()
+        except sqlite3.Error as e:
+            app.logger.warning("WAL checkpoint failed: %s", e)
+
+@app.before_request
+def start_checkpointer():
+    # Started lazily so each gunicorn worker gets its own thread after the fork
+    global _checkpointer_pid
+    interval = app.config['DB_CHECKPOINT_INTERVAL']
+    if not interval or pool.pragmas.get("journal_mode") != "WAL" or _checkpointer_pid == os.getpid():
+        return
+    with _checkpointer_lock:
+        if _checkpointer_pid == os.getpid():
+            return
+        _checkpointer_pid = os.getpid()
+        threading.Thread(target=_checkpoint_loop, args=(interval,), name="wal-checkpoint", daemon=True).start()
+
+@app.cli.command("checkpoint-db")
+def checkpoint_db_command():
+    """Checkpoint and truncate the WAL file"""
+    print(checkpoint_db("TRUNCATE"))
 
 def init_db():
     con = db()
@@ -138,11 +396,560 @@ def init_db():
             VALUES(?,?,?,?,?,?,?,?,?,?,?)""", template)
 
     con.commit()
-    con.close()
+    migrate(con)
     print("✓ Database initialized successfully")
 
+# ---------------- MIGRATIONS ----------------
+# Ordered schema changes applied on top of the tables created by init_db().
+# Each step must be idempotent; the applied version is kept in schema_version.
+MIGRATIONS = []
+
+def migration(version):
+    def register(fn):
+        MIGRATIONS.append((version, fn))
+        return fn
+    return register
+
+def migrate(con):
+    cur = con.cursor()
+    cur.execute("""CREATE TABLE IF NOT EXISTS schema_version(
+        version INTEGER PRIMARY KEY,
+        description TEXT,
+        applied TEXT DEFAULT CURRENT_TIMESTAMP
+    )""")
+    for version, step in sorted(MIGRATIONS, key=lambda m: m[0]):
+        # Take the write lock before checking so concurrently booting workers apply each step once
+        cur.execute("BEGIN IMMEDIATE")
+        try:
+            if cur.execute("SELECT 1 FROM schema_version WHERE version=?", (version,)).fetchone():
+                con.rollback()
+                continue
+            step(cur)
+            cur.execute("INSERT INTO schema_version(version, description) VALUES(?,?)", (version, step.__doc__))
+            con.commit()
+            print(f"✓ Applied migration {version}: {step.__doc__}")
+        except Exception:
+            con.rollback()
+            raise
+
+@migration(1)
+def add_hot_query_indexes(cur):
+    """Indexes for per-user order, message, notification and admin count lookups"""
+    # orders.order_id and users.email are already covered by their UNIQUE autoindexes
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_orders_user ON orders(user_id)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_orders_user_folder ON orders(user_id, folder_submitted, folder_submitted_at)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_orders_status ON orders(status)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_orders_type ON orders(order_type)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_orders_folder ON orders(folder_submitted)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_messages_order ON messages(order_id, created)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_notifications_user_unread ON notifications(user_id, is_read)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_notifications_user_created ON notifications(user_id, created)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_templates_status ON templates(status)")
+
+@migration(2)
+def link_notifications_to_orders(cur):
+    """Add notifications.order_ref and backfill it from the order id in each message"""
+    columns = [row[1] for row in cur.execute("PRAGMA table_info(notifications)")]
+    if "order_ref" not in columns:
+        cur.execute("ALTER TABLE notifications ADD COLUMN order_ref INTEGER REFERENCES orders(id)")
+
+    # Every order notification so far quotes the public order id (TMP-xxxxxxxx / CUST-xxxxxxxx)
+    order_ids = {(user_id, order_id): id for id, user_id, order_id in cur.execute("SELECT id, user_id, order_id FROM orders").fetchall()}
+    pattern = re.compile(r"\b(?:TMP|CUST)-[0-9a-f]{8}\b")
+    updates = []
+    for id, user_id, message in cur.execute("SELECT id, user_id, message FROM notifications WHERE order_ref IS NULL").fetchall():
+        for order_id in pattern.findall(message or ""):
+            if (user_id, order_id) in order_ids:
+                updates.append((order_ids[(user_id, order_id)], id))
+                break
+    cur.executemany("UPDATE notifications SET order_ref=? WHERE id=?", updates)
+
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_notifications_ref_unread ON notifications(order_ref, is_read)")
+    # Supersedes idx_notifications_user_unread and also covers the distinct unread-order count
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_notifications_user_unread_ref ON notifications(user_id, is_read, order_ref)")
+    cur.execute("DROP INDEX IF EXISTS idx_notifications_user_unread")
+
+@migration(3)
+def add_user_counters(cur):
+    """Materialized per-user badge counters kept current by triggers"""
+    cur.execute("""CREATE TABLE IF NOT EXISTS user_counters(
+        user_id INTEGER PRIMARY KEY,
+        unread_notifications INTEGER NOT NULL DEFAULT 0,
+        unread_orders INTEGER NOT NULL DEFAULT 0,
+        completed_websites INTEGER NOT NULL DEFAULT 0,
+        total_orders INTEGER NOT NULL DEFAULT 0,
+        FOREIGN KEY (user_id) REFERENCES users(id)
+    )""")
+
+    cur.execute("""CREATE TRIGGER IF NOT EXISTS trg_counters_user_insert AFTER INSERT ON users
+    BEGIN
+        INSERT OR IGNORE INTO user_counters(user_id) VALUES(NEW.id);
+    END""")
+
+    cur.execute("""CREATE TRIGGER IF NOT EXISTS trg_counters_order_insert AFTER INSERT ON orders
+    BEGIN
+        INSERT OR IGNORE INTO user_counters(user_id) VALUES(NEW.user_id);
+        UPDATE user_counters SET
+            total_orders = total_orders + 1,
+            completed_websites = completed_websites + (NEW.folder_submitted IS 1)
+        WHERE user_id = NEW.user_id;
+    END""")
+
+    cur.execute("""CREATE TRIGGER IF NOT EXISTS trg_counters_order_folder AFTER UPDATE OF folder_submitted ON orders
+    WHEN (OLD.folder_submitted IS 1) <> (NEW.folder_submitted IS 1)
+    BEGIN
+        UPDATE user_counters SET
+            completed_websites = completed_websites + (NEW.folder_submitted IS 1) - (OLD.folder_submitted IS 1)
+        WHERE user_id = NEW.user_id;
+    END""")
+
+    cur.execute("""CREATE TRIGGER IF NOT EXISTS trg_counters_order_delete AFTER DELETE ON orders
+    BEGIN
+        UPDATE user_counters SET
+            total_orders = total_orders - 1,
+            completed_websites = completed_websites - (OLD.folder_submitted IS 1)
+        WHERE user_id = OLD.user_id;
+    END""")
+
+    # An order counts as unread while at least one of its notifications is unread,
+    # so only the first unread notification of an order (or the last one read) moves unread_orders
+    cur.execute("""CREATE TRIGGER IF NOT EXISTS trg_counters_notification_insert AFTER INSERT ON notifications
+    BEGIN
+        INSERT OR IGNORE INTO user_counters(user_id) VALUES(NEW.user_id);
+        UPDATE user_counters SET
+            unread_notifications = unread_notifications + (NEW.is_read IS 0),
+            unread_orders = unread_orders + (NEW.is_read IS 0 AND NEW.order_ref IS NOT NULL AND NOT EXISTS (
+                SELECT 1 FROM notifications WHERE order_ref = NEW.order_ref AND is_read = 0 AND id <> NEW.id))
+        WHERE user_id = NEW.user_id;
+    END""")
+
+    cur.execute("""CREATE TRIGGER IF NOT EXISTS trg_counters_notification_read AFTER UPDATE OF is_read ON notifications
+    WHEN (OLD.is_read IS 0) <> (NEW.is_read IS 0)
+    BEGIN
+        UPDATE user_counters SET
+            unread_notifications = unread_notifications + (NEW.is_read IS 0) - (OLD.is_read IS 0),
+            unread_orders = unread_orders + CASE
+                WHEN NEW.order_ref IS NULL OR EXISTS (
+                    SELECT 1 FROM notifications WHERE order_ref = NEW.order_ref AND is_read = 0 AND id <> NEW.id) THEN 0
+                WHEN NEW.is_read IS 0 THEN 1
+                ELSE -1
+            END
+        WHERE user_id = NEW.user_id;
+    END""")
+
+    cur.execute("""CREATE TRIGGER IF NOT EXISTS trg_counters_notification_delete AFTER DELETE ON notifications
+    WHEN OLD.is_read IS 0
+    BEGIN
+        UPDATE user_counters SET
+            unread_notifications = unread_notifications - 1,
+            unread_orders = unread_orders - (OLD.order_ref IS NOT NULL AND NOT EXISTS (
+                SELECT 1 FROM notifications WHERE order_ref = OLD.order_ref AND is_read = 0))
+        WHERE user_id = OLD.user_id;
+    END""")
+
+    rebuild_user_counters(cur)
+
+def rebuild_user_counters(cur):
+    """Recompute every user's counters from the source tables"""
+    # Upsert rather than delete so columns other than the counters survive
+    cur.execute("DELETE FROM user_counters WHERE user_id NOT IN (SELECT id FROM users)")
+    cur.execute("""INSERT INTO user_counters(user_id, unread_notifications, unread_orders, completed_websites, total_orders)
+        SELECT u.id,
+            (SELECT COUNT(*) FROM notifications WHERE user_id = u.id AND is_read = 0),
+            (SELECT COUNT(DISTINCT order_ref) FROM notifications WHERE user_id = u.id AND is_read = 0 AND order_ref IS NOT NULL),
+            (SELECT COUNT(*) FROM orders WHERE user_id = u.id AND folder_submitted = 1),
+            (SELECT COUNT(*) FROM orders WHERE user_id = u.id)
+        FROM users u WHERE true
+        ON CONFLICT(user_id) DO UPDATE SET
+            unread_notifications = excluded.unread_notifications,
+            unread_orders = excluded.unread_orders,
+            completed_websites = excluded.completed_websites,
+            total_orders = excluded.total_orders""")
+    return cur.rowcount
+
+@app.cli.command("rebuild-counters")
+def rebuild_counters_command():
+    """Reconcile user_counters with orders and notifications"""
+    con = db()
+    cur = con.cursor()
+    cur.execute("BEGIN IMMEDIATE")
+    counters_sql = "SELECT user_id, unread_notifications, unread_orders, completed_websites, total_orders FROM user_counters"
+    before = {row[0]: row[1:] for row in cur.execute(counters_sql)}
+    rebuilt = rebuild_user_counters(cur)
+    drifted = [row[0] for row in cur.execute(counters_sql) if before.get(row[0]) != row[1:]]
+    con.commit()
+    print(f"✓ Rebuilt counters for {rebuilt} users, {len(drifted)} had drifted")
+
+@migration(4)
+def add_data_versions(cur):
+    """Version counters that let every worker detect catalog changes with one lookup"""
+    cur.execute("""CREATE TABLE IF NOT EXISTS data_versions(
+        name TEXT PRIMARY KEY,
+        version INTEGER NOT NULL DEFAULT 0
+    )""")
+    cur.execute("INSERT OR IGNORE INTO data_versions(name) VALUES('catalog')")
+    for event in ("INSERT", "UPDATE", "DELETE"):
+        cur.execute(f"""CREATE TRIGGER IF NOT EXISTS trg_catalog_version_{event.lower()} AFTER {event} ON templates
+        BEGIN
+            UPDATE data_versions SET version = version + 1 WHERE name = 'catalog';
+        END""")
+
+@migration(5)
+def add_image_registry(cur):
+    """Registry of uploaded images so pages never stat static/uploads"""
+    cur.execute("""CREATE TABLE IF NOT EXISTS images(
+        filename TEXT PRIMARY KEY,
+        size INTEGER NOT NULL,
+        width INTEGER,
+        height INTEGER,
+        sha256 TEXT NOT NULL,
+        mtime REAL NOT NULL,
+        updated TEXT DEFAULT CURRENT_TIMESTAMP
+    )""")
+    # Template cards show the image only when it is registered
+    for event in ("INSERT", "UPDATE", "DELETE"):
+        cur.execute(f"""CREATE TRIGGER IF NOT EXISTS trg_catalog_version_image_{event.lower()} AFTER {event} ON images
+        BEGIN
+            UPDATE data_versions SET version = version + 1 WHERE name = 'catalog';
+        END""")
+    scan_images(cur)
+
+def image_dimensions(data):
+    """(width, height) from a PNG, GIF, JPEG or WebP header, or (None, None)"""
+    if data[:8] == b"\x89PNG\r\n\x1a\n" and len(data) >= 24:
+        return int.from_bytes(data[16:20], "big"), int.from_bytes(data[20:24], "big")
+    if data[:6] in (b"GIF87a", b"GIF89a") and len(data) >= 10:
+        return int.from_bytes(data[6:8], "little"), int.from_bytes(data[8:10], "little")
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP" and len(data) >= 30:
+        chunk = data[12:16]
+        if chunk == b"VP8 ":
+            return int.from_bytes(data[26:28], "little") & 0x3fff, int.from_bytes(data[28:30], "little") & 0x3fff
+        if chunk == b"VP8L":
+            bits = int.from_bytes(data[21:25], "little")
+            return (bits & 0x3fff) + 1, ((bits >> 14) & 0x3fff) + 1
+        if chunk == b"VP8X":
+            return int.from_bytes(data[24:27], "little") + 1, int.from_bytes(data[27:30], "little") + 1
+    if data[:2] == b"\xff\xd8":
+        i = 2
+        while i + 9 < len(data):
+            if data[i] != 0xff:
+                i += 1
+                continue
+            marker = data[i + 1]
+            if marker in (0xd8, 0x01) or 0xd0 <= marker <= 0xd7 or marker == 0xff:
+                i += 1 if marker == 0xff else 2
+                continue
+            length = int.from_bytes(data[i + 2:i + 4], "big")
+            # Start-of-frame markers carry the dimensions; C4, C8 and CC are not frames
+            if 0xc0 <= marker <= 0xcf and marker not in (0xc4, 0xc8, 0xcc):
+                return int.from_bytes(data[i + 7:i + 9], "big"), int.from_bytes(data[i + 5:i + 7], "big")
+            i += 2 + length
+    return None, None
+
+def register_image(cur, filename):
+    """Record an uploaded file's size, dimensions, hash and mtime; returns False if it is missing"""
+    path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+    try:
+        stat = os.stat(path)
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError:
+        unregister_image(cur, filename)
+        return False
+    width, height = image_dimensions(data)
+    cur.execute("""INSERT OR REPLACE INTO images(filename, size, width, height, sha256, mtime)
+        VALUES(?,?,?,?,?,?)""", (filename, stat.st_size, width, height, hashlib.sha256(data).hexdigest(), stat.st_mtime))
+    return True
+
+def unregister_image(cur, filename):
+    cur.execute("DELETE FROM images WHERE filename=?", (filename,))
+
+def release_image(cur, filename, template_id):
+    """Delete a template's image file and registry entry, unless another template still shows the same file"""
+    cur.execute("SELECT 1 FROM templates WHERE image_url=? AND id<>?", (filename, template_id))
+    if cur.fetchone():
+        return
+    try:
+        os.remove(os.path.join(app.config['UPLOAD_FOLDER'], filename))
+    except OSError:
+        pass
+    unregister_image(cur, filename)
+
+def scan_images(cur):
+    """Bring the registry in line with static/uploads; returns the (registered, removed) file names"""
+    folder = app.config['UPLOAD_FOLDER']
+    known = {row[0]: row[1:] for row in cur.execute("SELECT filename, size, mtime FROM images")}
+    registered = []
+    on_disk = set()
+    if os.path.isdir(folder):
+        for entry in os.scandir(folder):
+            if not entry.is_file():
+                continue
+            on_disk.add(entry.name)
+            stat = entry.stat()
+            if known.get(entry.name) != (stat.st_size, stat.st_mtime) and register_image(cur, entry.name):
+                registered.append(entry.name)
+    removed = [name for name in known if name not in on_disk]
+    for name in removed:
+        unregister_image(cur, name)
+    return registered, removed
+
+@app.cli.command("scan-images")
+def scan_images_command():
+    """Register new or changed files in static/uploads and drop missing ones"""
+    con = db()
+    cur = con.cursor()
+    cur.execute("BEGIN IMMEDIATE")
+    registered, removed = scan_images(cur)
+    for filename in registered:
+        build_image_variants(cur, filename)
+    pruned = prune_image_variants(cur)
+    con.commit()
+    print(f"✓ Registered {len(registered)} images, removed {len(removed)} missing, pruned {pruned} variant files")
+
+# Resized renditions of each uploaded image: name -> (width in CSS pixels x density)
+IMAGE_VARIANTS = {
+    "card": 400,     # .template-image at 1x
+    "card2x": 800,   # .template-image at 2x
+    "preview": 160,  # admin .image-preview (80px) at 2x
+}
+# Formats Pillow writes for the original upload; anything else falls back to PNG
+IMAGE_SOURCE_FORMATS = {"JPEG": ".jpg", "PNG": ".png", "WEBP": ".webp"}
+
+@migration(6)
+def add_image_variants(cur):
+    """Resized and WebP variants of registered images"""
+    cur.execute("""CREATE TABLE IF NOT EXISTS image_variants(
+        filename TEXT NOT NULL,
+        variant TEXT NOT NULL,
+        format TEXT NOT NULL,
+        width INTEGER NOT NULL,
+        height INTEGER NOT NULL,
+        size INTEGER NOT NULL,
+        path TEXT NOT NULL,
+        PRIMARY KEY(filename, variant, format)
+    )""")
+    cur.execute("""CREATE TRIGGER IF NOT EXISTS trg_image_variants_unregister AFTER DELETE ON images
+    BEGIN
+        DELETE FROM image_variants WHERE filename = OLD.filename;
+    END""")
+    for event in ("INSERT", "DELETE"):
+        cur.execute(f"""CREATE TRIGGER IF NOT EXISTS trg_catalog_version_variant_{event.lower()} AFTER {event} ON image_variants
+        BEGIN
+            UPDATE data_versions SET version = version + 1 WHERE name = 'catalog';
+        END""")
+    for (filename,) in cur.execute("SELECT filename FROM images").fetchall():
+        build_image_variants(cur, filename)
+
+def build_image_variants(cur, filename):
+    """Write content-addressed resizes of an uploaded image in WebP and its own format; returns the count"""
+    if Image is None:
+        return 0
+    try:
+        with Image.open(os.path.join(app.config['UPLOAD_FOLDER'], filename)) as source:
+            source.load()
+    except (OSError, Image.DecompressionBombError):
+        return 0  # not an image Pillow can read (or an empty placeholder)
+    cur.execute("DELETE FROM image_variants WHERE filename=?", (filename,))
+    own_ext = IMAGE_SOURCE_FORMATS.get(source.format, ".png")
+    if source.mode not in ("RGB", "RGBA", "L"):
+        # Palette, CMYK and the rest: resize in true colour (palettes only resize nearest-neighbour)
+        # and in a mode every variant format can write
+        source = source.convert("RGBA" if source.mode.endswith(("A", "a")) or "transparency" in source.info else "RGB")
+    count = 0
+    for variant, width in IMAGE_VARIANTS.items():
+        if source.width <= width:
+            continue  # never upscale; the original is already small enough
+        height = max(1, round(source.height * width / source.width))
+        resized = source.resize((width, height), Image.LANCZOS)
+        for ext in dict.fromkeys((".webp", own_ext)):
+            try:
+                data = encode_image(resized, ext)
+            except (OSError, ValueError) as e:
+                print(f"! could not encode the {variant} {ext} variant of {filename}: {e}")
+                continue
+            path = write_content_addressed(app.config['IMAGE_VARIANT_FOLDER'], data, ext)
+            cur.execute("""INSERT INTO image_variants(filename, variant, format, width, height, size, path)
+                VALUES(?,?,?,?,?,?,?)""", (filename, variant, ext.lstrip("."), width, height, len(data), path))
+            count += 1
+    return count
+
+def encode_image(image, ext):
+    out = io.BytesIO()
+    quality = app.config['IMAGE_VARIANT_QUALITY']
+    if ext == ".jpg":
+        image.convert("RGB").save(out, "JPEG", quality=quality, optimize=True, progressive=True)
+    elif ext == ".webp":
+        image.save(out, "WEBP", quality=quality, method=6)
+    else:
+        image.save(out, "PNG", optimize=True)
+    return out.getvalue()
+
+def write_content_addressed(folder, data, ext):
+    """Store data under its own hash so identical renditions are written once; returns the file name"""
+    name = hashlib.sha256(data).hexdigest()[:16] + ext
+    path = os.path.join(folder, name)
+    if not os.path.exists(path):
+        os.makedirs(folder, exist_ok=True)
+        write_file_atomic(path, data)
+    return name
+
+def prune_image_variants(cur):
+    """Delete variant files no registered image refers to; returns how many"""
+    folder = app.config['IMAGE_VARIANT_FOLDER']
+    if not os.path.isdir(folder):
+        return 0
+    referenced = {row[0] for row in cur.execute("SELECT path FROM image_variants")}
+    pruned = 0
+    for entry in os.scandir(folder):
+        if entry.is_file() and entry.name not in referenced:
+            os.remove(entry.path)
+            pruned += 1
+    return pruned
+
+@app.cli.command("build-image-variants")
+def build_image_variants_command():
+    """Regenerate resized variants for every registered image"""
+    if Image is None:
+        raise SystemExit("Pillow is not installed")
+    con = db()
+    cur = con.cursor()
+    cur.execute("BEGIN IMMEDIATE")
+    filenames = [row[0] for row in cur.execute("SELECT filename FROM images").fetchall()]
+    built = sum(build_image_variants(cur, filename) for filename in filenames)
+    pruned = prune_image_variants(cur)
+    con.commit()
+    print(f"✓ Built {built} variants for {len(filenames)} images, pruned {pruned} unused files")
+
+@migration(7)
+def add_user_versions(cur):
+    """Per-user order and notification versions for conditional GET"""
+    cur.execute("ALTER TABLE user_counters ADD COLUMN orders_version INTEGER NOT NULL DEFAULT 0")
+    cur.execute("ALTER TABLE user_counters ADD COLUMN notifications_version INTEGER NOT NULL DEFAULT 0")
+    for table, column in (("orders", "orders_version"), ("notifications", "notifications_version")):
+        for event, row in (("INSERT", "NEW"), ("UPDATE", "NEW"), ("DELETE", "OLD")):
+            cur.execute(f"""CREATE TRIGGER IF NOT EXISTS trg_{column}_{event.lower()} AFTER {event} ON {table}
+            BEGIN
+                INSERT OR IGNORE INTO user_counters(user_id) VALUES({row}.user_id);
+                UPDATE user_counters SET {column} = {column} + 1 WHERE user_id = {row}.user_id;
+            END""")
+
+@migration(8)
+def add_website_archives(cur):
+    """Prebuilt download archives and the site content they were built from"""
+    cur.execute("""CREATE TABLE IF NOT EXISTS website_archives(
+        order_id INTEGER PRIMARY KEY,
+        content_hash TEXT NOT NULL,
+        size INTEGER NOT NULL,
+        built TEXT DEFAULT CURRENT_TIMESTAMP
+    )""")
+
+@migration(9)
+def add_chunked_uploads(cur):
+    """Chunked, resumable uploads of website folders"""
+    cur.execute("""CREATE TABLE IF NOT EXISTS uploads(
+        id TEXT PRIMARY KEY,
+        order_id INTEGER NOT NULL,
+        filename TEXT NOT NULL,
+        size INTEGER NOT NULL,
+        chunk_size INTEGER NOT NULL,
+        sha256 TEXT,
+        created_by INTEGER,
+        created REAL NOT NULL,
+        finalized REAL
+    )""")
+    cur.execute("""CREATE TABLE IF NOT EXISTS upload_chunks(
+        upload_id TEXT NOT NULL,
+        idx INTEGER NOT NULL,
+        size INTEGER NOT NULL,
+        sha256 TEXT NOT NULL,
+        PRIMARY KEY(upload_id, idx)
+    )""")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_uploads_created ON uploads(created)")
+
+@migration(10)
+def add_job_queue(cur):
+    """Durable job queue, dead letters and order submission states"""
+    cur.execute("""CREATE TABLE IF NOT EXISTS jobs(
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        kind TEXT NOT NULL,
+        payload TEXT NOT NULL,
+        key TEXT,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        max_attempts INTEGER NOT NULL,
+        run_at REAL NOT NULL,
+        locked_by TEXT,
+        locked_until REAL,
+        last_error TEXT,
+        created REAL NOT NULL
+    )""")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_jobs_run_at ON jobs(run_at)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_jobs_key ON jobs(key)")
+    cur.execute("""CREATE TABLE IF NOT EXISTS dead_jobs(
+        id INTEGER PRIMARY KEY,
+        kind TEXT NOT NULL,
+        payload TEXT NOT NULL,
+        attempts INTEGER NOT NULL,
+        last_error TEXT,
+        created REAL NOT NULL,
+        failed REAL NOT NULL
+    )""")
+    # NULL for orders submitted before the queue existed; otherwise
+    # queued -> extracting -> archiving -> ready, or failed
+    cur.execute("ALTER TABLE orders ADD COLUMN submission_state TEXT")
+    cur.execute("ALTER TABLE orders ADD COLUMN submission_error TEXT")
+
+@migration(11)
+def add_website_manifests(cur):
+    """Per-order manifests of website files kept in the blob store"""
+    # Existing sites are moved into the store by their next archive build
+    # (`flask build-archives` does all of them)
+    cur.execute("""CREATE TABLE IF NOT EXISTS website_manifests(
+        order_id INTEGER NOT NULL,
+        path TEXT NOT NULL,
+        sha256 TEXT NOT NULL,
+        size INTEGER NOT NULL,
+        mtime REAL NOT NULL,
+        PRIMARY KEY(order_id, path)
+    )""")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_website_manifests_sha256 ON website_manifests(sha256)")
+
+@migration(12)
+def add_delta_submissions(cur):
+    """Resubmissions that upload only the files the blob store lacks"""
+    cur.execute("""CREATE TABLE IF NOT EXISTS delta_submissions(
+        id TEXT PRIMARY KEY,
+        order_id INTEGER NOT NULL,
+        manifest TEXT NOT NULL,
+        created_by INTEGER,
+        created REAL NOT NULL,
+        applied REAL
+    )""")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_delta_submissions_created ON delta_submissions(created)")
+
+@migration(13)
+def add_job_lanes(cur):
+    """Job lanes, so one order's submission jobs run one at a time"""
+    cur.execute("ALTER TABLE jobs ADD COLUMN lane TEXT")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_jobs_lane ON jobs(lane, id)")
+
+@migration(14)
+def index_message_authors(cur):
+    """Index messages by author, so foreign key checks on users don't scan every message"""
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_messages_user ON messages(user_id)")
+
+@migration(15)
+def add_website_folder_signatures(cur):
+    """Stat signature of each site folder as of its manifest, so archive builds skip the folder walk"""
+    # Sites without one are walked by their next archive build, as before
+    cur.execute("""CREATE TABLE IF NOT EXISTS website_folders(
+        order_id INTEGER PRIMARY KEY,
+        signature TEXT NOT NULL
+    )""")
+
 # Initialize database only once
-init_db()
+with app.app_context():
+    init_db()
 
 # ---------------- USER ----------------
 class User(UserMixin):
@@ -158,55 +965,642 @@ def load_user(user_id):
     cur = con.cursor()
     cur.execute("SELECT id, email, role, fullname FROM users WHERE id=?", (user_id,))
     u = cur.fetchone()
-    con.close()
     return User(u[0], u[1], u[2], u[3]) if u else None
 
 # ---------------- HELPER FUNCTIONS ----------------
+def get_data_version(name):
+    """Current value of a data_versions counter, read at most once per request"""
+    versions = g.setdefault("data_versions", {})
+    if name not in versions:
+        con = db()
+        cur = con.cursor()
+        cur.execute("SELECT version FROM data_versions WHERE name=?", (name,))
+        row = cur.fetchone()
+        versions[name] = row[0] if row else 0
+    return versions[name]
+
+# A templates row with features split into a list, the price a customer pays
+# and the registered image (None when the file is missing)
+CatalogTemplate = namedtuple("CatalogTemplate", "id name description category features original_price discount_price has_discount tag image_url preview_url status created price image")
+# variants maps IMAGE_VARIANTS names to {format: (file name, width)}
+ImageInfo = namedtuple("ImageInfo", "filename width height variants")
+
+class CatalogCache:
+    """Active templates decoded once per catalog version and shared by all requests in a worker"""
+
+    def __init__(self):
+        self._entry = (None, [])
+        self._lock = threading.Lock()
+
+    def get(self):
+        version = get_data_version("catalog")
+        cached_version, templates = self._entry
+        if cached_version == version:
+            return templates
+        with self._lock:
+            if self._entry[0] != version:
+                self._entry = (version, self._load())
+            return self._entry[1]
+
+    def _load(self):
+        con = db()
+        cur = con.cursor()
+        cur.execute("""SELECT t.*, i.filename, i.width, i.height FROM templates t
+            LEFT JOIN images i ON i.filename = t.image_url
+            WHERE t.status=1 ORDER BY t.id DESC""")
+        rows = cur.fetchall()
+        variants = {}
+        cur.execute("""SELECT v.filename, v.variant, v.format, v.width, v.path FROM templates t
+            JOIN image_variants v ON v.filename = t.image_url WHERE t.status=1""")
+        for filename, variant, format, width, path in cur.fetchall():
+            variants.setdefault(filename, {}).setdefault(variant, {})[format] = (path, width)
+        templates = []
+        for row in rows:
+            id, name, description, category, features_str, original_price, discount_price, has_discount, tag, image_url, preview_url, status, created, image_file, width, height = row
+            features = features_str.split(',') if features_str else []
+            price = discount_price if has_discount else original_price
+            image = ImageInfo(image_file, width, height, variants.get(image_file, {})) if image_file else None
+            templates.append(CatalogTemplate(id, name, description, category, features, original_price, discount_price, has_discount, tag, image_url, preview_url, status, created, price, image))
+        return templates
+
+catalog_cache = CatalogCache()
+
 def get_all_templates():
-    con = db()
-    cur = con.cursor()
-    cur.execute("SELECT * FROM templates WHERE status=1 ORDER BY id DESC")
-    templates = cur.fetchall()
-    con.close()
-    return templates
+    return catalog_cache.get()
+
+class FragmentCache:
+    """Rendered HTML fragments in an LRU bounded by total size in bytes"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_or_render(self, key, render):
+        with self._lock:
+            html = self._entries.get(key)
+            if html is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return html
+            self.misses += 1
+        html = render()
+        self.put(key, html)
+        return html
+
+    def put(self, key, html):
+        size = len(html.encode())
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= len(old.encode())
+            self._entries[key] = html
+            self._size += size
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted.encode())
+                self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+fragment_cache = FragmentCache(app.config['FRAGMENT_CACHE_MAX_BYTES'])
+
+def get_template_cards(member):
+    """Card grid HTML for the catalog; members get order links, visitors a login prompt"""
+    version = get_data_version("catalog")
+    variant = "member" if member else "anonymous"
+    return fragment_cache.get_or_render(("template_cards", variant, version),
+                                        lambda: render_template_cards(get_all_templates(), member))
+
+def image_variant_url(path):
+    return IMAGE_VARIANT_URL_PREFIX + path
+
+def picture_html(image, alt, names, sizes):
+    """<picture> offering WebP and original-format srcsets built from the named variants"""
+    url = f"/static/uploads/{image.filename}"
+    size_attrs = f' width="{image.width}" height="{image.height}"' if image.width else ""
+    srcsets = {}
+    for name in names:
+        for format, (path, width) in image.variants.get(name, {}).items():
+            srcsets.setdefault(format, []).append(f"{image_variant_url(path)} {width}w")
+    if not srcsets:
+        return f'<img src="{url}" alt="{alt}"{size_attrs}>'
+    if image.width and not all(name in image.variants for name in names):
+        # Too small for the larger resizes, so the upload itself covers high densities in every srcset
+        for candidates in srcsets.values():
+            candidates.append(f"{url} {image.width}w")
+    webp = srcsets.pop("webp", None)
+    fallback = next(iter(srcsets.values()), webp)
+    source_html = f'<source type="image/webp" srcset="{", ".join(webp)}" sizes="{sizes}">' if webp and srcsets else ""
+    src = fallback[0].split(" ")[0]
+    return (f'<picture>{source_html}<img src="{src}" srcset="{", ".join(fallback)}" sizes="{sizes}" '
+            f'alt="{alt}"{size_attrs} loading="lazy" decoding="async"></picture>')
+
+def render_template_cards(templates, member):
+    template_cards = ""
+    for template in templates:
+        id, name, description, category, features, original_price, discount_price, has_discount, tag, image_url, preview_url, status, created, price, image = template
+        
+        price_html = ""
+        if has_discount:
+            price_html = f'''
+            <div class="template-price">
+                <span class="original-price">${original_price}</span>
+                <span class="discount-price">${discount_price}</span>
+            </div>
+            '''
+        else:
+            price_html = f'''
+            <div class="template-price">
+                <span class="discount-price">${original_price}</span>
+            </div>
+            '''
+        
+        tag_html = f'<div class="template-badge">{tag}</div>' if tag else ""
+        
+        features_html = "".join([f'<li><i class="fas fa-check"></i> {feature}</li>' for feature in features[:3]])
+        
+        if image:
+            image_html = picture_html(image, name, ("card", "card2x"), "(max-width: 768px) 100vw, 400px")
+        else:
+            image_html = f'<i class="fas fa-image fa-3x"></i><p class="mt-2">{name}</p>'
+        
+        if member:
+            buttons_html = f'''
+                    <a href="{preview_url}" target="_blank" class="template-button preview-button">
+                        <i class="fas fa-eye me-2"></i>Preview Web
+                    </a>
+                    <a href="/order-template/{id}" class="template-button">
+                        <i class="fas fa-shopping-cart me-2"></i>Order Now
+                    </a>'''
+        else:
+            buttons_html = f'''
+                    <a href="{preview_url}" target="_blank" class="template-button preview-button">
+                        <i class="fas fa-eye me-2"></i>Preview
+                    </a>
+                    <a href="/login" class="template-button" onclick="showNotification('info', 'Login Required', 'Please login to order templates'); return false;">
+                        <i class="fas fa-shopping-cart me-2"></i>Order Now
+                    </a>'''
+        
+        template_cards += f'''
+        <div class="template-card">
+            <div class="template-image">
+                {image_html}
+                {tag_html}
+                {price_html}
+            </div>
+            <div class="template-content">
+                <h3 class="template-title">{name}</h3>
+                <p class="template-description">{description}</p>
+                <ul class="template-features">
+                    {features_html}
+                </ul>
+                <div class="template-buttons">{buttons_html}
+                </div>
+            </div>
+        </div>
+        '''
+    return template_cards
 
 def get_template_by_id(template_id):
     con = db()
     cur = con.cursor()
     cur.execute("SELECT * FROM templates WHERE id=?", (template_id,))
     template = cur.fetchone()
-    con.close()
     return template
 
-def get_unread_notifications_count(user_id):
+def get_user_counters(user_id):
+    """(unread_notifications, unread_orders, completed_websites, total_orders), maintained by triggers"""
     con = db()
     cur = con.cursor()
-    cur.execute("SELECT COUNT(*) FROM notifications WHERE user_id=? AND is_read=0", (user_id,))
-    count = cur.fetchone()[0]
-    con.close()
-    return count
+    cur.execute("SELECT unread_notifications, unread_orders, completed_websites, total_orders FROM user_counters WHERE user_id=?", (user_id,))
+    return cur.fetchone() or (0, 0, 0, 0)
+
+def get_unread_notifications_count(user_id):
+    return get_user_counters(user_id)[0]
 
 def get_completed_websites_count(user_id):
-    con = db()
-    cur = con.cursor()
-    cur.execute("SELECT COUNT(*) FROM orders WHERE user_id=? AND folder_submitted=1", (user_id,))
-    count = cur.fetchone()[0]
-    con.close()
-    return count
+    return get_user_counters(user_id)[2]
 
 def get_unread_orders_count(user_id):
-    con = db()
-    cur = con.cursor()
-    # Get orders with unread notifications
-    cur.execute("""
-        SELECT COUNT(DISTINCT o.id) 
-        FROM orders o 
-        JOIN notifications n ON o.user_id = n.user_id 
-        WHERE o.user_id=? AND n.is_read=0 AND n.message LIKE '%' || o.order_id || '%'
-    """, (user_id,))
-    count = cur.fetchone()[0]
-    con.close()
-    return count
+    return get_user_counters(user_id)[1]
+
+# ---------------- STATIC ASSETS ----------------
+def minify_css(css):
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+    css = re.sub(r"\s+", " ", css)
+    css = re.sub(r"\s*([{}:;,>])\s*", r"\1", css)
+    return css.replace(";}", "}").strip()
+
+def minify_js(js):
+    # Conservative: keep line breaks so automatic semicolon insertion is unaffected
+    lines = [line.strip() for line in js.splitlines()]
+    return "\n".join(line for line in lines if line and not line.startswith("//"))
+
+MINIFIERS = {".css": minify_css, ".js": minify_js}
+
+# Already-compressed formats gain nothing from a .gz/.br sibling
+PRECOMPRESS_EXTENSIONS = {".css", ".js", ".svg", ".json", ".html", ".txt", ".ttf"}
+
+def write_fingerprinted(folder, base, ext, data):
+    """Store data as <base>.<hash><ext> with .gz/.br siblings and return the file name"""
+    name = f"{base}.{hashlib.sha256(data).hexdigest()[:12]}{ext}"
+    path = os.path.join(folder, name)
+    if not os.path.exists(path):
+        if ext in PRECOMPRESS_EXTENSIONS:
+            write_file_atomic(path + ".gz", gzip.compress(data, 9, mtime=0))
+            if brotli:
+                write_file_atomic(path + ".br", brotli.compress(data, quality=11))
+        write_file_atomic(path, data)
+    return name
+
+# Fingerprinted build output, served by the static route with an immutable Cache-Control
+ASSET_FOLDER = os.path.join(app.static_folder, 'dist')
+ASSET_URL_PREFIX = f"{app.static_url_path}/dist/"
+VENDOR_FOLDER = os.path.join(app.static_folder, 'vendor')
+VENDOR_URL_PREFIX = f"{app.static_url_path}/vendor/"
+IMAGE_VARIANT_URL_PREFIX = "/static/uploads/variants/"  # content-addressed, see build_image_variants
+
+def build_assets():
+    """Minify the layout assets into content-hashed files and return the manifest"""
+    source_folder = app.config['ASSET_SOURCE_FOLDER']
+    output_folder = ASSET_FOLDER
+    os.makedirs(output_folder, exist_ok=True)
+    
+    manifest = {}
+    for name in sorted(os.listdir(source_folder)):
+        base, ext = os.path.splitext(name)
+        if ext not in MINIFIERS:
+            continue
+        with open(os.path.join(source_folder, name), encoding="utf-8") as f:
+            data = MINIFIERS[ext](f.read()).encode("utf-8")
+        manifest[name] = write_fingerprinted(output_folder, base, ext, data)
+    
+    write_file_atomic(os.path.join(output_folder, "manifest.json"), json.dumps(manifest, indent=2).encode("utf-8"))
+    return manifest
+
+# Built at import so every worker serves the fingerprints matching the sources it was deployed with
+ASSET_MANIFEST = build_assets()
+
+@app.template_global()
+def asset_url(name):
+    return ASSET_URL_PREFIX + ASSET_MANIFEST[name]
+
+@app.after_request
+def cache_fingerprinted_assets(response):
+    # The file name changes whenever the content does, so browsers may keep it forever
+    if request.path.startswith((ASSET_URL_PREFIX, VENDOR_URL_PREFIX, IMAGE_VARIANT_URL_PREFIX)) and response.status_code in (200, 304):
+        response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
+@app.cli.command("build-assets")
+def build_assets_command():
+    """Rebuild static/dist and print source vs minified sizes"""
+    for name, built_name in build_assets().items():
+        source_size = os.path.getsize(os.path.join(app.config['ASSET_SOURCE_FOLDER'], name))
+        built_size = os.path.getsize(os.path.join(ASSET_FOLDER, built_name))
+        print(f"{name:<12} {source_size:>8} -> {built_size:>8} bytes  {built_name}")
+
+# ---------------- VENDOR ASSETS ----------------
+# Pinned upstream files for the self-hosted bundle in static/vendor. 'flask build-vendor'
+# downloads them (or reads them from --source on machines without internet access),
+# strips what the app does not use and writes fingerprinted, precompressed copies.
+VENDOR_SOURCES = {
+    "bootstrap.min.css": "https://cdn.jsdelivr.net/npm/bootstrap@5.3.2/dist/css/bootstrap.min.css",
+    "bootstrap.bundle.min.js": "https://cdn.jsdelivr.net/npm/bootstrap@5.3.2/dist/js/bootstrap.bundle.min.js",
+    "all.min.css": "https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/css/all.min.css",
+    "fa-solid-900.woff2": "https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/webfonts/fa-solid-900.woff2",
+    "fa-regular-400.woff2": "https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/webfonts/fa-regular-400.woff2",
+    "fa-brands-400.woff2": "https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/webfonts/fa-brands-400.woff2",
+}
+# display-6 uses 300, the layout CSS uses 500-800
+POPPINS_WEIGHTS = [300, 400, 500, 600, 700, 800]
+for weight in POPPINS_WEIGHTS:
+    VENDOR_SOURCES[f"poppins-{weight}.woff2"] = f"https://cdn.jsdelivr.net/npm/@fontsource/poppins@5.0.8/files/poppins-latin-{weight}-normal.woff2"
+# Basic Latin, Latin-1 and typographic punctuation
+POPPINS_UNICODES = list(range(0x20, 0x7F)) + list(range(0xA0, 0x100)) + [0x2013, 0x2014, 0x2018, 0x2019, 0x201C, 0x201D, 0x2022, 0x2026, 0x20AC]
+
+# Used by the layout until the bundle has been built
+VENDOR_CDN_FALLBACK = {
+    "bootstrap.css": VENDOR_SOURCES["bootstrap.min.css"],
+    "bootstrap.js": VENDOR_SOURCES["bootstrap.bundle.min.js"],
+    "fontawesome.css": VENDOR_SOURCES["all.min.css"],
+    "poppins.css": "https://fonts.googleapis.com/css2?family=Poppins:wght@300;400;500;600;700;800;900&display=swap",
+}
+
+def load_vendor_manifest():
+    try:
+        with open(os.path.join(VENDOR_FOLDER, "manifest.json"), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+VENDOR_MANIFEST = load_vendor_manifest()
+
+@app.template_global()
+def vendor_url(name):
+    if name in VENDOR_MANIFEST:
+        return VENDOR_URL_PREFIX + VENDOR_MANIFEST[name]
+    return VENDOR_CDN_FALLBACK[name]
+
+def split_css_blocks(css):
+    """Yield (prelude, body) for each top-level rule; body is None for statements like @charset"""
+    depth = start = 0
+    prelude = None
+    i = 0
+    while i < len(css):
+        ch = css[i]
+        if ch in "\"'":
+            i += 1
+            while css[i] != ch:
+                i += 2 if css[i] == "\\" else 1
+        elif css.startswith("/*", i):
+            i = css.index("*/", i) + 1
+            if depth == 0:
+                start = i + 1
+        elif ch == "{":
+            if depth == 0:
+                prelude = css[start:i].strip()
+                start = i + 1
+            depth += 1
+        elif ch == "}":
+            depth -= 1
+            if depth == 0:
+                yield prelude, css[start:i]
+                start = i + 1
+        elif ch == ";" and depth == 0:
+            yield css[start:i].strip(), None
+            start = i + 1
+        i += 1
+
+def split_selectors(prelude):
+    selectors, depth, start = [], 0, 0
+    for i, ch in enumerate(prelude):
+        if ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+        elif ch == "," and depth == 0:
+            selectors.append(prelude[start:i])
+            start = i + 1
+    selectors.append(prelude[start:])
+    return selectors
+
+def purge_css(css, used, used_prefixes=()):
+    """Drop selectors whose class names never appear in the app (a minimal PurgeCSS)"""
+    def is_used(cls):
+        return cls in used or cls.startswith(used_prefixes)
+    out = []
+    for prelude, body in split_css_blocks(css):
+        if body is None:
+            out.append(prelude + ";")
+        elif prelude.startswith(("@media", "@supports", "@layer", "@container")):
+            inner = purge_css(body, used, used_prefixes)
+            if inner:
+                out.append(prelude + "{" + inner + "}")
+        elif prelude.startswith("@"):
+            out.append(prelude + "{" + body + "}")
+        else:
+            selectors = [s for s in split_selectors(prelude)
+                         if all(is_used(cls) for cls in re.findall(r"\.(-?[_a-zA-Z][\w-]*)", s))]
+            if selectors:
+                out.append(",".join(selectors) + "{" + body + "}")
+    return "".join(out)
+
+def used_css_classes():
+    """Every class-like token in main.py and the layout assets, plus prefixes built in f-strings"""
+    with open(os.path.abspath(__file__), encoding="utf-8") as f:
+        text = f.read()
+    for name in os.listdir(app.config['ASSET_SOURCE_FOLDER']):
+        with open(os.path.join(app.config['ASSET_SOURCE_FOLDER'], name), encoding="utf-8") as f:
+            text += f.read()
+    used = set(re.findall(r"[A-Za-z_][\w-]*", text))
+    prefixes = tuple(set(re.findall(r"([a-z][\w-]*-)\{", text)))
+    return used, prefixes
+
+def subset_font(data, unicodes):
+    try:
+        from fontTools import subset
+        from fontTools.ttLib import TTFont, TTLibError
+    except ImportError:  # optional: ship the full font
+        print("! fonttools not installed, fonts are not subset")
+        return data
+    try:
+        font = TTFont(io.BytesIO(data))
+        options = subset.Options()
+        options.flavor = "woff2"
+        options.layout_features = ["*"]
+        subsetter = subset.Subsetter(options)
+        subsetter.populate(unicodes=unicodes)
+        subsetter.subset(font)
+        out = io.BytesIO()
+        font.save(out)
+    except TTLibError as e:
+        print(f"! could not subset font ({e}), shipping it whole")
+        return data
+    return out.getvalue()
+
+def fetch_vendor_sources(source_dir=None):
+    files = {}
+    for name, url in VENDOR_SOURCES.items():
+        if source_dir:
+            with open(os.path.join(source_dir, name), "rb") as f:
+                files[name] = f.read()
+        else:
+            with urllib.request.urlopen(url, timeout=30) as r:
+                files[name] = r.read()
+    return files
+
+def build_vendor(source_dir=None, files=None):
+    """Build the self-hosted Bootstrap / Font Awesome / Poppins bundle and return the manifest
+
+    files are the VENDOR_SOURCES contents when the caller already fetched them.
+    """
+    if files is None:
+        files = fetch_vendor_sources(source_dir)
+    used, prefixes = used_css_classes()
+    os.makedirs(VENDOR_FOLDER, exist_ok=True)
+    manifest = {}
+
+    css = files["bootstrap.min.css"].decode("utf-8")
+    manifest["bootstrap.css"] = write_fingerprinted(VENDOR_FOLDER, "bootstrap", ".css", purge_css(css, used, prefixes).encode("utf-8"))
+    # The JS bundle is one prebuilt IIFE; there is nothing to shake without the sources
+    manifest["bootstrap.js"] = write_fingerprinted(VENDOR_FOLDER, "bootstrap.bundle", ".js", files["bootstrap.bundle.min.js"])
+
+    # Font Awesome: keep only the icon rules the app uses and subset the fonts to their glyphs
+    css = purge_css(files["all.min.css"].decode("utf-8"), used)
+    codepoints = sorted({int(cp, 16) for cp in re.findall(r'content:"\\([0-9a-f]{4,5})"', css)})
+    font_names = {}
+    for name in ("fa-solid-900", "fa-regular-400", "fa-brands-400"):
+        font_names[name] = write_fingerprinted(VENDOR_FOLDER, name, ".woff2", subset_font(files[name + ".woff2"], codepoints))
+        manifest[name + ".woff2"] = font_names[name]
+
+    def rewrite_font_face(match):
+        font = re.search(r"webfonts/([\w-]+)\.woff2", match.group(0))
+        if not font or font.group(1) not in font_names:
+            return ""  # v4 compatibility faces the app never uses
+        return re.sub(r"src:[^;}]+", f'src:url({font_names[font.group(1)]}) format("woff2")', match.group(0))
+    css = re.sub(r"@font-face\{[^}]*\}", rewrite_font_face, css)
+    manifest["fontawesome.css"] = write_fingerprinted(VENDOR_FOLDER, "fontawesome", ".css", css.encode("utf-8"))
+
+    faces = []
+    for weight in POPPINS_WEIGHTS:
+        font_name = write_fingerprinted(VENDOR_FOLDER, f"poppins-{weight}", ".woff2", subset_font(files[f"poppins-{weight}.woff2"], POPPINS_UNICODES))
+        manifest[f"poppins-{weight}.woff2"] = font_name
+        faces.append(f'@font-face{{font-family:"Poppins";font-style:normal;font-weight:{weight};font-display:swap;src:url({font_name}) format("woff2")}}')
+    manifest["poppins.css"] = write_fingerprinted(VENDOR_FOLDER, "poppins", ".css", "".join(faces).encode("utf-8"))
+
+    write_file_atomic(os.path.join(VENDOR_FOLDER, "manifest.json"), json.dumps(manifest, indent=2).encode("utf-8"))
+    return manifest
+
+@app.cli.command("build-vendor")
+@click.option("--source", type=click.Path(exists=True, file_okay=False), help="Directory holding the VENDOR_SOURCES files instead of downloading them")
+def build_vendor_command(source):
+    """Build the self-hosted vendor bundle in static/vendor"""
+    files = fetch_vendor_sources(source)
+    upstream = sum(len(data) for data in files.values())
+    manifest = build_vendor(files=files)
+    # Only this build's files; VENDOR_FOLDER keeps the fingerprinted files of earlier builds
+    built = sum(os.path.getsize(os.path.join(VENDOR_FOLDER, name)) for name in manifest.values())
+    for name, built_name in manifest.items():
+        print(f"{name:<16} {built_name}")
+    print(f"✓ {upstream} bytes upstream -> {built} bytes self-hosted (before gzip/brotli)")
+
+# ---------------- COMPRESSION ----------------
+COMPRESSIBLE_MIMETYPES = {
+    "text/html", "text/css", "text/plain", "text/javascript", "text/xml", "text/csv",
+    "application/javascript", "application/json", "application/xml", "image/svg+xml"
+}
+ENCODING_SUFFIXES = {"br": ".br", "gzip": ".gz"}
+
+class CompressionMiddleware:
+    """Negotiates brotli/gzip: prebuilt .br/.gz siblings for static files, on-the-fly for the rest"""
+
+    def __init__(self, wsgi_app, flask_app):
+        self.wsgi_app = wsgi_app
+        self.config = flask_app.config
+        self.static_folder = flask_app.static_folder
+        self.static_prefix = flask_app.static_url_path + "/"
+
+    def encodings(self, environ):
+        """Encodings the client accepts, best first"""
+        accepted = parse_accept_header(environ.get("HTTP_ACCEPT_ENCODING", ""))
+        candidates = ["br", "gzip"] if brotli else ["gzip"]
+        return [e for e in sorted(candidates, key=lambda e: -accepted[e]) if accepted[e] > 0]
+
+    def __call__(self, environ, start_response):
+        encodings = self.encodings(environ)
+        if not encodings or environ.get("REQUEST_METHOD") not in ("GET", "HEAD", "POST"):
+            return self.wsgi_app(environ, self.varying(start_response))
+        
+        path = environ.get("PATH_INFO", "")
+        if path.startswith(self.static_prefix) and environ["REQUEST_METHOD"] != "POST":
+            response = self.serve_precompressed(environ, start_response, path, encodings)
+            if response is not None:
+                return response
+        return self.compress(environ, start_response, encodings[0])
+
+    def serve_precompressed(self, environ, start_response, path, encodings):
+        file_path = safe_join(self.static_folder, path[len(self.static_prefix):])
+        if not file_path or not os.path.isfile(file_path):
+            return None
+        for encoding in encodings:
+            suffix = ENCODING_SUFFIXES[encoding]
+            if not os.path.isfile(file_path + suffix):
+                continue
+            mimetype = mimetypes.guess_type(file_path)[0] or "application/octet-stream"
+            
+            def sibling_start_response(status, headers, exc_info=None):
+                headers = [(k, v) for k, v in headers if k.lower() not in ("content-type", "content-encoding", "vary")]
+                headers += [("Content-Type", mimetype), ("Content-Encoding", encoding), ("Vary", "Accept-Encoding")]
+                return start_response(status, headers, exc_info)
+            
+            # Let the static route serve the sibling so conditional GET and HEAD keep working
+            return self.wsgi_app(dict(environ, PATH_INFO=path + suffix), sibling_start_response)
+        return None
+
+    @staticmethod
+    def with_vary(headers):
+        """headers with Vary: Accept-Encoding if the response is of a type that gets compressed.
+
+        Caches need it on the identity responses too, or one could be handed to a client that asked for brotli.
+        """
+        mimetype = next((v for k, v in headers if k.lower() == "content-type"), "").split(";")[0].strip()
+        vary = [v for k, v in headers if k.lower() == "vary"]
+        if mimetype not in COMPRESSIBLE_MIMETYPES or "accept-encoding" in ", ".join(vary).lower():
+            return headers
+        return [(k, v) for k, v in headers if k.lower() != "vary"] + [("Vary", ", ".join(vary + ["Accept-Encoding"]))]
+
+    def varying(self, start_response):
+        def vary_start_response(status, headers, exc_info=None):
+            return start_response(status, self.with_vary(headers), exc_info)
+        return vary_start_response
+
+    def should_compress(self, status, headers):
+        if not status.startswith("200") and not status.startswith("201"):
+            return False
+        headers = {k.lower(): v for k, v in headers}
+        mimetype = headers.get("content-type", "").split(";")[0].strip()
+        # Werkzeug only sets Content-Length for bodies it already holds in full; streamed
+        # responses (chat events, zips) have none and must not be buffered here
+        size = int(headers.get("content-length") or -1)
+        return (
+            mimetype in COMPRESSIBLE_MIMETYPES
+            and "content-encoding" not in headers
+            and "no-transform" not in headers.get("cache-control", "")
+            and self.config['COMPRESS_MIN_SIZE'] <= size <= self.config['COMPRESS_MAX_SIZE']
+        )
+
+    def compress(self, environ, start_response, encoding):
+        captured = []
+        
+        def capture(status, headers, exc_info=None):
+            if exc_info or not self.should_compress(status, headers) or environ["REQUEST_METHOD"] == "HEAD":
+                captured.append(None)
+                return start_response(status, self.with_vary(headers), exc_info)
+            captured.append((status, headers))
+            return lambda data: None  # legacy write() is not used by Flask
+        
+        # Flask calls start_response before returning the body, so the decision is known here
+        app_iter = self.wsgi_app(environ, capture)
+        if not captured or captured[0] is None:
+            return app_iter
+        status, headers = captured[0]
+        try:
+            body = b"".join(app_iter)
+        finally:
+            if hasattr(app_iter, "close"):
+                app_iter.close()
+        
+        if encoding == "br":
+            body = brotli.compress(body, quality=self.config['COMPRESS_BROTLI_QUALITY'])
+        else:
+            body = gzip.compress(body, self.config['COMPRESS_GZIP_LEVEL'])
+        
+        headers = [(k, v) for k, v in self.with_vary(headers) if k.lower() != "content-length"]
+        headers.append(("Content-Encoding", encoding))
+        headers.append(("Content-Length", str(len(body))))
+        # The compressed bytes differ from the identity representation, so a strong ETag no longer applies
+        headers = [(k, "W/" + v if k.lower() == "etag" and not v.startswith("W/") else v) for k, v in headers]
+        start_response(status, headers)
+        return [body]
+
+app.wsgi_app = CompressionMiddleware(app.wsgi_app, app)
 
 # ---------------- BASE TEMPLATE ----------------
 BASE_TEMPLATE = '''
@@ -215,1361 +1609,12 @@ BASE_TEMPLATE = '''
 <head>
 <title>{{title}}</title>
 <meta name="viewport" content="width=device-width, initial-scale=1.0, maximum-scale=1.0, user-scalable=no, viewport-fit=cover">
-<link href="https://cdn.jsdelivr.net/npm/bootstrap@5.3.2/dist/css/bootstrap.min.css" rel="stylesheet">
-<link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/css/all.min.css">
-<link href="https://fonts.googleapis.com/css2?family=Poppins:wght@300;400;500;600;700;800;900&display=swap" rel="stylesheet">
-<style>
-    :root {
-        --primary: #4361ee;
-        --primary-dark: #3a56d4;
-        --primary-light: #5a75f0;
-        --secondary: #06d6a0;
-        --secondary-dark: #05c090;
-        --accent: #ffd166;
-        --accent-dark: #ffc43d;
-        --danger: #ef476f;
-        --warning: #ffd166;
-        --info: #118ab2;
-        --light: #f8f9fa;
-        --dark: #212529;
-        --gradient-1: linear-gradient(135deg, #4361ee 0%, #3a0ca3 100%);
-        --gradient-2: linear-gradient(135deg, #7209b7 0%, #f72585 100%);
-        --gradient-3: linear-gradient(135deg, #4cc9f0 0%, #4361ee 100%);
-        --gradient-4: linear-gradient(135deg, #06d6a0 0%, #4cc9f0 100%);
-        --shadow-sm: 0 2px 4px rgba(0,0,0,0.05);
-        --shadow-md: 0 4px 6px rgba(0,0,0,0.07);
-        --shadow-lg: 0 10px 25px rgba(0,0,0,0.1);
-        --shadow-xl: 0 20px 40px rgba(0,0,0,0.15);
-        --radius-sm: 8px;
-        --radius-md: 12px;
-        --radius-lg: 16px;
-        --radius-xl: 24px;
-        --radius-2xl: 32px;
-    }
-    
-    * {
-        margin: 0;
-        padding: 0;
-        box-sizing: border-box;
-        -webkit-tap-highlight-color: transparent;
-        -webkit-touch-callout: none;
-        -webkit-user-select: none;
-        -moz-user-select: none;
-        -ms-user-select: none;
-        user-select: none;
-        touch-action: manipulation;
-    }
-    
-    html, body {
-        width: 100%;
-        height: 100%;
-        overflow-x: hidden;
-        font-family: 'Poppins', -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, Oxygen, Ubuntu, sans-serif;
-    }
-    
-    body {
-        background: linear-gradient(135deg, #0c0c0c 0%, #1a1a1a 100%);
-        position: relative;
-        overflow-x: hidden;
-    }
-    
-    /* Animated Background */
-    .animated-bg {
-        position: fixed;
-        top: 0;
-        left: 0;
-        width: 100%;
-        height: 100%;
-        z-index: -2;
-        overflow: hidden;
-    }
-    
-    .floating-shapes {
-        position: absolute;
-        width: 100%;
-        height: 100%;
-        filter: blur(60px);
-        opacity: 0.1;
-    }
-    
-    .shape-1 {
-        position: absolute;
-        top: 10%;
-        left: 10%;
-        width: 300px;
-        height: 300px;
-        background: var(--primary);
-        border-radius: 30% 70% 70% 30% / 30% 30% 70% 70%;
-        animation: float 25s infinite ease-in-out;
-    }
-    
-    .shape-2 {
-        position: absolute;
-        top: 60%;
-        right: 10%;
-        width: 250px;
-        height: 250px;
-        background: var(--secondary);
-        border-radius: 70% 30% 30% 70% / 70% 70% 30% 30%;
-        animation: float 30s infinite ease-in-out reverse;
-    }
-    
-    .shape-3 {
-        position: absolute;
-        bottom: 10%;
-        left: 20%;
-        width: 200px;
-        height: 200px;
-        background: var(--accent);
-        border-radius: 50% 50% 30% 70% / 50% 30% 70% 50%;
-        animation: float 35s infinite ease-in-out;
-    }
-    
-    .particles {
-        position: absolute;
-        width: 100%;
-        height: 100%;
-    }
-    
-    .particle {
-        position: absolute;
-        background: rgba(255, 255, 255, 0.05);
-        border-radius: 50%;
-        animation: float 15s infinite ease-in-out;
-    }
-    
-    /* Fog Effect */
-    .fog-container {
-        position: fixed;
-        width: 100%;
-        height: 100%;
-        overflow: hidden;
-        z-index: -1;
-        opacity: 0.1;
-    }
-    
-    .fog {
-        position: absolute;
-        width: 200%;
-        height: 100%;
-        background: linear-gradient(90deg, 
-            transparent 0%, 
-            rgba(255,255,255,0.05) 50%, 
-            transparent 100%);
-        animation: fogMove 60s infinite linear;
-    }
-    
-    .fog-2 {
-        animation: fogMove 40s infinite linear reverse;
-        opacity: 0.08;
-    }
-    
-    @keyframes fogMove {
-        0% { transform: translateX(-50%); }
-        100% { transform: translateX(50%); }
-    }
-    
-    @keyframes float {
-        0%, 100% { transform: translateY(0) rotate(0deg); }
-        33% { transform: translateY(-30px) rotate(120deg); }
-        66% { transform: translateY(30px) rotate(240deg); }
-    }
-    
-    @keyframes pulse {
-        0%, 100% { opacity: 1; }
-        50% { opacity: 0.7; }
-    }
-    
-    @keyframes slideInUp {
-        from {
-            opacity: 0;
-            transform: translateY(30px);
-        }
-        to {
-            opacity: 1;
-            transform: translateY(0);
-        }
-    }
-    
-    @keyframes slideInLeft {
-        from {
-            opacity: 0;
-            transform: translateX(-30px);
-        }
-        to {
-            opacity: 1;
-            transform: translateX(0);
-        }
-    }
-    
-    @keyframes slideInRight {
-        from {
-            opacity: 0;
-            transform: translateX(30px);
-        }
-        to {
-            opacity: 1;
-            transform: translateX(0);
-        }
-    }
-    
-    @keyframes fadeIn {
-        from { opacity: 0; }
-        to { opacity: 1; }
-    }
-    
-    @keyframes scaleIn {
-        from {
-            opacity: 0;
-            transform: scale(0.9);
-        }
-        to {
-            opacity: 1;
-            transform: scale(1);
-        }
-    }
-    
-    @keyframes glow {
-        0%, 100% {
-            box-shadow: 0 0 20px rgba(67, 97, 238, 0.3);
-        }
-        50% {
-            box-shadow: 0 0 30px rgba(67, 97, 238, 0.5);
-        }
-    }
-    
-    @keyframes shimmer {
-        0% {
-            background-position: -1000px 0;
-        }
-        100% {
-            background-position: 1000px 0;
-        }
-    }
-    
-    @keyframes bounce {
-        0%, 100% {
-            transform: translateY(0);
-        }
-        50% {
-            transform: translateY(-10px);
-        }
-    }
-    
-    .animate-float {
-        animation: float 6s ease-in-out infinite;
-    }
-    
-    .animate-pulse {
-        animation: pulse 2s ease-in-out infinite;
-    }
-    
-    .animate-slide-up {
-        animation: slideInUp 0.6s ease-out;
-    }
-    
-    .animate-slide-left {
-        animation: slideInLeft 0.6s ease-out;
-    }
-    
-    .animate-slide-right {
-        animation: slideInRight 0.6s ease-out;
-    }
-    
-    .animate-fade-in {
-        animation: fadeIn 0.5s ease-out;
-    }
-    
-    .animate-scale-in {
-        animation: scaleIn 0.4s ease-out;
-    }
-    
-    .animate-glow {
-        animation: glow 2s ease-in-out infinite;
-    }
-    
-    .animate-bounce {
-        animation: bounce 1s ease-in-out infinite;
-    }
-    
-    /* Glass Morphism */
-    .glass {
-        background: rgba(255, 255, 255, 0.95);
-        backdrop-filter: blur(10px);
-        -webkit-backdrop-filter: blur(10px);
-        border: 1px solid rgba(255, 255, 255, 0.1);
-    }
-    
-    .glass-dark {
-        background: rgba(30, 30, 30, 0.85);
-        backdrop-filter: blur(10px);
-        -webkit-backdrop-filter: blur(10px);
-        border: 1px solid rgba(255, 255, 255, 0.05);
-    }
-    
-    /* Notification System */
-    .notification-container {
-        position: fixed;
-        top: 80px;
-        right: 20px;
-        z-index: 9999;
-        max-width: 350px;
-        width: 100%;
-    }
-    
-    .notification {
-        background: rgba(255, 255, 255, 0.98);
-        backdrop-filter: blur(10px);
-        border-radius: var(--radius-md);
-        padding: 15px;
-        margin-bottom: 10px;
-        box-shadow: var(--shadow-lg);
-        animation: slideInRight 0.3s ease-out, fadeIn 0.3s ease-out;
-        display: flex;
-        align-items: center;
-        gap: 12px;
-        border-left: 4px solid var(--primary);
-        transform-origin: right;
-    }
-    
-    .notification.success {
-        border-left-color: var(--secondary);
-    }
-    
-    .notification.warning {
-        border-left-color: var(--warning);
-    }
-    
-    .notification.error {
-        border-left-color: var(--danger);
-    }
-    
-    .notification.info {
-        border-left-color: var(--info);
-    }
-    
-    .notification-icon {
-        width: 40px;
-        height: 40px;
-        border-radius: 50%;
-        display: flex;
-        align-items: center;
-        justify-content: center;
-        font-size: 18px;
-        flex-shrink: 0;
-    }
-    
-    .notification.success .notification-icon {
-        background: rgba(6, 214, 160, 0.1);
-        color: var(--secondary);
-    }
-    
-    .notification.warning .notification-icon {
-        background: rgba(255, 209, 102, 0.1);
-        color: var(--warning);
-    }
-    
-    .notification.error .notification-icon {
-        background: rgba(239, 71, 111, 0.1);
-        color: var(--danger);
-    }
-    
-    .notification.info .notification-icon {
-        background: rgba(67, 97, 238, 0.1);
-        color: var(--primary);
-    }
-    
-    .notification-content {
-        flex: 1;
-    }
-    
-    .notification-title {
-        font-weight: 600;
-        font-size: 14px;
-        margin-bottom: 2px;
-        color: var(--dark);
-    }
-    
-    .notification-message {
-        font-size: 13px;
-        color: #666;
-        line-height: 1.4;
-    }
-    
-    .notification-close {
-        background: none;
-        border: none;
-        color: #999;
-        cursor: pointer;
-        padding: 4px;
-        transition: color 0.2s;
-    }
-    
-    .notification-close:hover {
-        color: #666;
-    }
-    
-    /* Navbar */
-    .navbar {
-        background: rgba(255, 255, 255, 0.98) !important;
-        backdrop-filter: blur(20px);
-        -webkit-backdrop-filter: blur(20px);
-        border-bottom: 1px solid rgba(0,0,0,0.05);
-        box-shadow: var(--shadow-sm);
-        padding: 15px 0;
-        position: sticky;
-        top: 0;
-        z-index: 1000;
-        animation: slideInUp 0.4s ease-out;
-    }
-    
-    .navbar-brand {
-        font-weight: 800;
-        font-size: 24px;
-        background: linear-gradient(45deg, var(--primary), var(--primary-light));
-        -webkit-background-clip: text;
-        -webkit-text-fill-color: transparent;
-        background-clip: text;
-        display: flex;
-        align-items: center;
-        gap: 10px;
-    }
-    
-    .navbar-brand i {
-        font-size: 28px;
-        background: linear-gradient(45deg, var(--primary), var(--primary-light));
-        -webkit-background-clip: text;
-        -webkit-text-fill-color: transparent;
-    }
-    
-    /* Badge for unread items */
-    .badge-notification {
-        position: absolute;
-        top: -5px;
-        right: -5px;
-        background: var(--danger);
-        color: white;
-        border-radius: 50%;
-        width: 18px;
-        height: 18px;
-        font-size: 10px;
-        display: flex;
-        align-items: center;
-        justify-content: center;
-        animation: pulse 1.5s infinite;
-    }
-    
-    /* Main Container */
-    .main-container {
-        background: transparent;
-        min-height: calc(100vh - 70px);
-        overflow-y: auto;
-        -webkit-overflow-scrolling: touch;
-        padding: 20px;
-        padding-bottom: 80px; /* Space for bottom nav */
-    }
-    
-    /* Fix scroll for mobile */
-    @supports (-webkit-touch-callout: none) {
-        .main-container {
-            min-height: -webkit-fill-available;
-        }
-    }
-    
-    /* Content Wrapper */
-    .content-wrapper {
-        max-width: 1400px;
-        margin: 0 auto;
-        width: 100%;
-    }
-    
-    /* Card Styles */
-    .card {
-        background: rgba(255, 255, 255, 0.98);
-        backdrop-filter: blur(10px);
-        border: 1px solid rgba(255, 255, 255, 0.2);
-        border-radius: var(--radius-lg);
-        box-shadow: var(--shadow-lg);
-        transition: all 0.3s cubic-bezier(0.4, 0, 0.2, 1);
-        overflow: hidden;
-    }
-    
-    .card:hover {
-        transform: translateY(-4px);
-        box-shadow: var(--shadow-xl);
-    }
-    
-    .card-header {
-        background: transparent;
-        border-bottom: 1px solid rgba(0,0,0,0.05);
-        padding: 20px;
-    }
-    
-    .card-body {
-        padding: 20px;
-    }
-    
-    /* Button Styles */
-    .btn {
-        border-radius: var(--radius-md);
-        font-weight: 500;
-        transition: all 0.3s cubic-bezier(0.4, 0, 0.2, 1);
-        position: relative;
-        overflow: hidden;
-    }
-    
-    .btn::before {
-        content: '';
-        position: absolute;
-        top: 50%;
-        left: 50%;
-        width: 0;
-        height: 0;
-        background: rgba(255, 255, 255, 0.1);
-        border-radius: 50%;
-        transform: translate(-50%, -50%);
-        transition: width 0.6s, height 0.6s;
-    }
-    
-    .btn:hover::before {
-        width: 300px;
-        height: 300px;
-    }
-    
-    .btn-primary {
-        background: linear-gradient(135deg, var(--primary), var(--primary-dark));
-        border: none;
-        color: white;
-    }
-    
-    .btn-primary:hover {
-        background: linear-gradient(135deg, var(--primary-dark), var(--primary));
-        transform: translateY(-2px);
-        box-shadow: 0 10px 25px rgba(67, 97, 238, 0.3);
-    }
-    
-    .btn-success {
-        background: linear-gradient(135deg, var(--secondary), var(--secondary-dark));
-        border: none;
-    }
-    
-    .btn-success:hover {
-        transform: translateY(-2px);
-        box-shadow: 0 10px 25px rgba(6, 214, 160, 0.3);
-    }
-    
-    /* Form Styles */
-    .form-control {
-        border: 2px solid #e2e8f0;
-        border-radius: var(--radius-md);
-        padding: 12px 15px;
-        font-size: 14px;
-        transition: all 0.3s;
-        background: white;
-        color: #333;
-    }
-    
-    .form-control:focus {
-        border-color: var(--primary);
-        box-shadow: 0 0 0 3px rgba(67, 97, 238, 0.1);
-        outline: none;
-    }
-    
-    .form-control-lg {
-        padding: 16px 20px;
-        font-size: 16px;
-    }
-    
-    input[type="date"] {
-        position: relative;
-        color: #333;
-    }
-    
-    input[type="date"]::-webkit-calendar-picker-indicator {
-        background: transparent;
-        bottom: 0;
-        color: transparent;
-        cursor: pointer;
-        height: auto;
-        left: 0;
-        position: absolute;
-        right: 0;
-        top: 0;
-        width: auto;
-    }
-    
-    /* Template Grid */
-    .template-grid {
-        display: grid;
-        grid-template-columns: repeat(auto-fill, minmax(300px, 1fr));
-        gap: 25px;
-        padding: 20px 0;
-    }
-    
-    .template-card {
-        background: white;
-        border-radius: var(--radius-lg);
-        overflow: hidden;
-        box-shadow: var(--shadow-lg);
-        transition: all 0.4s cubic-bezier(0.4, 0, 0.2, 1);
-        height: 100%;
-        display: flex;
-        flex-direction: column;
-        animation: scaleIn 0.5s ease-out;
-        animation-fill-mode: both;
-    }
-    
-    .template-card:nth-child(1) { animation-delay: 0.1s; }
-    .template-card:nth-child(2) { animation-delay: 0.2s; }
-    .template-card:nth-child(3) { animation-delay: 0.3s; }
-    .template-card:nth-child(4) { animation-delay: 0.4s; }
-    .template-card:nth-child(5) { animation-delay: 0.5s; }
-    .template-card:nth-child(6) { animation-delay: 0.6s; }
-    
-    .template-card:hover {
-        transform: translateY(-8px) scale(1.02);
-        box-shadow: var(--shadow-xl);
-    }
-    
-    .template-image {
-        height: 200px;
-        background: linear-gradient(135deg, #2a2a2a, #1a1a1a);
-        display: flex;
-        align-items: center;
-        justify-content: center;
-        color: white;
-        font-size: 48px;
-        position: relative;
-        overflow: hidden;
-    }
-    
-    .template-image img {
-        width: 100%;
-        height: 100%;
-        object-fit: cover;
-        transition: transform 0.5s;
-    }
-    
-    .template-card:hover .template-image img {
-        transform: scale(1.05);
-    }
-    
-    .template-image::before {
-        content: '';
-        position: absolute;
-        top: 0;
-        left: 0;
-        right: 0;
-        bottom: 0;
-        background: linear-gradient(45deg, 
-            transparent 30%, 
-            rgba(255,255,255,0.1) 50%, 
-            transparent 70%);
-        animation: shimmer 3s infinite linear;
-        z-index: 1;
-    }
-    
-    .template-badge {
-        position: absolute;
-        top: 15px;
-        left: 15px;
-        background: rgba(255, 255, 255, 0.95);
-        color: var(--primary);
-        padding: 6px 12px;
-        border-radius: 20px;
-        font-size: 11px;
-        font-weight: 600;
-        box-shadow: var(--shadow-sm);
-        z-index: 2;
-    }
-    
-    .template-price {
-        position: absolute;
-        top: 15px;
-        right: 15px;
-        background: rgba(0, 0, 0, 0.8);
-        color: white;
-        padding: 8px 16px;
-        border-radius: var(--radius-md);
-        font-size: 14px;
-        font-weight: 600;
-        display: flex;
-        flex-direction: column;
-        align-items: flex-end;
-        z-index: 2;
-    }
-    
-    .original-price {
-        text-decoration: line-through;
-        color: #94a3b8;
-        font-size: 12px;
-        margin-bottom: 2px;
-    }
-    
-    .discount-price {
-        color: white;
-        font-size: 18px;
-        font-weight: 700;
-    }
-    
-    .template-content {
-        padding: 20px;
-        flex: 1;
-        display: flex;
-        flex-direction: column;
-    }
-    
-    .template-title {
-        font-size: 18px;
-        font-weight: 700;
-        margin-bottom: 10px;
-        color: #1e293b;
-    }
-    
-    .template-description {
-        font-size: 13px;
-        color: #64748b;
-        margin-bottom: 15px;
-        line-height: 1.5;
-        flex: 1;
-    }
-    
-    .template-features {
-        list-style: none;
-        padding: 0;
-        margin: 0 0 20px 0;
-    }
-    
-    .template-features li {
-        font-size: 12px;
-        color: #64748b;
-        margin-bottom: 6px;
-        display: flex;
-        align-items: center;
-    }
-    
-    .template-features li i {
-        color: var(--secondary);
-        margin-right: 8px;
-        font-size: 10px;
-    }
-    
-    .template-buttons {
-        display: flex;
-        gap: 10px;
-        margin-top: auto;
-    }
-    
-    .template-button {
-        flex: 1;
-        background: linear-gradient(135deg, var(--primary), var(--primary-dark));
-        color: white;
-        border: none;
-        border-radius: var(--radius-md);
-        padding: 12px;
-        font-size: 14px;
-        font-weight: 600;
-        text-align: center;
-        text-decoration: none;
-        display: block;
-        transition: all 0.3s;
-    }
-    
-    .template-button:hover {
-        transform: translateY(-2px);
-        box-shadow: 0 8px 20px rgba(67, 97, 238, 0.3);
-        color: white;
-    }
-    
-    .preview-button {
-        background: linear-gradient(135deg, var(--secondary), var(--secondary-dark));
-    }
-    
-    /* Chat Interface */
-    .chat-wrapper {
-        height: calc(100vh - 140px);
-        display: flex;
-        flex-direction: column;
-        background: white;
-        border-radius: var(--radius-lg);
-        overflow: hidden;
-        box-shadow: var(--shadow-xl);
-    }
-    
-    .chat-header {
-        padding: 20px;
-        background: linear-gradient(135deg, var(--primary), var(--primary-dark));
-        color: white;
-        border-bottom: 1px solid rgba(255,255,255,0.1);
-    }
-    
-    .chat-messages {
-        flex: 1;
-        overflow-y: auto;
-        padding: 20px;
-        background: #f8f9fa;
-        -webkit-overflow-scrolling: touch;
-        display: flex;
-        flex-direction: column;
-        gap: 15px;
-    }
-    
-    .chat-message {
-        max-width: 80%;
-        padding: 12px 18px;
-        border-radius: var(--radius-lg);
-        animation: slideInUp 0.3s ease-out;
-        position: relative;
-        word-break: break-word;
-    }
-    
-    .user-message {
-        background: linear-gradient(135deg, var(--primary), var(--primary-dark));
-        color: white;
-        margin-left: auto;
-        border-bottom-right-radius: 4px;
-        box-shadow: var(--shadow-md);
-    }
-    
-    .bot-message {
-        background: white;
-        color: #1e293b;
-        margin-right: auto;
-        border-bottom-left-radius: 4px;
-        box-shadow: var(--shadow-sm);
-        border: 1px solid #e2e8f0;
-    }
-    
-    .chat-input-wrapper {
-        padding: 20px;
-        background: white;
-        border-top: 1px solid #e2e8f0;
-        display: flex;
-        gap: 10px;
-        align-items: flex-end;
-    }
-    
-    .chat-input {
-        flex: 1;
-        border: 2px solid #e2e8f0;
-        border-radius: var(--radius-md);
-        padding: 12px 15px;
-        font-size: 14px;
-        resize: none;
-        transition: all 0.3s;
-    }
-    
-    .chat-input:focus {
-        border-color: var(--primary);
-        box-shadow: 0 0 0 3px rgba(67, 97, 238, 0.1);
-        outline: none;
-    }
-    
-    .chat-send-btn {
-        width: 50px;
-        height: 50px;
-        border-radius: 50%;
-        background: linear-gradient(135deg, var(--primary), var(--primary-dark));
-        border: none;
-        color: white;
-        display: flex;
-        align-items: center;
-        justify-content: center;
-        cursor: pointer;
-        transition: all 0.3s;
-    }
-    
-    .chat-send-btn:hover {
-        transform: scale(1.1);
-        box-shadow: 0 8px 20px rgba(67, 97, 238, 0.3);
-    }
-    
-    /* Progress Bar */
-    .progress-container {
-        width: 100%;
-        height: 8px;
-        background: #e2e8f0;
-        border-radius: 4px;
-        overflow: hidden;
-        margin: 20px 0;
-    }
-    
-    .progress-bar {
-        height: 100%;
-        background: linear-gradient(90deg, var(--primary), var(--secondary));
-        border-radius: 4px;
-        transition: width 0.6s ease;
-        position: relative;
-        overflow: hidden;
-    }
-    
-    .progress-bar::after {
-        content: '';
-        position: absolute;
-        top: 0;
-        left: 0;
-        right: 0;
-        bottom: 0;
-        background: linear-gradient(90deg, 
-            transparent 30%, 
-            rgba(255,255,255,0.3) 50%, 
-            transparent 70%);
-        animation: shimmer 2s infinite linear;
-    }
-    
-    /* Navigation Bottom */
-    .nav-bottom {
-        position: fixed;
-        bottom: 0;
-        left: 0;
-        right: 0;
-        background: rgba(255, 255, 255, 0.98);
-        backdrop-filter: blur(20px);
-        padding: 10px 0;
-        display: flex;
-        justify-content: space-around;
-        border-top: 1px solid rgba(0,0,0,0.05);
-        box-shadow: 0 -2px 20px rgba(0,0,0,0.1);
-        z-index: 1000;
-    }
-    
-    .nav-item {
-        display: flex;
-        flex-direction: column;
-        align-items: center;
-        text-decoration: none;
-        color: #64748b;
-        padding: 8px 12px;
-        border-radius: var(--radius-md);
-        transition: all 0.3s;
-        position: relative;
-    }
-    
-    .nav-item.active {
-        color: var(--primary);
-        background: rgba(67, 97, 238, 0.1);
-    }
-    
-    .nav-item.active::after {
-        content: '';
-        position: absolute;
-        top: -4px;
-        width: 6px;
-        height: 6px;
-        background: var(--primary);
-        border-radius: 50%;
-    }
-    
-    .nav-icon {
-        font-size: 20px;
-        margin-bottom: 4px;
-    }
-    
-    .nav-label {
-        font-size: 11px;
-        font-weight: 500;
-    }
-    
-    /* Hero Section */
-    .hero-section {
-        min-height: 70vh;
-        display: flex;
-        align-items: center;
-        justify-content: center;
-        text-align: center;
-        color: white;
-        padding: 40px 20px;
-        position: relative;
-        overflow: hidden;
-    }
-    
-    .hero-content {
-        max-width: 800px;
-        margin: 0 auto;
-        animation: slideInUp 0.8s ease-out;
-        background: rgba(30, 30, 30, 0.7);
-        backdrop-filter: blur(10px);
-        padding: 40px;
-        border-radius: var(--radius-xl);
-        border: 1px solid rgba(255, 255, 255, 0.1);
-    }
-    
-    .hero-title {
-        font-size: 3.5rem;
-        font-weight: 800;
-        margin-bottom: 20px;
-        background: linear-gradient(45deg, white, var(--primary-light));
-        -webkit-background-clip: text;
-        -webkit-text-fill-color: transparent;
-        background-clip: text;
-    }
-    
-    .hero-subtitle {
-        font-size: 1.2rem;
-        color: #cbd5e1;
-        margin-bottom: 30px;
-        line-height: 1.6;
-    }
-    
-    /* Auth Pages */
-    .auth-container {
-        min-height: 100vh;
-        display: flex;
-        align-items: center;
-        justify-content: center;
-        padding: 20px;
-        position: fixed;
-        top: 0;
-        left: 0;
-        right: 0;
-        bottom: 0;
-        overflow-y: auto;
-        -webkit-overflow-scrolling: touch;
-    }
-    
-    .auth-card {
-        background: rgba(255, 255, 255, 0.98);
-        backdrop-filter: blur(20px);
-        border-radius: var(--radius-xl);
-        overflow: hidden;
-        box-shadow: var(--shadow-xl);
-        width: 100%;
-        max-width: 450px;
-        animation: scaleIn 0.6s ease-out;
-        border: 1px solid rgba(0, 0, 0, 0.05);
-    }
-    
-    .auth-header {
-        background: linear-gradient(135deg, var(--primary), var(--primary-dark));
-        color: white;
-        padding: 30px;
-        text-align: center;
-    }
-    
-    .auth-body {
-        padding: 30px;
-    }
-    
-    /* Order Summary */
-    .order-summary-card {
-        background: linear-gradient(135deg, #f8fafc, #f1f5f9);
-        border: none;
-        border-radius: var(--radius-lg);
-        padding: 25px;
-        margin-bottom: 25px;
-    }
-    
-    /* Stats Cards */
-    .stats-card {
-        border: none;
-        border-radius: var(--radius-lg);
-        padding: 25px;
-        text-align: center;
-        color: white;
-        position: relative;
-        overflow: hidden;
-        transition: transform 0.3s;
-    }
-    
-    .stats-card::before {
-        content: '';
-        position: absolute;
-        top: 0;
-        left: 0;
-        right: 0;
-        bottom: 0;
-        background: linear-gradient(45deg, 
-            transparent 30%, 
-            rgba(255,255,255,0.1) 50%, 
-            transparent 70%);
-        animation: shimmer 3s infinite linear;
-    }
-    
-    .stats-card:hover {
-        transform: translateY(-5px);
-    }
-    
-    /* Responsive Design */
-    @media (max-width: 768px) {
-        .hero-title {
-            font-size: 2.5rem;
-        }
-        
-        .hero-content {
-            padding: 30px 20px;
-        }
-        
-        .template-grid {
-            grid-template-columns: 1fr;
-            gap: 20px;
-        }
-        
-        .chat-wrapper {
-            height: calc(100vh - 120px);
-        }
-        
-        .navbar-brand {
-            font-size: 20px;
-        }
-        
-        .main-container {
-            padding: 15px;
-            padding-bottom: 70px;
-        }
-        
-        .notification-container {
-            right: 10px;
-            left: 10px;
-            max-width: none;
-        }
-        
-        .auth-card {
-            max-width: 90%;
-        }
-        
-        .template-buttons {
-            flex-direction: column;
-        }
-    }
-    
-    @media (max-width: 480px) {
-        .hero-title {
-            font-size: 2rem;
-        }
-        
-        .hero-subtitle {
-            font-size: 1rem;
-        }
-        
-        .chat-message {
-            max-width: 90%;
-        }
-        
-        .nav-item {
-            padding: 6px 8px;
-        }
-        
-        .nav-icon {
-            font-size: 18px;
-        }
-        
-        .nav-label {
-            font-size: 10px;
-        }
-        
-        .auth-header {
-            padding: 20px;
-        }
-        
-        .auth-body {
-            padding: 20px;
-        }
-    }
-    
-    /* Custom Scrollbar */
-    ::-webkit-scrollbar {
-        width: 8px;
-        height: 8px;
-    }
-    
-    ::-webkit-scrollbar-track {
-        background: rgba(0,0,0,0.05);
-        border-radius: 4px;
-    }
-    
-    ::-webkit-scrollbar-thumb {
-        background: var(--primary);
-        border-radius: 4px;
-    }
-    
-    ::-webkit-scrollbar-thumb:hover {
-        background: var(--primary-dark);
-    }
-    
-    /* Loading Animation */
-    .loading-spinner {
-        width: 50px;
-        height: 50px;
-        border: 3px solid rgba(67, 97, 238, 0.1);
-        border-radius: 50%;
-        border-top-color: var(--primary);
-        animation: spin 1s ease-in-out infinite;
-    }
-    
-    @keyframes spin {
-        to { transform: rotate(360deg); }
-    }
-    
-    /* Floating Action Button */
-    .fab {
-        position: fixed;
-        bottom: 80px;
-        right: 20px;
-        width: 60px;
-        height: 60px;
-        border-radius: 50%;
-        background: linear-gradient(135deg, var(--primary), var(--primary-dark));
-        color: white;
-        display: flex;
-        align-items: center;
-        justify-content: center;
-        font-size: 24px;
-        box-shadow: var(--shadow-xl);
-        cursor: pointer;
-        z-index: 1000;
-        animation: bounce 2s infinite;
-    }
-    
-    .fab:hover {
-        transform: scale(1.1);
-    }
-    
-    /* Admin Table */
-    .admin-table {
-        width: 100%;
-        border-collapse: collapse;
-    }
-    
-    .admin-table th {
-        background: #f8f9fa;
-        padding: 12px;
-        text-align: left;
-        font-weight: 600;
-        border-bottom: 2px solid #dee2e6;
-    }
-    
-    .admin-table td {
-        padding: 12px;
-        border-bottom: 1px solid #dee2e6;
-        vertical-align: middle;
-    }
-    
-    .admin-table tr:hover {
-        background: #f8f9fa;
-    }
-    
-    /* Image Preview */
-    .image-preview {
-        width: 80px;
-        height: 60px;
-        object-fit: cover;
-        border-radius: var(--radius-sm);
-        border: 1px solid #dee2e6;
-    }
-    
-    /* Form Groups */
-    .form-group {
-        margin-bottom: 1rem;
-    }
-    
-    .form-group label {
-        display: block;
-        margin-bottom: 0.5rem;
-        font-weight: 500;
-        color: #333;
-    }
-    
-    /* Badge Styles */
-    .badge {
-        display: inline-block;
-        padding: 4px 8px;
-        font-size: 12px;
-        font-weight: 600;
-        line-height: 1;
-        text-align: center;
-        white-space: nowrap;
-        vertical-align: baseline;
-        border-radius: 10px;
-    }
-    
-    .badge-success {
-        background-color: var(--secondary);
-        color: white;
-    }
-    
-    .badge-danger {
-        background-color: var(--danger);
-        color: white;
-    }
-    
-    .badge-warning {
-        background-color: var(--warning);
-        color: #333;
-    }
-    
-    .badge-info {
-        background-color: var(--info);
-        color: white;
-    }
-    
-    /* Alert Messages */
-    .alert {
-        padding: 12px 16px;
-        border-radius: var(--radius-md);
-        margin-bottom: 1rem;
-        border: 1px solid transparent;
-    }
-    
-    .alert-success {
-        background-color: rgba(6, 214, 160, 0.1);
-        border-color: var(--secondary);
-        color: var(--secondary-dark);
-    }
-    
-    .alert-danger {
-        background-color: rgba(239, 71, 111, 0.1);
-        border-color: var(--danger);
-        color: var(--danger);
-    }
-    
-    .alert-info {
-        background-color: rgba(67, 97, 238, 0.1);
-        border-color: var(--primary);
-        color: var(--primary-dark);
-    }
-    
-    /* Action Buttons */
-    .action-buttons {
-        display: flex;
-        gap: 5px;
-    }
-    
-    .btn-sm {
-        padding: 6px 12px;
-        font-size: 12px;
-    }
-    
-    /* Pagination */
-    .pagination {
-        display: flex;
-        justify-content: center;
-        gap: 5px;
-        margin-top: 20px;
-    }
-    
-    .page-link {
-        padding: 8px 12px;
-        border: 1px solid #dee2e6;
-        border-radius: var(--radius-sm);
-        color: var(--primary);
-        text-decoration: none;
-        transition: all 0.3s;
-    }
-    
-    .page-link:hover {
-        background: var(--primary);
-        color: white;
-        border-color: var(--primary);
-    }
-    
-    .page-link.active {
-        background: var(--primary);
-        color: white;
-        border-color: var(--primary);
-    }
-</style>
+<link href="{{ vendor_url('bootstrap.css') }}" rel="stylesheet">
+<link rel="stylesheet" href="{{ vendor_url('fontawesome.css') }}">
+<link href="{{ vendor_url('poppins.css') }}" rel="stylesheet">
+<link href="{{ asset_url('app.css') }}" rel="stylesheet">
 </head>
-<body>
+<body{% if current_user.is_authenticated %} data-authenticated="1"{% endif %}>
 
 <!-- Animated Background -->
 <div class="animated-bg">
@@ -1621,417 +1666,1261 @@ BASE_TEMPLATE = '''
       <a href="/signup" class="btn btn-primary btn-sm">
         <i class="fas fa-user-plus me-1"></i>Signup
       </a>
-    </div>
-    {% endif %}
-  </div>
-</nav>
-
-<div class="main-container">
-  {{ content | safe }}
-</div>
-
-{% if current_user.is_authenticated and not request.path.startswith('/admin') and request.path != '/custom-web' and request.path != '/login' and request.path != '/signup' and request.path != '/' %}
-<div class="nav-bottom animate-slide-up">
-  <a href="/dashboard" class="nav-item {% if request.path == '/dashboard' %}active{% endif %}">
-    <i class="fas fa-th-large nav-icon"></i>
-    <span class="nav-label">Templates</span>
-  </a>
-  <a href="/custom-web" class="nav-item {% if request.path == '/custom-web' %}active{% endif %}">
-    <i class="fas fa-pencil-ruler nav-icon"></i>
-    <span class="nav-label">Custom</span>
-  </a>
-  <a href="/orders" class="nav-item {% if request.path == '/orders' %}active{% endif %}">
-    <i class="fas fa-shopping-cart nav-icon"></i>
-    <span class="nav-label">Orders</span>
-    {% if unread_orders_count and unread_orders_count > 0 %}
-    <span class="badge-notification">{{ unread_orders_count }}</span>
-    {% endif %}
-  </a>
-  <a href="/account" class="nav-item {% if request.path == '/account' %}active{% endif %}">
-    <i class="fas fa-user nav-icon"></i>
-    <span class="nav-label">Account</span>
-  </a>
-</div>
-{% endif %}
-
-<!-- Floating Action Button for Mobile -->
-{% if current_user.is_authenticated %}
-<div class="fab d-md-none">
-  <i class="fas fa-plus"></i>
-</div>
-{% endif %}
-
-<script src="https://cdn.jsdelivr.net/npm/bootstrap@5.3.2/dist/js/bootstrap.bundle.min.js"></script>
-<script>
-    // Generate particles for background
-    function createParticles() {
-        const particlesContainer = document.querySelector('.particles');
-        const particleCount = 50;
-        
-        for (let i = 0; i < particleCount; i++) {
-            const particle = document.createElement('div');
-            particle.className = 'particle';
-            
-            // Random size and position
-            const size = Math.random() * 4 + 1;
-            const posX = Math.random() * 100;
-            const posY = Math.random() * 100;
-            const delay = Math.random() * 20;
-            const duration = 15 + Math.random() * 20;
-            
-            particle.style.width = size + 'px';
-            particle.style.height = size + 'px';
-            particle.style.left = posX + '%';
-            particle.style.top = posY + '%';
-            particle.style.animationDelay = delay + 's';
-            particle.style.animationDuration = duration + 's';
-            
-            // Random color
-            const colors = [
-                'rgba(67, 97, 238, 0.3)',
-                'rgba(6, 214, 160, 0.3)',
-                'rgba(255, 209, 102, 0.3)',
-                'rgba(239, 71, 111, 0.3)'
-            ];
-            particle.style.background = colors[Math.floor(Math.random() * colors.length)];
-            
-            particlesContainer.appendChild(particle);
-        }
-    }
-    
-    // Notification System
-    function showNotification(type, title, message, duration = 5000) {
-        const container = document.getElementById('notificationContainer');
-        const notification = document.createElement('div');
-        notification.className = 'notification ' + type;
-        
-        const icons = {
-            success: 'fas fa-check-circle',
-            warning: 'fas fa-exclamation-triangle',
-            error: 'fas fa-times-circle',
-            info: 'fas fa-info-circle'
-        };
-        
-        notification.innerHTML = `
-            <div class="notification-icon">
-                <i class="${icons[type]}"></i>
-            </div>
-            <div class="notification-content">
-                <div class="notification-title">${title}</div>
-                <div class="notification-message">${message}</div>
-            </div>
-            <button class="notification-close" onclick="this.parentElement.remove()">
-                <i class="fas fa-times"></i>
-            </button>
-        `;
-        
-        container.appendChild(notification);
-        
-        // Auto remove after duration
-        setTimeout(() => {
-            if (notification.parentNode === container) {
-                notification.style.animation = 'slideInRight 0.3s ease-out reverse';
-                setTimeout(() => notification.remove(), 300);
-            }
-        }, duration);
-    }
-    
-    // Chat functionality
-    function setupChat() {
-        const chatMessages = document.querySelector('.chat-messages');
-        if (chatMessages) {
-            chatMessages.scrollTop = chatMessages.scrollHeight;
-            
-            // Auto resize textareas
-            const textareas = document.querySelectorAll('textarea');
-            textareas.forEach(textarea => {
-                textarea.addEventListener('input', function() {
-                    this.style.height = 'auto';
-                    this.style.height = (this.scrollHeight) + 'px';
-                });
-            });
-            
-            // Smooth scroll to bottom on new messages
-            const observer = new MutationObserver(() => {
-                chatMessages.scrollTo({
-                    top: chatMessages.scrollHeight,
-                    behavior: 'smooth'
-                });
-            });
-            
-            observer.observe(chatMessages, { childList: true });
-        }
-    }
-    
-    // Form validation with notifications
-    function setupFormValidation() {
-        const forms = document.querySelectorAll('form');
-        forms.forEach(form => {
-            form.addEventListener('submit', function(e) {
-                const requiredFields = this.querySelectorAll('[required]');
-                let isValid = true;
-                
-                requiredFields.forEach(field => {
-                    if (!field.value.trim()) {
-                        isValid = false;
-                        field.classList.add('is-invalid');
-                        
-                        // Add error styling
-                        const errorMsg = document.createElement('div');
-                        errorMsg.className = 'invalid-feedback';
-                        errorMsg.textContent = 'This field is required';
-                        
-                        if (!field.nextElementSibling || !field.nextElementSibling.classList.contains('invalid-feedback')) {
-                            field.parentNode.insertBefore(errorMsg, field.nextSibling);
-                        }
-                        
-                        // Show notification
-                        showNotification('error', 'Validation Error', 'Please fill in all required fields');
-                    } else {
-                        field.classList.remove('is-invalid');
-                        const errorMsg = field.nextElementSibling;
-                        if (errorMsg && errorMsg.classList.contains('invalid-feedback')) {
-                            errorMsg.remove();
-                        }
-                    }
-                });
-                
-                if (!isValid) {
-                    e.preventDefault();
-                    return false;
-                }
-                
-                // Show success notification
-                showNotification('success', 'Success', 'Form submitted successfully');
-            });
-        });
-    }
-    
-    // Initialize animations
-    function initAnimations() {
-        // Animate elements on scroll
-        const observerOptions = {
-            threshold: 0.1,
-            rootMargin: '0px 0px -50px 0px'
-        };
-        
-        const observer = new IntersectionObserver((entries) => {
-            entries.forEach(entry => {
-                if (entry.isIntersecting) {
-                    entry.target.classList.add('animate-slide-up');
-                }
-            });
-        }, observerOptions);
-        
-        // Observe all cards and sections
-        document.querySelectorAll('.template-card, .card, section').forEach(el => {
-            observer.observe(el);
-        });
-    }
-    
-    // Fix for iOS scroll
-    function fixIOSScroll() {
-        if (/iPad|iPhone|iPod/.test(navigator.userAgent)) {
-            document.body.style.height = '100%';
-            document.body.style.overflow = 'auto';
-            document.body.style.webkitOverflowScrolling = 'touch';
-        }
-    }
-    
-    // Disable zooming for mobile
-    document.addEventListener('wheel', function(e) {
-        if (e.ctrlKey) {
-            e.preventDefault();
-        }
-    }, { passive: false });
-    
-    document.addEventListener('keydown', function(e) {
-        if (e.ctrlKey && (e.key === '+' || e.key === '-' || e.key === '0')) {
-            e.preventDefault();
-        }
-    });
-    
-    document.addEventListener('touchstart', function(e) {
-        if (e.touches.length > 1) {
-            e.preventDefault();
-        }
-    }, { passive: false });
-    
-    let lastTouchEnd = 0;
-    document.addEventListener('touchend', function(e) {
-        const now = (new Date()).getTime();
-        if (now - lastTouchEnd <= 300) {
-            e.preventDefault();
-        }
-        lastTouchEnd = now;
-    }, false);
-    
-    // Prevent double tap zoom
-    document.addEventListener('dblclick', function(e) {
-        e.preventDefault();
-    }, { passive: false });
-    
-    // Fab button functionality
-    const fab = document.querySelector('.fab');
-    if (fab) {
-        fab.addEventListener('click', function() {
-            const navItems = document.querySelectorAll('.nav-item');
-            const currentPath = window.location.pathname;
-            let targetUrl = '/dashboard';
-            
-            navItems.forEach(item => {
-                if (item.classList.contains('active')) {
-                    const href = item.getAttribute('href');
-                    if (href !== currentPath) {
-                        targetUrl = href;
-                    }
-                }
-            });
-            
-            window.location.href = targetUrl;
-        });
-    }
-    
-    // Login prompt function
-    function showLoginPrompt() {
-        showNotification('info', 'Login Required', 'Please login to access this feature', 3000);
-    }
-    
-    // Check if user is logged in for protected actions
-    document.addEventListener('click', function(e) {
-        const target = e.target;
-        const protectedActions = ['/order-template/', '/custom-web', '/orders', '/account'];
-        const isProtected = protectedActions.some(action => 
-            target.href && target.href.includes(action) || 
-            target.closest('a') && target.closest('a').href && target.closest('a').href.includes(action)
-        );
-        
-        {% if not current_user.is_authenticated %}
-        if (isProtected && !window.location.pathname.startsWith('/login') && !window.location.pathname.startsWith('/signup')) {
-            e.preventDefault();
-            showLoginPrompt();
-        }
-        {% endif %}
-    });
-    
-    // Preview website function
-    function previewWebsite(url) {
-        if (url) {
-            window.open(url, '_blank');
-        } else {
-            showNotification('info', 'Preview', 'No preview URL available for this template');
-        }
-    }
-    
-    // Initialize everything when DOM is loaded
+    </div>
+    {% endif %}
+  </div>
+</nav>
+
+<div class="main-container">
+  {{ content | safe }}
+</div>
+
+{% if current_user.is_authenticated and not request.path.startswith('/admin') and request.path != '/custom-web' and request.path != '/login' and request.path != '/signup' and request.path != '/' %}
+<div class="nav-bottom animate-slide-up">
+  <a href="/dashboard" class="nav-item {% if request.path == '/dashboard' %}active{% endif %}">
+    <i class="fas fa-th-large nav-icon"></i>
+    <span class="nav-label">Templates</span>
+  </a>
+  <a href="/custom-web" class="nav-item {% if request.path == '/custom-web' %}active{% endif %}">
+    <i class="fas fa-pencil-ruler nav-icon"></i>
+    <span class="nav-label">Custom</span>
+  </a>
+  <a href="/orders" class="nav-item {% if request.path == '/orders' %}active{% endif %}">
+    <i class="fas fa-shopping-cart nav-icon"></i>
+    <span class="nav-label">Orders</span>
+    {% if unread_orders_count and unread_orders_count > 0 %}
+    <span class="badge-notification">{{ unread_orders_count }}</span>
+    {% endif %}
+  </a>
+  <a href="/account" class="nav-item {% if request.path == '/account' %}active{% endif %}">
+    <i class="fas fa-user nav-icon"></i>
+    <span class="nav-label">Account</span>
+  </a>
+</div>
+{% endif %}
+
+<!-- Floating Action Button for Mobile -->
+{% if current_user.is_authenticated %}
+<div class="fab d-md-none">
+  <i class="fas fa-plus"></i>
+</div>
+{% endif %}
+
+<script src="{{ vendor_url('bootstrap.js') }}"></script>
+<script src="{{ asset_url('app.js') }}"></script>
+{% if current_user.is_authenticated and session.get('show_welcome', True) %}
+<script>
+    // Show welcome notification for new users
     document.addEventListener('DOMContentLoaded', function() {
-        createParticles();
-        setupChat();
-        setupFormValidation();
-        initAnimations();
-        fixIOSScroll();
-        
-        // Adjust chat input height
-        const chatInputs = document.querySelectorAll('.chat-input');
-        chatInputs.forEach(input => {
-            input.style.height = 'auto';
-            input.style.height = (input.scrollHeight) + 'px';
-        });
-        
-        // Show welcome notification for new users
-        {% if current_user.is_authenticated and session.get('show_welcome', True) %}
         showNotification('success', 'Welcome back!', 'Great to see you again, {{ current_user.fullname or current_user.email }}!', 3000);
-        {% endif %}
-        
-        // Fix for iOS keyboard
-        if (/iPad|iPhone|iPod/.test(navigator.userAgent)) {
-            const inputs = document.querySelectorAll('input, textarea');
-            inputs.forEach(input => {
-                input.addEventListener('focus', function() {
-                    window.scrollTo(0, this.offsetTop - 100);
-                });
-            });
-        }
     });
 </script>
+{% endif %}
 {{ scripts | safe if scripts }}
 </body>
 </html>
 '''
 
+# Register the layout under a name so Jinja compiles it once and caches it by name,
+# rather than hashing the whole source string on every render_template_string call
+app.jinja_loader = ChoiceLoader([DictLoader({"base.html": BASE_TEMPLATE}), app.jinja_loader])
+
 def render_base_template(title, content, unread_orders_count=0, scripts=""):
     """Helper function to render the base template"""
-    return render_template_string(
-        BASE_TEMPLATE,
+    return render_template(
+        "base.html",
         title=title,
         content=content,
         unread_orders_count=unread_orders_count,
         scripts=scripts
     )
 
-# ---------------- ROUTES ----------------
-@app.route("/")
-def home():
+# ---------------- CONDITIONAL GET ----------------
+# Anything that changes every page on deploy: this module's code and the
+# fingerprinted layout assets it links to.
+with open(__file__, "rb") as _source:
+    DEPLOY_VERSION = hashlib.sha256(_source.read() + repr((ASSET_MANIFEST, VENDOR_MANIFEST)).encode()).hexdigest()[:12]
+
+def get_user_versions(user_id):
+    """The user's counters row, versions included; any change to it changes their pages"""
+    con = db()
+    cur = con.cursor()
+    cur.execute("""SELECT unread_notifications, unread_orders, completed_websites, total_orders,
+        orders_version, notifications_version FROM user_counters WHERE user_id=?""", (user_id,))
+    return cur.fetchone()
+
+def page_etag(catalog=False):
+    """ETag for the current URL built only from version counters, never from the page itself"""
+    parts = [DEPLOY_VERSION, request.full_path]
+    if catalog:
+        parts.append(get_data_version("catalog"))
     if current_user.is_authenticated:
-        return redirect("/dashboard")
-    
-    templates = get_all_templates()
-    
-    template_cards = ""
-    for template in templates:
-        id, name, description, category, features_str, original_price, discount_price, has_discount, tag, image_url, preview_url, status, created = template
-        
-        features = features_str.split(',') if features_str else []
-        
-        price_html = ""
-        if has_discount:
-            price_html = f'''
-            <div class="template-price">
-                <span class="original-price">${original_price}</span>
-                <span class="discount-price">${discount_price}</span>
-            </div>
-            '''
+        parts += [current_user.id, current_user.email, current_user.fullname, current_user.role, get_user_versions(current_user.id)]
+    return hashlib.sha256(repr(parts).encode()).hexdigest()[:20]
+
+class ConditionalStats:
+    """Per-endpoint count of conditional GETs answered with 304 versus a full page"""
+
+    def __init__(self):
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def record(self, endpoint, not_modified):
+        with self._lock:
+            counts = self._counts.setdefault(endpoint, [0, 0])
+            counts[0] += 1
+            counts[1] += not_modified
+
+    def stats(self):
+        with self._lock:
+            return {endpoint: {"requests": total, "not_modified": hits, "ratio": round(hits / total, 3)}
+                    for endpoint, (total, hits) in self._counts.items()}
+
+conditional_stats = ConditionalStats()
+
+def conditional_page(catalog=False):
+    """Answer If-None-Match with 304 before the view runs any query or renders anything"""
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method != "GET":
+                return view(*args, **kwargs)
+            # Tag the state as it was before the view ran: pages that mark things
+            # read must not be revalidated against the post-write versions
+            etag = page_etag(catalog)
+            not_modified = request.if_none_match.contains_weak(etag)
+            if not_modified:
+                response = app.response_class(status=304)
+            else:
+                response = app.make_response(view(*args, **kwargs))
+            if response.status_code in (200, 304):
+                conditional_stats.record(request.endpoint, not_modified)
+                response.set_etag(etag)
+                response.headers['Cache-Control'] = 'private, no-cache'
+                response.vary.add('Cookie')
+            return response
+        return wrapper
+    return decorator
+
+# ---------------- FILE DELIVERY ----------------
+# With FILE_DELIVERY set to x-sendfile (Apache mod_xsendfile, lighttpd) or
+# x-accel-redirect (nginx), files under FILE_DELIVERY_LOCATIONS are sent by
+# the proxy after Flask has done the access checks; the worker only writes
+# headers. nginx needs one internal location per entry, e.g.
+#     location /_protected/archives/ { internal; alias /srv/webcraft/archives/; }
+def internal_location(path):
+    """(folder, internal URI) for a file inside an offloaded folder, or None"""
+    path = os.path.abspath(path)
+    for folder, location in app.config['FILE_DELIVERY_LOCATIONS'].items():
+        folder = os.path.abspath(folder)
+        if path.startswith(folder + os.sep):
+            return folder, location + urllib.request.pathname2url(os.path.relpath(path, folder))
+    return None
+
+def deliver_file(path, **kwargs):
+    """send_file, or just the headers with an X-Sendfile / X-Accel-Redirect for the proxy to act on"""
+    mode = app.config['FILE_DELIVERY']
+    target = internal_location(path) if mode != "local" else None
+    if target is None:
+        return send_file(path, **kwargs)
+    kwargs.setdefault("max_age", app.get_send_file_max_age)
+    kwargs.pop("conditional", None)
+    response = werkzeug_send_file(os.path.abspath(path), request.environ, use_x_sendfile=True, conditional=False,
+                                  response_class=app.response_class, **kwargs)
+    # The proxy answers ranges itself and sets the length of what it sends
+    response.make_conditional(request.environ)
+    response.headers.pop("Content-Length", None)
+    sendfile_path = response.headers.pop("X-Sendfile")
+    if response.status_code == 200:
+        if mode == "x-accel-redirect":
+            response.headers["X-Accel-Redirect"] = target[1]
         else:
-            price_html = f'''
-            <div class="template-price">
-                <span class="discount-price">${original_price}</span>
-            </div>
-            '''
-        
-        tag_html = f'<div class="template-badge">{tag}</div>' if tag else ""
-        
-        features_html = "".join([f'<li><i class="fas fa-check"></i> {feature}</li>' for feature in features[:3]])
-        
-        # Check if image exists
-        if image_url and os.path.exists(os.path.join(app.config['UPLOAD_FOLDER'], image_url)):
-            image_html = f'<img src="/static/uploads/{image_url}" alt="{name}">'
+            response.headers["X-Sendfile"] = sendfile_path
+    return response
+
+def static_file(filename):
+    """Flask's static view, routed through deliver_file so uploads and sites can be offloaded"""
+    path = safe_join(app.static_folder, filename)
+    if path is None or not os.path.isfile(path):
+        raise NotFound()
+    return deliver_file(path)
+
+app.view_functions["static"] = static_file
+
+# ---------------- BLOB STORE ----------------
+# Every website file lives once in BLOB_FOLDER under its SHA-256, and the
+# site folders under WEBSITE_FOLDER are hardlinks to those blobs (private
+# copies where hardlinks aren't available). website_manifests records
+# path -> blob per order, which is what archives are built from. Site
+# files are therefore shared between orders: blobs are made read-only,
+# and a site file is changed by replacing it, never by writing in place.
+
+def blob_path(sha256):
+    return os.path.join(app.config['BLOB_FOLDER'], sha256[:2], sha256)
+
+def _blob_temp_path():
+    folder = os.path.join(app.config['BLOB_FOLDER'], "tmp")
+    os.makedirs(folder, exist_ok=True)
+    return os.path.join(folder, uuid.uuid4().hex)
+
+def store_blob(source):
+    """Copy a readable stream into the store, hashing as it goes; returns (sha256, size)"""
+    tmp_path = _blob_temp_path()
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(tmp_path, "wb") as f:
+            for chunk in iter(lambda: source.read(ZIP_CHUNK_SIZE), b""):
+                digest.update(chunk)
+                f.write(chunk)
+                size += len(chunk)
+        sha256 = digest.hexdigest()
+        path = blob_path(sha256)
+        if os.path.exists(path):
+            os.remove(tmp_path)
         else:
-            image_html = f'<i class="fas fa-image fa-3x"></i><p class="mt-2">{name}</p>'
-        
-        template_cards += f'''
-        <div class="template-card">
-            <div class="template-image">
-                {image_html}
-                {tag_html}
-                {price_html}
-            </div>
-            <div class="template-content">
-                <h3 class="template-title">{name}</h3>
-                <p class="template-description">{description}</p>
-                <ul class="template-features">
-                    {features_html}
-                </ul>
-                <div class="template-buttons">
-                    <a href="{preview_url}" target="_blank" class="template-button preview-button">
-                        <i class="fas fa-eye me-2"></i>Preview
-                    </a>
-                    <a href="/login" class="template-button" onclick="showNotification('info', 'Login Required', 'Please login to order templates'); return false;">
-                        <i class="fas fa-shopping-cart me-2"></i>Order Now
-                    </a>
-                </div>
-            </div>
-        </div>
-        '''
+            os.chmod(tmp_path, 0o444)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return sha256, size
+
+def link_blob(sha256, destination, mtime):
+    """Put a stored blob at destination, as a hardlink when the filesystem allows it"""
+    try:
+        os.link(blob_path(sha256), destination)
+    except OSError:
+        if not os.path.exists(blob_path(sha256)):
+            raise
+        shutil.copyfile(blob_path(sha256), destination)
+        os.utime(destination, (mtime, mtime))  # lets sync_website_manifest recognise the copy
+
+def replace_site_file(write, destination):
+    """Have write(tmp_path) create the file beside destination, then swap it in.
+
+    Site files may be hardlinks to read-only blobs, so they are only ever replaced, never opened for writing.
+    """
+    tmp_path = f"{destination}.{uuid.uuid4().hex}.tmp"
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, destination)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def store_site_file(path):
+    """Move an existing site file into the store and leave a link in its place; returns (sha256, size)"""
+    stat = os.stat(path)
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    sha256 = digest.hexdigest()
+    stored = blob_path(sha256)
+    os.makedirs(os.path.dirname(stored), exist_ok=True)
+    if not os.path.exists(stored):
+        try:
+            os.link(path, stored)  # the file becomes the blob
+            os.chmod(stored, 0o444)
+        except OSError:
+            tmp_path = _blob_temp_path()
+            shutil.copyfile(path, tmp_path)
+            os.chmod(tmp_path, 0o444)
+            os.replace(tmp_path, stored)
+    elif not os.path.samefile(path, stored):
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            os.link(stored, tmp_path)
+            os.replace(tmp_path, path)  # drop the duplicate
+        except OSError:
+            pass  # no hardlinks here: the file stays a private copy
+    return sha256, stat.st_size
+
+def _manifest_row_current(row, stat):
+    """Whether a site file is still the blob its manifest row names"""
+    sha256, size, mtime = row
+    try:
+        stored = os.stat(blob_path(sha256))
+    except FileNotFoundError:
+        return False
+    return stat.st_size == size and (os.path.samestat(stored, stat) or stat.st_mtime == mtime)
+
+def record_website_manifest(cur, order_db_id, entries):
+    """Replace an order's manifest with [(path, sha256, size, mtime)] of its site folder as it is now"""
+    cur.execute("DELETE FROM website_manifests WHERE order_id=?", (order_db_id,))
+    cur.executemany("INSERT INTO website_manifests(order_id, path, sha256, size, mtime) VALUES(?,?,?,?,?)",
+                    [(order_db_id, *entry) for entry in entries])
+    record_folder_signature(cur, order_db_id)
+
+def folder_signature(folder):
+    """Inode and mtime of a site folder, or None if there is none.
+
+    Submissions swap in a new folder (a new inode), and the download route only ever adds a
+    top-level file (a new mtime), so a matching signature means the manifest still holds without
+    walking the folder. Hand edits deeper down need `flask build-archives`.
+    """
+    try:
+        stat = os.stat(folder)
+    except FileNotFoundError:
+        return None
+    return f"{stat.st_ino}:{stat.st_mtime_ns}"
+
+def record_folder_signature(cur, order_db_id):
+    signature = folder_signature(website_folder_path(order_db_id))
+    if signature is None:
+        cur.execute("DELETE FROM website_folders WHERE order_id=?", (order_db_id,))
+    else:
+        cur.execute("INSERT OR REPLACE INTO website_folders(order_id, signature) VALUES(?,?)", (order_db_id, signature))
+
+def website_manifest_current(cur, order_db_id):
+    """Whether the site folder is still the one the manifest was recorded from"""
+    cur.execute("SELECT signature FROM website_folders WHERE order_id=?", (order_db_id,))
+    row = cur.fetchone()
+    return row is not None and row[0] == folder_signature(website_folder_path(order_db_id))
+
+def _scan_site_folder(folder, rows):
+    """Manifest entries for the files in folder, reusing rows {path: (sha256, size, mtime)} that still match;
+    returns (entries, whether anything differs from rows)"""
+    rows = dict(rows)
+    entries = []
+    changed = False
+    for arcname, path in website_files(folder):
+        stat = os.stat(path)
+        row = rows.pop(arcname, None)
+        if row and _manifest_row_current(row, stat):
+            entries.append((arcname, *row))
+            continue
+        entries.append((arcname, *store_site_file(path), stat.st_mtime))
+        changed = True
+    return sorted(entries), changed or bool(rows)
+
+def sync_website_manifest(cur, order_db_id):
+    """Bring the manifest in line with the site folder; only files it doesn't already know are hashed"""
+    cur.execute("SELECT path, sha256, size, mtime FROM website_manifests WHERE order_id=?", (order_db_id,))
+    rows = {path: (sha256, size, mtime) for path, sha256, size, mtime in cur.fetchall()}
+    entries, changed = run_blocking(_scan_site_folder, website_folder_path(order_db_id), rows)
+    if changed:
+        record_website_manifest(cur, order_db_id, entries)
+    else:
+        record_folder_signature(cur, order_db_id)
+    return entries
+
+def website_manifest(order_db_id):
+    """[(path, sha256, size, mtime)] of the order's site, in archive order"""
+    cur = db().cursor()
+    cur.execute("SELECT path, sha256, size, mtime FROM website_manifests WHERE order_id=? ORDER BY path",
+                (order_db_id,))
+    return cur.fetchall()
+
+def _stored_blobs():
+    """(sha256, path, stat) of every blob on disk"""
+    folder = app.config['BLOB_FOLDER']
+    if not os.path.isdir(folder):
+        return
+    for shard in sorted(os.listdir(folder)):
+        if shard == "tmp" or not os.path.isdir(os.path.join(folder, shard)):
+            continue
+        for name in os.listdir(os.path.join(folder, shard)):
+            path = os.path.join(folder, shard, name)
+            yield name, path, os.stat(path)
+
+@app.cli.command("gc-blobs")
+@click.option("--dry-run", is_flag=True, help="Report what would be deleted without deleting it")
+def gc_blobs_command(dry_run):
+    """Delete blobs no manifest references any more"""
+    con = db()
+    cur = con.cursor()
+    referenced = {row[0] for row in cur.execute("SELECT DISTINCT sha256 FROM website_manifests")}
+    cutoff = time.time() - app.config['BLOB_GC_GRACE']
+    reclaimed = [0, 0]
+    for sha256, path, stat in _stored_blobs():
+        # A blob still linked from a site folder (st_nlink > 1) may be part of a
+        # submission whose manifest isn't committed yet
+        if sha256 in referenced or stat.st_nlink > 1 or stat.st_mtime > cutoff:
+            continue
+        if not dry_run:
+            os.remove(path)
+        reclaimed[0] += 1
+        reclaimed[1] += stat.st_size
+    tmp_folder = os.path.join(app.config['BLOB_FOLDER'], "tmp")
+    if os.path.isdir(tmp_folder) and not dry_run:
+        for name in os.listdir(tmp_folder):
+            path = os.path.join(tmp_folder, name)
+            if os.stat(path).st_mtime < cutoff:
+                os.remove(path)
+    verb = "Would delete" if dry_run else "Deleted"
+    print(f"✓ {verb} {reclaimed[0]} unreferenced blobs ({reclaimed[1] / 1024 / 1024:.1f} MB)")
+
+@app.cli.command("disk-usage")
+def disk_usage_command():
+    """Report how much the blob store saves over one copy of every site"""
+    con = db()
+    cur = con.cursor()
+    cur.execute("SELECT COUNT(DISTINCT order_id), COUNT(*), IFNULL(SUM(size), 0) FROM website_manifests")
+    sites, files, logical = cur.fetchone()
+    cur.execute("SELECT COUNT(*), IFNULL(SUM(size), 0) FROM (SELECT sha256, MAX(size) AS size FROM website_manifests GROUP BY sha256)")
+    unique_files, unique = cur.fetchone()
+    referenced = {row[0] for row in cur.execute("SELECT DISTINCT sha256 FROM website_manifests")}
+    stored = [0, 0]
+    orphaned = [0, 0]
+    for sha256, path, stat in _stored_blobs():
+        stored[0] += 1
+        stored[1] += stat.st_size
+        if sha256 not in referenced:
+            orphaned[0] += 1
+            orphaned[1] += stat.st_size
+    mb = lambda size: f"{size / 1024 / 1024:.1f} MB"
+    print(f"Sites:        {sites} ({files} files, {mb(logical)} if each kept its own copy)")
+    print(f"Unique:       {unique_files} blobs, {mb(unique)}")
+    print(f"Blob store:   {stored[0]} blobs, {mb(stored[1])} on disk")
+    print(f"Unreferenced: {orphaned[0]} blobs, {mb(orphaned[1])} (flask gc-blobs)")
+    if logical:
+        print(f"Saved:        {mb(logical - unique)} ({(logical - unique) / logical:.0%})")
+    cur.execute("""SELECT sha256, MAX(size), COUNT(*) AS refs, MIN(path) FROM website_manifests
+        GROUP BY sha256 HAVING refs > 1 ORDER BY MAX(size) * (refs - 1) DESC LIMIT 5""")
+    for sha256, size, refs, path in cur.fetchall():
+        print(f"  {sha256[:12]}  {mb(size):>10} x {refs:<4} {path}")
+
+# ---------------- WEBSITE ARCHIVES ----------------
+# Striped by orders.id so downloads in one worker share a build without a lock per order ever seen;
+# orders on the same stripe only wait for each other in this worker
+_archive_locks = [threading.Lock() for _ in range(64)]
+
+@contextlib.contextmanager
+def archive_lock(order_db_id):
+    """Exclusive right to (re)build one order's archive, across threads and, with fcntl, worker processes"""
+    with _archive_locks[int(order_db_id) % len(_archive_locks)]:
+        if fcntl is None:
+            yield
+            return
+        os.makedirs(app.config['ARCHIVE_FOLDER'], exist_ok=True)
+        with open(os.path.join(app.config['ARCHIVE_FOLDER'], f"{order_db_id}.lock"), "a") as lock_file:
+            run_blocking(fcntl.flock, lock_file.fileno(), fcntl.LOCK_EX)  # may wait out a build in another process
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def website_folder_path(order_db_id):
+    return os.path.join(app.config['WEBSITE_FOLDER'], str(order_db_id))
+
+def archive_path(order_db_id):
+    return os.path.join(app.config['ARCHIVE_FOLDER'], f"{order_db_id}.zip")
+
+def website_files(folder):
+    """(archive name, path) for every file under folder, in a stable order"""
+    for root, dirs, files in os.walk(folder):
+        dirs.sort()
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            yield os.path.relpath(path, folder).replace(os.sep, "/"), path
+
+# Formats that are compressed already; deflating them again only costs CPU
+STORED_EXTENSIONS = {
+    ".png", ".jpg", ".jpeg", ".gif", ".webp", ".avif", ".ico",
+    ".woff", ".woff2", ".zip", ".gz", ".br", ".bz2", ".7z", ".rar",
+    ".mp3", ".mp4", ".webm", ".ogg", ".m4a", ".mov", ".pdf"
+}
+ZIP_CHUNK_SIZE = 64 * 1024
+
+def zip_compress_type(arcname):
+    if os.path.splitext(arcname)[1].lower() in STORED_EXTENSIONS:
+        return zipfile.ZIP_STORED
+    return zipfile.ZIP_DEFLATED
+
+class _ZipSink:
+    """Write-only target that lets ZipFile stream: it has no seek(), so entries use data descriptors"""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+def zip_date_time(mtime):
+    return max(time.localtime(mtime)[:6], (1980, 1, 1, 0, 0, 0))  # zip can't date anything earlier
+
+class ArchiveReuse:
+    """Entries of a previous archive that stream_zip copies byte for byte instead of compressing again.
+
+    Entries are matched on name, date and the blob hash that stream_zip keeps in each entry's comment,
+    tagged with ARCHIVE_FORMAT so entries written by an older format are never carried over.
+    """
+
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        self.reused = 0
+        try:
+            with zipfile.ZipFile(self.file) as zipf:  # leaves self.file open
+                infos = sorted(zipf.infolist(), key=lambda info: info.header_offset)
+                ends = [info.header_offset for info in infos[1:]] + [zipf.start_dir]
+        except BaseException:
+            self.file.close()
+            raise
+        self.entries = {(info.filename, info.date_time, info.comment.decode()): (info, info.header_offset, end)
+                        for info, end in zip(infos, ends) if info.comment}
+
+    def take(self, arcname, date_time, sha256):
+        return self.entries.get((arcname, date_time, f"{ARCHIVE_FORMAT}:{sha256}"))
+
+    def chunks(self, start, end):
+        self.file.seek(start)
+        while start < end:
+            data = self.file.read(min(ZIP_CHUNK_SIZE, end - start))
+            if not data:
+                raise zipfile.BadZipFile("Previous archive is truncated")
+            start += len(data)
+            yield data
+
+    def close(self):
+        self.file.close()
+
+def stream_zip(files, reuse=None):
+    """Yield a zip of (archive name, path[, mtime, sha256]) entries chunk by chunk, holding at most one chunk in memory.
+
+    Entries with a blob hash that reuse (an ArchiveReuse) holds are copied from the previous archive.
+    """
+    sink = _ZipSink()
+    with zipfile.ZipFile(sink, "w") as zipf:
+        for arcname, path, *stored in files:
+            if stored:
+                mtime, sha256 = stored
+                date_time = zip_date_time(mtime)
+                entry = reuse.take(arcname, date_time, sha256) if reuse else None
+                if entry:
+                    # ZipFile has no API for adding an already compressed entry: write
+                    # its local header and data ourselves and register it for the
+                    # central directory, as ZipFile.write does for the entries it writes
+                    previous, start, end = entry
+                    info = copy.copy(previous)
+                    info.header_offset = zipf.fp.tell()
+                    for chunk in reuse.chunks(start, end):
+                        zipf.fp.write(chunk)
+                        yield sink.drain()
+                    zipf.filelist.append(info)
+                    zipf.NameToInfo[arcname] = info
+                    zipf.start_dir = zipf.fp.tell()
+                    zipf._didModify = True
+                    reuse.reused += 1
+                    continue
+            info = zipfile.ZipInfo.from_file(path, arcname)
+            if stored:
+                info.date_time = date_time  # blobs are shared, so their own mtime says nothing about this site
+                info.external_attr = 0o100644 << 16  # and they are read-only, which the customer's copy shouldn't be
+                info.comment = f"{ARCHIVE_FORMAT}:{sha256}".encode()
+            info.compress_type = zip_compress_type(arcname)
+            with open(path, "rb") as source, zipf.open(info, "w") as entry:
+                for chunk in iter(lambda: source.read(ZIP_CHUNK_SIZE), b""):
+                    entry.write(chunk)
+                    if sink.chunks:
+                        yield sink.drain()
+            yield sink.drain()
+    yield sink.drain()  # central directory
+
+# Bump when stream_zip's output changes for the same files, so archives get rebuilt
+ARCHIVE_FORMAT = 2
+
+def manifest_content_hash(manifest):
+    """Hash of everything that ends up in the archive, so equal hashes mean byte-identical zips.
+
+    It doubles as the archive's ETag, which If-Range relies on to resume downloads safely.
+    The blob hashes stand in for the file contents, so nothing is read to compute it.
+    """
+    digest = hashlib.sha256(f"zip{ARCHIVE_FORMAT}\0".encode())
+    for arcname, sha256, size, mtime in manifest:
+        digest.update(f"{arcname}\0{size}\0{zip_date_time(mtime)}\0{sha256}\0".encode())
+    return digest.hexdigest()
+
+def manifest_files(manifest):
+    """stream_zip entries that read each file from its blob"""
+    for arcname, sha256, size, mtime in manifest:
+        yield arcname, blob_path(sha256), mtime, sha256
+
+def _write_archive(path, manifest, reuse):
+    with open(path, "wb") as f:
+        for chunk in stream_zip(manifest_files(manifest), reuse):
+            f.write(chunk)
+
+def build_website_archive(order_db_id, sync=False):
+    """Zip the order's site unless the archive already matches its content; returns (path, content hash).
+
+    The folder is only walked when sync is set or it has changed since its manifest was recorded.
+    """
+    path = archive_path(order_db_id)
+    with archive_lock(order_db_id):
+        con = db()
+        cur = con.cursor()
+        if sync or not website_manifest_current(cur, order_db_id):
+            manifest = sync_website_manifest(cur, order_db_id)
+            con.commit()
+        else:
+            manifest = website_manifest(order_db_id)
+        content_hash = manifest_content_hash(manifest)
+        cur.execute("SELECT content_hash FROM website_archives WHERE order_id=?", (order_db_id,))
+        row = cur.fetchone()
+        if row and row[0] == content_hash and os.path.exists(path):
+            return path, content_hash
+        os.makedirs(app.config['ARCHIVE_FOLDER'], exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        reuse = None
+        if os.path.exists(path):
+            try:
+                reuse = ArchiveReuse(path)  # unchanged files are copied, not compressed again
+            except zipfile.BadZipFile:
+                pass
+        try:
+            run_blocking(_write_archive, tmp_path, manifest, reuse)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        finally:
+            if reuse:
+                reuse.close()
+        app.logger.info("Built archive for order %s: %s of %s entries reused", order_db_id,
+                        reuse.reused if reuse else 0, len(manifest))
+        cur.execute("INSERT OR REPLACE INTO website_archives(order_id, content_hash, size) VALUES(?,?,?)",
+                    (order_db_id, content_hash, os.path.getsize(path)))
+        con.commit()
+    return path, content_hash
+
+def find_website_archive(order_db_id):
+    """(path, content hash) of the prebuilt archive, or None if there is none yet"""
+    con = db()
+    cur = con.cursor()
+    cur.execute("SELECT content_hash FROM website_archives WHERE order_id=?", (order_db_id,))
+    row = cur.fetchone()
+    path = archive_path(order_db_id)
+    if row and os.path.exists(path):
+        return path, row[0]
+    return None
+
+@app.cli.command("build-archives")
+def build_archives_command():
+    """Build or refresh the download archive of every submitted website"""
+    con = db()
+    cur = con.cursor()
+    cur.execute("SELECT id FROM orders WHERE folder_submitted=1")
+    order_ids = [row[0] for row in cur.fetchall()]
+    built = 0
+    for order_db_id in order_ids:
+        if os.path.isdir(website_folder_path(order_db_id)):
+            build_website_archive(order_db_id, sync=True)  # also picks up hand edits to the folders
+            built += 1
+    print(f"✓ {built} website archives up to date")
+
+# ---------------- WEBSITE EXTRACTION ----------------
+# Submitted zips are checked against their central directory before a byte
+# is written, then extracted by EXTRACT_THREADS threads (zlib releases the
+# GIL) into a staging folder next to the site, which replaces the live
+# folder with a rename once every entry is on disk.
+ZIP_METHODS = {zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED, zipfile.ZIP_BZIP2, zipfile.ZIP_LZMA}
+RATIO_CHECK_MIN_SIZE = 1024 * 1024  # small files of repeated markup compress far beyond any sane ratio
+
+class UnsafeArchiveError(ValueError):
+    """The submitted zip breaks an extraction limit or would write outside the site folder"""
+
+ExtractResult = namedtuple("ExtractResult", "files bytes seconds manifest")
+
+class ExtractionStats:
+    """Totals over every extraction in this process, for files/sec and bytes/sec"""
+
+    def __init__(self):
+        self._totals = [0, 0, 0, 0.0]  # archives, files, bytes, seconds
+        self._rejected = 0
+        self._lock = threading.Lock()
+
+    def record(self, result):
+        with self._lock:
+            self._totals[0] += 1
+            self._totals[1] += result.files
+            self._totals[2] += result.bytes
+            self._totals[3] += result.seconds
+
+    def reject(self):
+        with self._lock:
+            self._rejected += 1
+
+    def stats(self):
+        with self._lock:
+            archives, files, size, seconds = self._totals
+            return {"archives": archives, "rejected": self._rejected, "files": files, "bytes": size,
+                    "files_per_sec": round(files / seconds, 1) if seconds else None,
+                    "bytes_per_sec": round(size / seconds) if seconds else None}
+
+extraction_stats = ExtractionStats()
+
+@contextlib.contextmanager
+def staged_site_folder(folder, swap_lock=contextlib.nullcontext()):
+    """Yield an empty folder beside folder; if the block succeeds it replaces folder with one rename"""
+    parent = os.path.dirname(os.path.abspath(folder))
+    name = os.path.basename(folder)
+    staging = os.path.join(parent, f".{name}.{uuid.uuid4().hex}.staging")
+    previous = os.path.join(parent, f".{name}.{uuid.uuid4().hex}.old")
+    os.makedirs(staging)
+    try:
+        yield staging
+        with swap_lock:
+            with contextlib.suppress(FileNotFoundError):
+                os.rename(folder, previous)
+            os.rename(staging, folder)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    run_blocking(shutil.rmtree, previous, True)  # ignore_errors
+
+def safe_member_path(name):
+    """Normalised relative path of a zip entry, or UnsafeArchiveError if it could escape the folder"""
+    if "\0" in name:
+        raise UnsafeArchiveError(f"Entry name contains NUL: {name!r}")
+    parts = [part for part in name.replace("\\", "/").split("/") if part not in ("", ".")]
+    if name.startswith(("/", "\\")) or (parts and ":" in parts[0]) or ".." in parts:
+        raise UnsafeArchiveError(f"Entry escapes the site folder: {name}")
+    return "/".join(parts)
+
+def scan_zip(zip_ref):
+    """Check every entry against the limits; returns [(ZipInfo, relative path)] of the files to write"""
+    infos = zip_ref.infolist()
+    if len(infos) > app.config['EXTRACT_MAX_ENTRIES']:
+        raise UnsafeArchiveError(f"{len(infos)} entries, limit is {app.config['EXTRACT_MAX_ENTRIES']}")
+    members = {}
+    total = 0
+    for info in infos:
+        path = safe_member_path(info.filename)
+        if info.is_dir() or not path:
+            continue
+        if (info.external_attr >> 16) & 0o170000 == 0o120000:
+            raise UnsafeArchiveError(f"Symbolic links are not allowed: {info.filename}")
+        if info.flag_bits & 0x1:
+            raise UnsafeArchiveError(f"Encrypted entries are not supported: {info.filename}")
+        if info.compress_type not in ZIP_METHODS:
+            raise UnsafeArchiveError(f"Unsupported compression method {info.compress_type}: {info.filename}")
+        if (info.file_size >= RATIO_CHECK_MIN_SIZE
+                and info.file_size > app.config['EXTRACT_MAX_RATIO'] * max(info.compress_size, 1)):
+            raise UnsafeArchiveError(f"Compression ratio of {info.filename} exceeds {app.config['EXTRACT_MAX_RATIO']}")
+        total += info.file_size
+        if total > app.config['EXTRACT_MAX_SIZE']:
+            raise UnsafeArchiveError(f"Uncompressed size exceeds {app.config['EXTRACT_MAX_SIZE']} bytes")
+        members[path] = info  # a repeated name overwrites, as extractall would
+    check_path_clashes(members)
+    return [(info, path) for path, info in members.items()]
+
+def check_path_clashes(paths):
+    """UnsafeArchiveError if one of the (normalised) paths is also a parent folder of another"""
+    folders = {path.rsplit("/", 1)[0] for path in paths if "/" in path}
+    folders |= {folder.rsplit("/", i)[0] for folder in folders for i in range(1, folder.count("/") + 1)}
+    clashes = folders.intersection(paths)
+    if clashes:
+        raise UnsafeArchiveError(f"Entry is both a file and a folder: {min(clashes)}")
+
+def _extract_members(zip_path, members, target):
+    """Store one thread's share of the entries as blobs and link them into target; returns manifest entries.
+
+    ZipExtFile never yields more than an entry's declared file_size.
+    """
+    manifest = []
+    with zipfile.ZipFile(zip_path) as zip_ref:  # a handle per thread, so reads don't contend on one seek position
+        for info, path in members:
+            destination = os.path.join(target, *path.split("/"))
+            os.makedirs(os.path.dirname(destination), exist_ok=True)
+            with zip_ref.open(info) as source:
+                sha256, size = store_blob(source)
+            mtime = time.mktime(info.date_time + (0, 0, -1))
+            link_blob(sha256, destination, mtime)
+            manifest.append((path, sha256, size, mtime))
+    return manifest
+
+def extract_website_zip(zip_path, folder, swap_lock=contextlib.nullcontext()):
+    """Validate zip_path and replace folder with its contents, stored as blobs; the old site stays live until the rename.
+
+    zip_path may sit inside folder: it is read before the swap and removed along with the old site.
+    """
+    start = time.perf_counter()
+    try:
+        with zipfile.ZipFile(zip_path) as zip_ref:
+            members = scan_zip(zip_ref)
+    except (UnsafeArchiveError, zipfile.BadZipFile):
+        extraction_stats.reject()
+        raise
+    total = sum(info.file_size for info, path in members)
+    parent = os.path.dirname(os.path.abspath(folder))
+    if shutil.disk_usage(parent).free < total:
+        raise OSError(f"Not enough free disk space to extract {total} bytes")
+    
+    # Largest first, each to the least loaded thread, so one big file doesn't leave the others idle
+    threads = max(1, min(app.config['EXTRACT_THREADS'], len(members)))
+    shares = [[] for _ in range(threads)]
+    loads = [0] * threads
+    for member in sorted(members, key=lambda member: member[0].file_size, reverse=True):
+        n = loads.index(min(loads))
+        shares[n].append(member)
+        loads[n] += member[0].file_size + 4096  # count per-file overhead too
+    
+    with staged_site_folder(folder, swap_lock) as staging:
+        if threads == 1:
+            manifest = run_blocking(_extract_members, zip_path, shares[0], staging)
+        else:
+            manifest = [entry for entries in map_blocking(lambda share: _extract_members(zip_path, share, staging), shares, threads)
+                        for entry in entries]
+    manifest.sort()
+    result = ExtractResult(len(members), sum(entry[2] for entry in manifest), time.perf_counter() - start, manifest)
+    extraction_stats.record(result)
+    return result
+
+# ---------------- JOB QUEUE ----------------
+# Slow work after a request (extraction, archive builds, notifications) is
+# queued in the jobs table inside the request's own transaction and run by
+# workers: JOB_WORKER_THREADS threads in every web process, and/or
+# `flask run-worker` processes. A claim hides a job for
+# JOB_VISIBILITY_TIMEOUT, so work held by a crashed worker is retried.
+# Failures back off exponentially; after JOB_MAX_ATTEMPTS a job moves to
+# dead_jobs. Jobs sharing a lane run one at a time in the order they were
+# queued. Handlers must be idempotent, since a job can run again after a
+# crash between its work and its acknowledgement, or after it outlived its
+# claim (which is logged, and its uncommitted changes rolled back).
+JOB_HANDLERS = {}
+
+def job_handler(kind):
+    def register(fn):
+        JOB_HANDLERS[kind] = fn
+        return fn
+    return register
+
+_jobs_waiting = threading.Event()  # wakes this process's idle workers after an enqueue
+
+def enqueue_job(cur, kind, payload, key=None, lane=None):
+    """Queue a job in the caller's transaction; with a key, skip it if an equal job is still waiting to run.
+
+    A job with a lane waits until every earlier job in that lane is done.
+    """
+    now = time.time()
+    # A claimed job may already be past reading the state this one is queued for, so it doesn't count
+    if key and cur.execute("SELECT 1 FROM jobs WHERE key=? AND (locked_until IS NULL OR locked_until < ?)",
+                           (key, now)).fetchone():
+        return None
+    cur.execute("""INSERT INTO jobs(kind, payload, key, lane, max_attempts, run_at, created) VALUES(?,?,?,?,?,?,?)""",
+                (kind, json.dumps(payload), key, lane, app.config['JOB_MAX_ATTEMPTS'], now, now))
+    _jobs_waiting.set()
+    return cur.lastrowid
+
+def claim_job(worker_id):
+    """Lock the next due job for this worker; returns (id, kind, payload, attempts, max_attempts) or None"""
+    con = db()
+    now = time.time()
+    job = con.execute("""UPDATE jobs SET locked_by=?, locked_until=?, attempts=attempts+1
+        WHERE id = (SELECT id FROM jobs j WHERE run_at <= ? AND (locked_until IS NULL OR locked_until < ?)
+                    AND (lane IS NULL OR NOT EXISTS (SELECT 1 FROM jobs earlier WHERE earlier.lane = j.lane AND earlier.id < j.id))
+                    ORDER BY run_at, id LIMIT 1)
+        RETURNING id, kind, payload, attempts, max_attempts""",
+        (worker_id, now + app.config['JOB_VISIBILITY_TIMEOUT'], now, now)).fetchone()
+    con.commit()
+    return job
+
+def run_job(job, worker_id):
+    """Run a claimed job; success deletes it, failure schedules a retry or dead-letters it"""
+    job_id, kind, payload, attempts, max_attempts = job
+    con = db()
+    cur = con.cursor()
+    try:
+        JOB_HANDLERS[kind](cur, json.loads(payload))
+        cur.execute("DELETE FROM jobs WHERE id=? AND locked_by=?", (job_id, worker_id))
+        if not cur.rowcount:
+            # Another worker took the job over after JOB_VISIBILITY_TIMEOUT and will run it again
+            con.rollback()
+            app.logger.error("Job %s (%s) outlived its claim and was taken over; its pending changes were rolled back",
+                             job_id, kind)
+            return False
+        con.commit()
+        return True
+    except Exception as e:
+        con.rollback()
+        error = f"{type(e).__name__}: {e}"
+        app.logger.warning("Job %s (%s) attempt %s failed: %s", job_id, kind, attempts, error)
+        if attempts >= max_attempts:
+            cur.execute("""INSERT OR REPLACE INTO dead_jobs(id, kind, payload, attempts, last_error, created, failed)
+                SELECT id, kind, payload, attempts, ?, created, ? FROM jobs WHERE id=? AND locked_by=?""",
+                        (error, time.time(), job_id, worker_id))
+            cur.execute("DELETE FROM jobs WHERE id=? AND locked_by=?", (job_id, worker_id))
+            order_db_id = json.loads(payload).get("order_db_id")
+            if order_db_id and cur.rowcount:
+                cur.execute("UPDATE orders SET submission_state='failed', submission_error=? WHERE id=?", (error, order_db_id))
+        else:
+            delay = min(app.config['JOB_RETRY_DELAY'] * 2 ** (attempts - 1), 3600) * random.uniform(0.8, 1.2)
+            cur.execute("UPDATE jobs SET run_at=?, locked_by=NULL, locked_until=NULL, last_error=? WHERE id=? AND locked_by=?",
+                        (time.time() + delay, error, job_id, worker_id))
+        con.commit()
+        return False
+
+def work_jobs(worker_id, stop, burst=False):
+    """Run jobs until stop is set; with burst, return as soon as nothing is due"""
+    while not stop.is_set():
+        _jobs_waiting.clear()
+        with app.app_context():  # returns the pooled connection after every job
+            job = claim_job(worker_id)
+            if job:
+                run_job(job, worker_id)
+                continue
+        if burst:
+            return
+        _jobs_waiting.wait(app.config['JOB_POLL_INTERVAL'])
+
+def worker_name(suffix=""):
+    return f"{os.uname().nodename if hasattr(os, 'uname') else 'local'}:{os.getpid()}{suffix}"
+
+_job_threads_lock = threading.Lock()
+_job_threads_pid = None
+
+@app.before_request
+def start_job_threads():
+    # Like the checkpointer: started lazily so each gunicorn worker gets its own after the fork
+    global _job_threads_pid
+    threads = app.config['JOB_WORKER_THREADS']
+    if not threads or _job_threads_pid == os.getpid():
+        return
+    with _job_threads_lock:
+        if _job_threads_pid == os.getpid():
+            return
+        _job_threads_pid = os.getpid()
+        for n in range(threads):
+            threading.Thread(target=work_jobs, args=(worker_name(f"/{n}"), threading.Event()),
+                             name=f"jobs-{n}", daemon=True).start()
+
+@app.cli.command("run-worker")
+@click.option("--burst", is_flag=True, help="Exit once the queue has nothing due")
+def run_worker_command(burst):
+    """Process queued jobs until interrupted"""
+    import signal
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    print(f"✓ Worker {worker_name()} started")
+    try:
+        work_jobs(worker_name(), stop, burst=burst)
+    except KeyboardInterrupt:
+        pass
+
+@app.cli.command("retry-dead-jobs")
+def retry_dead_jobs_command():
+    """Move every dead-lettered job back onto the queue with fresh attempts"""
+    con = db()
+    cur = con.cursor()
+    cur.execute("""INSERT INTO jobs(kind, payload, max_attempts, run_at, created)
+        SELECT kind, payload, ?, ?, created FROM dead_jobs""", (app.config['JOB_MAX_ATTEMPTS'], time.time()))
+    retried = cur.rowcount
+    cur.execute("DELETE FROM dead_jobs")
+    con.commit()
+    print(f"✓ Requeued {retried} dead jobs")
+
+def job_stats():
+    con = db()
+    cur = con.cursor()
+    now = time.time()
+    cur.execute("""SELECT COUNT(*), IFNULL(SUM(locked_until >= ?), 0), IFNULL(SUM(attempts > 0 AND IFNULL(locked_until, 0) < ?), 0)
+        FROM jobs""", (now, now))
+    pending, running, retrying = cur.fetchone()
+    cur.execute("SELECT id, kind, attempts, last_error, failed FROM dead_jobs ORDER BY failed DESC LIMIT 20")
+    dead = [dict(zip(("id", "kind", "attempts", "last_error", "failed"), row)) for row in cur.fetchall()]
+    dead_total = cur.execute("SELECT COUNT(*) FROM dead_jobs").fetchone()[0]
+    return {"pending": pending, "running": running, "retrying": retrying, "dead": dead_total, "recent_dead": dead}
+
+SUBMISSION_PROCESSING_STATES = ("queued", "extracting", "archiving")
+
+def set_submission_state(cur, order_db_id, state, error=None):
+    cur.execute("UPDATE orders SET submission_state=?, submission_error=? WHERE id=?", (state, error, order_db_id))
+
+@job_handler("extract_submission")
+def extract_submission_job(cur, payload):
+    order_db_id = payload["order_db_id"]
+    set_submission_state(cur, order_db_id, "extracting")
+    cur.connection.commit()  # visible to the admin's status poll while it runs
+    file_path = payload["file_path"]
+    if file_path and file_path.endswith('.zip') and os.path.exists(file_path):
+        try:
+            result = extract_website_zip(file_path, website_folder_path(order_db_id), archive_lock(order_db_id))
+        except (UnsafeArchiveError, zipfile.BadZipFile) as e:
+            # Retrying can't fix the zip itself: fail the submission now and drop the upload
+            os.remove(file_path)
+            set_submission_state(cur, order_db_id, "failed", f"Rejected archive: {e}")
+            return
+        record_website_manifest(cur, order_db_id, result.manifest)
+        app.logger.info("Extracted order %s: %s files, %s bytes in %.2fs (%.0f files/s, %.0f bytes/s)",
+                        order_db_id, result.files, result.bytes, result.seconds,
+                        result.files / max(result.seconds, 1e-6), result.bytes / max(result.seconds, 1e-6))
+    set_submission_state(cur, order_db_id, "archiving")
+    enqueue_publish(cur, payload)
+
+def submission_lane(order_db_id):
+    """Job lane of an order's extractions, delta swaps and publish builds, so a resubmission waits its turn"""
+    return f"submission:{order_db_id}"
+
+def enqueue_publish(cur, payload):
+    """Queue the build that marks a submission ready and notifies the customer.
+
+    Its key differs from the plain builds downloads queue, so a pending one of those can't swallow it.
+    """
+    order_db_id = payload["order_db_id"]
+    enqueue_job(cur, "build_archive", dict(payload, publish=True), key=f"build_archive:{order_db_id}:publish",
+                lane=submission_lane(order_db_id))
+
+@job_handler("apply_delta")
+def apply_delta_job(cur, payload):
+    order_db_id = payload["order_db_id"]
+    cur.execute("SELECT manifest FROM delta_submissions WHERE id=?", (payload["delta_id"],))
+    manifest = [tuple(entry) for entry in json.loads(cur.fetchone()[0])]
+    set_submission_state(cur, order_db_id, "extracting")
+    cur.connection.commit()
+    missing = missing_blobs(manifest)
+    if missing:
+        # Only possible if gc-blobs ran between the upload and now; the admin has to send the delta again
+        set_submission_state(cur, order_db_id, "failed", f"{len(missing)} files are no longer stored, submit again")
+        return
+    with staged_site_folder(website_folder_path(order_db_id), archive_lock(order_db_id)) as staging:
+        for path, sha256, size, mtime in manifest:
+            destination = os.path.join(staging, *path.split("/"))
+            os.makedirs(os.path.dirname(destination), exist_ok=True)
+            link_blob(sha256, destination, mtime)
+    record_website_manifest(cur, order_db_id, manifest)
+    set_submission_state(cur, order_db_id, "archiving")
+    enqueue_publish(cur, payload)
+
+@job_handler("build_archive")
+def build_archive_job(cur, payload):
+    order_db_id = payload["order_db_id"]
+    build_website_archive(order_db_id)
+    if not payload.get("publish"):
+        return
+    cur.execute("UPDATE orders SET folder_submitted=1, folder_submitted_at=? WHERE id=?", 
+               (datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S'), order_db_id))
+    set_submission_state(cur, order_db_id, "ready")
+    enqueue_job(cur, "notify_submission", payload)
+
+@job_handler("notify_submission")
+def notify_submission_job(cur, payload):
+    cur.execute("SELECT order_id, user_id FROM orders WHERE id=?", (payload["order_db_id"],))
+    order_id, user_id = cur.fetchone()
+    notification_msg = f"Your website folder for order {order_id} has been submitted and is ready for download!"
+    cur.execute("INSERT INTO notifications(user_id, message, sender_id, order_ref) VALUES(?,?,?,?)",
+               (user_id, notification_msg, payload.get("sender_id"), payload["order_db_id"]))
+
+# ---------------- ORDER CHAT ----------------
+# Order pages follow their chat over Server-Sent Events. Every worker runs
+# one hub thread that looks for new messages (one primary-key range query
+# after its high-water mark per CHAT_POLL_INTERVAL however many streams are
+# open, and at once when this worker inserted one) and hands them to the
+# streams of their order. A reconnecting stream catches up on its own order
+# with an indexed query and then joins at the hub's mark.
+# An idle stream is only a generator waiting on an Event; gunicorn.conf.py
+# runs gevent workers so each one can hold CHAT_MAX_STREAMS of them, where
+# a sync worker would be tied up by each open stream. Streams end after
+# CHAT_STREAM_TIMEOUT and EventSource reconnects with Last-Event-ID, so
+# nothing is missed.
+#   GET  /chat/<order_id>/events      text/event-stream, one event per message
+#   POST /chat/<order_id>/messages    {"message"} -> the stored message
+ChatMessage = namedtuple("ChatMessage", "id order_db_id message sender created")
+
+class ChatSubscription:
+    """One open stream: messages of its order after last_id, waiting to be sent"""
+
+    def __init__(self, order_db_id, last_id):
+        self.order_db_id = order_db_id
+        self.last_id = last_id
+        self.pending = []
+        self.ready = threading.Event()
+
+class ChatHub:
+    """Per-process fan-out of new chat messages to the open streams of their order"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = {}  # orders.id -> set of ChatSubscription
+        self._wake = threading.Event()
+        self._thread_pid = None
+        self._high_water = None  # newest message id the hub has looked at; None while nobody listens
+
+    def subscribe(self, order_db_id):
+        """A stream for messages of the order newer than subscription.last_id, the hub's mark.
+
+        Older ones are the caller's to catch up on. Needs an app context.
+        """
+        with self._lock:
+            if sum(map(len, self._subscriptions.values())) >= app.config['CHAT_MAX_STREAMS']:
+                return None
+            if self._high_water is None:
+                cur = db().cursor()
+                cur.execute("SELECT IFNULL(MAX(id), 0) FROM messages")
+                self._high_water = cur.fetchone()[0]
+            subscription = ChatSubscription(order_db_id, self._high_water)
+            self._subscriptions.setdefault(order_db_id, set()).add(subscription)
+            if self._thread_pid != os.getpid():  # started lazily so each gunicorn worker gets its own after the fork
+                self._thread_pid = os.getpid()
+                threading.Thread(target=self._run, name="chat-hub", daemon=True).start()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.order_db_id, set())
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                self._subscriptions.pop(subscription.order_db_id, None)
+
+    def notify(self):
+        """A message was inserted by this worker: look now instead of at the next poll"""
+        self._wake.set()
+
+    def receive(self, subscription, timeout):
+        """Messages for the stream, or [] if none arrived within timeout"""
+        if not subscription.ready.wait(timeout):
+            return []
+        with self._lock:
+            messages = subscription.pending
+            subscription.pending = []
+            subscription.ready.clear()
+        return messages
+
+    def stats(self):
+        with self._lock:
+            return {"orders": len(self._subscriptions), "streams": sum(map(len, self._subscriptions.values()))}
+
+    def _run(self):
+        while True:
+            self._wake.wait(app.config['CHAT_POLL_INTERVAL'])
+            self._wake.clear()
+            with self._lock:
+                if not self._subscriptions:
+                    self._high_water = None  # re-read by the next subscribe rather than walking what was missed
+                    continue
+                since = self._high_water
+            try:
+                with app.app_context():
+                    cur = db().cursor()
+                    cur.execute("SELECT id, order_id, message, sender, created FROM messages WHERE id > ? ORDER BY id LIMIT 1000",
+                                (since,))
+                    messages = [ChatMessage(*row) for row in cur.fetchall()]
+            except sqlite3.Error:
+                app.logger.exception("Chat hub poll failed")
+                continue
+            if messages:
+                self._deliver(messages)
+
+    def _deliver(self, messages):
+        newest = messages[-1].id
+        with self._lock:
+            self._high_water = max(self._high_water or 0, newest)
+            for subscriptions in self._subscriptions.values():
+                for subscription in subscriptions:
+                    new = [m for m in messages if m.order_db_id == subscription.order_db_id and m.id > subscription.last_id]
+                    subscription.last_id = max(subscription.last_id, newest)
+                    if new:
+                        subscription.pending.extend(new)
+                        subscription.ready.set()
+        if len(messages) == 1000:
+            self._wake.set()  # more are waiting
+
+chat_hub = ChatHub()
+
+def chat_message_json(message):
+    return {"id": message.id, "message": message.message, "sender": message.sender, "created": message.created}
+
+def post_chat_message(cur, order_db_id, user_id, message, sender):
+    """Store a chat message; admin messages also notify the customer. The caller commits, then calls chat_hub.notify()"""
+    cur.execute("""INSERT INTO messages (order_id, user_id, message, sender) VALUES(?,?,?,?)
+        RETURNING id, order_id, message, sender, created""", (order_db_id, user_id, message, sender))
+    stored = ChatMessage(*cur.fetchone())
+    if sender == "admin":
+        cur.execute("SELECT order_id FROM orders WHERE id=?", (order_db_id,))
+        order_number = cur.fetchone()[0]
+        cur.execute("""INSERT INTO notifications (user_id, message, sender_id, order_ref) VALUES(?,?,?,?)""",
+                    (user_id, f"New message from admin regarding order {order_number}: {message}", current_user.id, order_db_id))
+    return stored
+
+def chat_order(order_id):
+    """(orders.id, customer id) of an order the current user may chat on, or None"""
+    cur = db().cursor()
+    if current_user.role == "admin":
+        cur.execute("SELECT id, user_id FROM orders WHERE order_id=?", (order_id,))
+    else:
+        cur.execute("SELECT id, user_id FROM orders WHERE order_id=? AND user_id=?", (order_id, current_user.id))
+    return cur.fetchone()
+
+@app.route("/chat/<order_id>/events")
+@login_required
+def chat_events(order_id):
+    order = chat_order(order_id)
+    if not order:
+        return "Order not found", 404
+    last_id = request.headers.get("Last-Event-ID") or request.args.get("after")
+    subscription = chat_hub.subscribe(order[0])
+    if subscription is None:
+        return Response("retry: 10000\n\n", status=503, mimetype="text/event-stream")
+    missed = []
+    if last_id is not None and str(last_id).isdigit():
+        # What this order got while the stream was away; the hub sends everything after its mark
+        cur = db().cursor()
+        cur.execute("""SELECT id, order_id, message, sender, created FROM messages
+            WHERE order_id=? AND id > ? AND id <= ? ORDER BY id""", (order[0], int(last_id), subscription.last_id))
+        missed = [ChatMessage(*row) for row in cur.fetchall()]
+    
+    # Runs after the request context is gone: no db() in here
+    heartbeat = app.config['CHAT_HEARTBEAT']
+    deadline = time.monotonic() + app.config['CHAT_STREAM_TIMEOUT']
+    def stream():
+        try:
+            yield "retry: 3000\n\n"
+            messages = missed
+            while True:
+                for message in messages:
+                    yield f"id: {message.id}\ndata: {json.dumps(chat_message_json(message))}\n\n"
+                if time.monotonic() >= deadline:
+                    break
+                messages = chat_hub.receive(subscription, min(heartbeat, max(deadline - time.monotonic(), 0)))
+                if not messages:
+                    yield ": keep-alive\n\n"  # also how a closed connection is noticed
+        finally:
+            chat_hub.unsubscribe(subscription)
+    
+    return Response(stream(), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache, no-transform", "X-Accel-Buffering": "no"})
+
+@app.route("/chat/<order_id>/messages", methods=["POST"])
+@login_required
+def chat_send(order_id):
+    data = request.get_json(silent=True) or {}
+    message = str(data.get("message") or "").strip()
+    if not message:
+        return jsonify({"success": False, "error": "Message is empty"}), 400
+    order = chat_order(order_id)
+    if not order:
+        return jsonify({"success": False, "error": "Order not found"}), 404
+    
+    con = db()
+    cur = con.cursor()
+    sender = "admin" if current_user.role == "admin" else "user"
+    stored = post_chat_message(cur, order[0], order[1] if sender == "admin" else current_user.id, message, sender)
+    con.commit()
+    chat_hub.notify()
+    return jsonify(dict(chat_message_json(stored), success=True)), 201
+
+# ---------------- ROUTES ----------------
+@app.route("/")
+@conditional_page(catalog=True)
+def home():
+    if current_user.is_authenticated:
+        return redirect("/dashboard")
+    
+    template_cards = get_template_cards(member=False)
     
     return render_base_template("Home", f'''
     <div class="content-wrapper">
@@ -2083,7 +2972,6 @@ def signup():
             # Check if email exists
             cur.execute("SELECT id FROM users WHERE email=?", (request.form["email"],))
             if cur.fetchone():
-                con.close()
                 return render_base_template("Signup", f"""
                 <div class="auth-container">
                     <div class="auth-card">
@@ -2172,7 +3060,6 @@ def signup():
                 "user"
             ))
             con.commit()
-            con.close()
             
             return render_base_template("Signup Success", """
             <div class="auth-container">
@@ -2196,7 +3083,6 @@ def signup():
             """)
             
         except Exception as e:
-            con.close()
             return render_base_template("Error", f"""
             <div class="auth-container">
                 <div class="auth-card">
@@ -2294,7 +3180,6 @@ def login():
         cur = con.cursor()
         cur.execute("SELECT id, password, role, fullname FROM users WHERE email=?", (request.form["email"],))
         u = cur.fetchone()
-        con.close()
         
         if u and bcrypt.check_password_hash(u[1], request.form["password"]):
             login_user(User(u[0], request.form["email"], u[2], u[3]))
@@ -2373,63 +3258,9 @@ def login():
 
 @app.route("/dashboard")
 @login_required
+@conditional_page(catalog=True)
 def dashboard():
-    templates = get_all_templates()
-    
-    template_cards = ""
-    for template in templates:
-        id, name, description, category, features_str, original_price, discount_price, has_discount, tag, image_url, preview_url, status, created = template
-        
-        features = features_str.split(',') if features_str else []
-        
-        price_html = ""
-        if has_discount:
-            price_html = f'''
-            <div class="template-price">
-                <span class="original-price">${original_price}</span>
-                <span class="discount-price">${discount_price}</span>
-            </div>
-            '''
-        else:
-            price_html = f'''
-            <div class="template-price">
-                <span class="discount-price">${original_price}</span>
-            </div>
-            '''
-        
-        tag_html = f'<div class="template-badge">{tag}</div>' if tag else ""
-        
-        features_html = "".join([f'<li><i class="fas fa-check"></i> {feature}</li>' for feature in features[:3]])
-        
-        if image_url and os.path.exists(os.path.join(app.config['UPLOAD_FOLDER'], image_url)):
-            image_html = f'<img src="/static/uploads/{image_url}" alt="{name}">'
-        else:
-            image_html = f'<i class="fas fa-image fa-3x"></i><p class="mt-2">{name}</p>'
-        
-        template_cards += f'''
-        <div class="template-card">
-            <div class="template-image">
-                {image_html}
-                {tag_html}
-                {price_html}
-            </div>
-            <div class="template-content">
-                <h3 class="template-title">{name}</h3>
-                <p class="template-description">{description}</p>
-                <ul class="template-features">
-                    {features_html}
-                </ul>
-                <div class="template-buttons">
-                    <a href="{preview_url}" target="_blank" class="template-button preview-button">
-                        <i class="fas fa-eye me-2"></i>Preview Web
-                    </a>
-                    <a href="/order-template/{id}" class="template-button">
-                        <i class="fas fa-shopping-cart me-2"></i>Order Now
-                    </a>
-                </div>
-            </div>
-        </div>
-        '''
+    template_cards = get_template_cards(member=True)
     
     return render_base_template("Dashboard", f'''
     <div class="content-wrapper">
@@ -2567,11 +3398,9 @@ def submit_template_order(template_id):
         ))
         
         con.commit()
-        con.close()
         
         return redirect("/orders")
     except Exception as e:
-        con.close()
         return f"Error: {str(e)}", 400
 
 @app.route("/custom-web")
@@ -2888,7 +3717,6 @@ def submit_custom_order():
         ))
         
         con.commit()
-        con.close()
         
         return jsonify({"success": True, "order_id": order_id})
     except Exception as e:
@@ -2896,16 +3724,35 @@ def submit_custom_order():
 
 @app.route("/orders")
 @login_required
+@conditional_page()
 def orders():
+    # Keyset pagination: ?before=<orders.id of the last order on the previous page>
+    before = request.args.get("before", type=int)
+    page_size = app.config['ORDERS_PAGE_SIZE']
+    
     con = db()
     cur = con.cursor()
-    cur.execute("SELECT order_id, website_type, stage, status, created, folder_submitted FROM orders WHERE user_id=? ORDER BY id DESC", (current_user.id,))
+    # One statement for the whole page, unread counts aggregated per order alongside
+    cur.execute("""
+        SELECT o.id, o.order_id, o.website_type, o.stage, o.status, o.created, o.folder_submitted, IFNULL(n.unread, 0)
+        FROM orders o
+        LEFT JOIN (
+            SELECT order_ref, COUNT(*) AS unread
+            FROM notifications
+            WHERE user_id=? AND is_read=0 AND order_ref IS NOT NULL
+            GROUP BY order_ref
+        ) n ON n.order_ref = o.id
+        WHERE o.user_id=? AND o.id < ?
+        ORDER BY o.id DESC
+        LIMIT ?
+    """, (current_user.id, current_user.id, before or 2**63 - 1, page_size + 1))
     rows = cur.fetchall()
-    con.close()
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
     
     unread_orders_count = get_unread_orders_count(current_user.id)
     
-    if not rows:
+    if not rows and not before:
         return render_base_template("My Orders", """
         <div class="content-wrapper">
             <div style="padding: 40px 20px; text-align: center;">
@@ -2921,16 +3768,9 @@ def orders():
     
     orders_html = ""
     for order in rows:
-        order_id, website_type, stage, status, created, folder_submitted = order
+        order_db_id, order_id, website_type, stage, status, created, folder_submitted, order_unread = order
         status_color = "success" if status == "Granted" else "warning" if status == "Pending" else "info"
         
-        # Check for unread notifications for this order
-        con_temp = db()
-        cur_temp = con_temp.cursor()
-        cur_temp.execute("SELECT COUNT(*) FROM notifications WHERE user_id=? AND message LIKE ? AND is_read=0", 
-                        (current_user.id, f"%{order_id}%"))
-        order_unread = cur_temp.fetchone()[0]
-        
         # Check if folder is submitted
         folder_badge = ""
         if folder_submitted == 1:
@@ -2958,7 +3798,16 @@ def orders():
             </div>
         </div>
         """
-        con_temp.close()
+    
+    pagination_html = ""
+    if has_more:
+        pagination_html = f"""
+        <div class="text-center mb-3">
+            <a href="/orders?before={rows[-1][0]}" class="btn btn-outline-primary btn-sm">
+                <i class="fas fa-chevron-down me-2"></i>Older Orders
+            </a>
+        </div>
+        """
     
     return render_base_template("My Orders", f"""
     <div class="content-wrapper">
@@ -2970,6 +3819,7 @@ def orders():
                 </a>
             </div>
             {orders_html}
+            {pagination_html}
         </div>
     </div>
     """, unread_orders_count=unread_orders_count)
@@ -2983,7 +3833,6 @@ def order_details(order_id):
     order = cur.fetchone()
     
     if not order:
-        con.close()
         return "Order not found", 404
     
     # Get messages for this order
@@ -2991,18 +3840,16 @@ def order_details(order_id):
     messages = cur.fetchall()
     
     # Mark notifications for this order as read
-    cur.execute("UPDATE notifications SET is_read=1 WHERE user_id=? AND message LIKE ?", 
-                (current_user.id, f"%{order_id}%"))
+    cur.execute("UPDATE notifications SET is_read=1 WHERE order_ref=? AND is_read=0", (order[0],))
     
     con.commit()
-    con.close()
     
     messages_html = ""
     for msg in messages:
         msg_class = "user-message" if msg[4] == "user" else "bot-message"
         sender_name = "You" if msg[4] == "user" else "Admin"
         messages_html += f"""
-        <div class="chat-message {msg_class}">
+        <div class="chat-message {msg_class}" data-message-id="{msg[0]}">
             <small class="text-muted">{sender_name} • {msg[5]}</small>
             <p class="mb-0">{msg[3]}</p>
         </div>
@@ -3025,12 +3872,12 @@ def order_details(order_id):
             </div>
         </div>
         
-        <div class="chat-messages" id="messagesArea">
-            {messages_html if messages_html else '<div class="text-center text-muted" style="padding: 40px;"><i class="fas fa-comments fa-3x mb-3"></i><p>No messages yet</p></div>'}
+        <div class="chat-messages" id="messagesArea" data-chat-order="{order_id}" data-user-label="You" data-admin-label="Admin">
+            {messages_html if messages_html else '<div class="text-center text-muted" data-chat-empty style="padding: 40px;"><i class="fas fa-comments fa-3x mb-3"></i><p>No messages yet</p></div>'}
         </div>
         
         {f'''<div class="chat-input-wrapper">
-            <form method="post" action="/send-message/{order_id}">
+            <form method="post" action="/send-message/{order_id}" data-chat-form>
                 <div class="input-group">
                     <input type="text" name="message" class="form-control chat-input" placeholder="Type your message..." required>
                     <button class="chat-send-btn" type="submit">
@@ -3068,12 +3915,10 @@ def send_message(order_id):
     
     if order_row:
         order_db_id = order_row[0]
-        cur.execute("""INSERT INTO messages (order_id, user_id, message, sender) 
-                      VALUES(?,?,?,?)""", 
-                    (order_db_id, current_user.id, message, "user"))
+        post_chat_message(cur, order_db_id, current_user.id, message, "user")
         con.commit()
+        chat_hub.notify()
     
-    con.close()
     return redirect(f"/order-details/{order_id}")
 
 @app.route("/account")
@@ -3084,16 +3929,8 @@ def account():
     cur.execute("SELECT fullname, email, whatsapp, gender, dob, profession FROM users WHERE id=?", (current_user.id,))
     user_data = cur.fetchone()
     
-    cur.execute("SELECT COUNT(*) FROM orders WHERE user_id=?", (current_user.id,))
-    order_count = cur.fetchone()[0]
-    
-    # Get unread notifications
-    unread_notifications = get_unread_notifications_count(current_user.id)
-    
-    # Get completed websites count
-    completed_websites = get_completed_websites_count(current_user.id)
-    
-    con.close()
+    # Badge and stats counters in a single lookup
+    unread_notifications, unread_orders, completed_websites, order_count = get_user_counters(current_user.id)
     
     # Create badge for unread notifications
     notification_badge = ""
@@ -3218,7 +4055,6 @@ def your_web():
     
     completed_websites = cur.fetchall()
     
-    con.close()
     
     if not completed_websites:
         return render_base_template("Your Web", """
@@ -3290,13 +4126,12 @@ def download_website(order_id):
     order = cur.fetchone()
     
     if not order:
-        con.close()
         return "Website not found or not ready", 404
     
     order_id_db, website_name = order
     
     # Check if website folder exists
-    website_folder = os.path.join(app.config['WEBSITE_FOLDER'], str(order_id_db))
+    website_folder = website_folder_path(order_id_db)
     
     if not os.path.exists(website_folder):
         # Create a sample index.html if folder doesn't exist
@@ -3333,25 +4168,27 @@ def download_website(order_id):
         with open(os.path.join(website_folder, 'index.html'), 'w') as f:
             f.write(sample_html)
     
-    # Create zip file
-    zip_filename = f"{order_id}_website.zip"
-    zip_path = os.path.join(app.config['WEBSITE_FOLDER'], zip_filename)
-    
-    # Create zip file
-    with zipfile.ZipFile(zip_path, 'w') as zipf:
-        for root, dirs, files in os.walk(website_folder):
-            for file in files:
-                file_path = os.path.join(root, file)
-                arcname = os.path.relpath(file_path, website_folder)
-                zipf.write(file_path, arcname)
-    
-    con.close()
-    
-    # Send the zip file
-    return send_file(zip_path, as_attachment=True, download_name=zip_filename)
+    download_name = f"{order_id}_website.zip"
+    archive = find_website_archive(order_id_db)
+    if not archive and request.range:
+        # A resumed or segmented download needs the exact bytes it started on
+        archive = build_website_archive(order_id_db)
+    if archive:
+        zip_path, content_hash = archive
+        # Range, If-Range and Accept-Ranges are handled by send_file (conditional by default) or the proxy
+        return deliver_file(zip_path, as_attachment=True, download_name=download_name, etag=content_hash)
+    
+    # Not prebuilt yet: stream this download straight from the folder and
+    # build the archive for the next one
+    enqueue_job(cur, "build_archive", {"order_db_id": order_id_db}, key=f"build_archive:{order_id_db}")
+    con.commit()
+    return Response(stream_zip(website_files(website_folder)), mimetype="application/zip",
+                    headers={"Content-Disposition": f'attachment; filename="{download_name}"',
+                             "Accept-Ranges": "none"})
 
 @app.route("/notifications")
 @login_required
+@conditional_page()
 def notifications():
     con = db()
     cur = con.cursor()
@@ -3360,9 +4197,8 @@ def notifications():
     rows = cur.fetchall()
     
     # Mark as read
-    cur.execute("UPDATE notifications SET is_read=1 WHERE user_id=?", (current_user.id,))
+    cur.execute("UPDATE notifications SET is_read=1 WHERE user_id=? AND is_read=0", (current_user.id,))
     con.commit()
-    con.close()
     
     if not rows:
         return render_base_template("Notifications", """
@@ -3409,6 +4245,12 @@ def notifications():
     """)
 
 # ---------------- ADMIN FOLDER SUBMISSION ----------------
+def queue_website_submission(cur, order_db_id, file_path):
+    """Hand a saved submission to the job queue: extract, build the archive, then mark ready and notify"""
+    set_submission_state(cur, order_db_id, "queued")
+    enqueue_job(cur, "extract_submission", {"order_db_id": order_db_id, "file_path": file_path, "sender_id": current_user.id},
+                lane=submission_lane(order_db_id))
+
 @app.route("/admin/submit-folder", methods=["GET", "POST"])
 @login_required
 def admin_submit_folder():
@@ -3435,45 +4277,29 @@ def admin_submit_folder():
         order_db_id, user_id, website_name = order
         
         # Create folder for website
-        website_folder = os.path.join(app.config['WEBSITE_FOLDER'], str(order_db_id))
+        website_folder = website_folder_path(order_db_id)
         os.makedirs(website_folder, exist_ok=True)
         
         # Save uploaded files
+        file_path = None
         if folder.filename:
-            filename = secure_filename(folder.filename)
-            file_path = os.path.join(website_folder, filename)
-            folder.save(file_path)
-            
-            # If it's a zip file, extract it
-            if filename.endswith('.zip'):
-                with zipfile.ZipFile(file_path, 'r') as zip_ref:
-                    zip_ref.extractall(website_folder)
-                os.remove(file_path)  # Remove the zip file after extraction
-        
-        # Update order
-        cur.execute("UPDATE orders SET folder_submitted=1, folder_submitted_at=? WHERE id=?", 
-                   (datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S'), order_db_id))
-        
-        # Add notification for user
-        notification_msg = f"Your website folder for order {order_id} has been submitted and is ready for download!"
-        cur.execute("INSERT INTO notifications(user_id, message, sender_id) VALUES(?,?,?)",
-                   (user_id, notification_msg, current_user.id))
+            file_path = os.path.join(website_folder, secure_filename(folder.filename))
+            replace_site_file(folder.save, file_path)
         
+        queue_website_submission(cur, order_db_id, file_path)
         con.commit()
-        con.close()
         
         return redirect("/admin/submit-folder?success=1")
     
     # Get all orders
     cur.execute("""
-        SELECT o.order_id, o.website_type, o.website_name, o.created, u.fullname, o.folder_submitted 
+        SELECT o.order_id, o.website_type, o.website_name, o.created, u.fullname, o.folder_submitted, o.submission_state 
         FROM orders o 
         JOIN users u ON o.user_id = u.id 
         WHERE o.status='Granted' 
         ORDER BY o.id DESC
     """)
     orders = cur.fetchall()
-    con.close()
     
     success_msg = ""
     if request.args.get('success'):
@@ -3486,9 +4312,17 @@ def admin_submit_folder():
     
     orders_html = ""
     for order in orders:
-        order_id, website_type, website_name, created, fullname, folder_submitted = order
+        order_id, website_type, website_name, created, fullname, folder_submitted, submission_state = order
         folder_badge = "bg-success" if folder_submitted == 1 else "bg-warning"
         folder_text = "Submitted" if folder_submitted == 1 else "Pending"
+        poll_attr = ""
+        if submission_state in SUBMISSION_PROCESSING_STATES:
+            folder_badge = "bg-info"
+            folder_text = f"Processing: {submission_state}"
+            poll_attr = f' data-poll-submission="{order_id}"'
+        elif submission_state == "failed":
+            folder_badge = "bg-danger"
+            folder_text = "Failed"
         
         orders_html += f"""
         <tr class="animate-slide-up">
@@ -3499,7 +4333,7 @@ def admin_submit_folder():
             <td>{website_type}</td>
             <td>{website_name or 'N/A'}</td>
             <td>{created}</td>
-            <td><span class="badge {folder_badge}">{folder_text}</span></td>
+            <td><span class="badge {folder_badge}"{poll_attr}>{folder_text}</span></td>
             <td>
                 <button class="btn btn-sm btn-primary" onclick="selectOrder('{order_id}', '{website_name or order_id}')">
                     <i class="fas fa-upload me-1"></i>Select
@@ -3543,6 +4377,18 @@ def admin_submit_folder():
                                     <i class="fas fa-upload me-2"></i>Submit Folder
                                 </button>
                             </form>
+                            <hr>
+                            <form id="deltaForm">
+                                <div class="mb-3">
+                                    <label class="form-label">Or upload only what changed</label>
+                                    <input type="file" name="site" class="form-control" webkitdirectory multiple required>
+                                    <small class="text-muted">Pick the website folder; files the server already has are skipped</small>
+                                </div>
+                                
+                                <button type="submit" class="btn btn-outline-success w-100">
+                                    <i class="fas fa-sync-alt me-2"></i>Upload Changes
+                                </button>
+                            </form>
                         </div>
                     </div>
                 </div>
@@ -3589,9 +4435,504 @@ def admin_submit_folder():
             document.getElementById('selectedOrder').value = orderParam;
             document.getElementById('orderIdInput').value = orderParam;
         }}
+        
+        // Follow submissions through the job queue until they are ready or failed
+        document.querySelectorAll('[data-poll-submission]').forEach(function (badge) {{
+            const timer = setInterval(async function () {{
+                const response = await fetch('/admin/submission-status/' + badge.dataset.pollSubmission).catch(() => null);
+                if (!response || !response.ok) return;
+                const status = await response.json();
+                if (status.state === 'ready') {{
+                    badge.className = 'badge bg-success';
+                    badge.textContent = 'Submitted';
+                }} else if (status.state === 'failed') {{
+                    badge.className = 'badge bg-danger';
+                    badge.textContent = 'Failed';
+                    badge.title = status.error || '';
+                }} else {{
+                    badge.textContent = 'Processing: ' + status.state;
+                    return;
+                }}
+                clearInterval(timer);
+            }}, 2000);
+        }});
+        
+        // Send the file in chunks so size is not limited by MAX_CONTENT_LENGTH;
+        // an interrupted upload picks up from the chunks the server already has
+        async function sha256Hex(blob) {{
+            if (!window.crypto || !crypto.subtle) return null;
+            const digest = await crypto.subtle.digest('SHA-256', await blob.arrayBuffer());
+            return Array.from(new Uint8Array(digest)).map(b => b.toString(16).padStart(2, '0')).join('');
+        }}
+        
+        async function uploadChunked(form, file, orderId) {{
+            const button = form.querySelector('button[type=submit]');
+            const resumeKey = 'upload:' + orderId + ':' + file.name + ':' + file.size + ':' + file.lastModified;
+            let status = null;
+            const resumeId = localStorage.getItem(resumeKey);
+            if (resumeId) {{
+                const response = await fetch('/admin/uploads/' + resumeId);
+                if (response.ok) status = await response.json();
+            }}
+            if (!status || status.finalized) {{
+                const response = await fetch('/admin/uploads', {{
+                    method: 'POST',
+                    headers: {{'Content-Type': 'application/json'}},
+                    body: JSON.stringify({{order_id: orderId, filename: file.name, size: file.size}})
+                }});
+                status = await response.json();
+                if (!status.success) throw new Error(status.error);
+                localStorage.setItem(resumeKey, status.upload_id);
+            }}
+            const received = new Set(status.received);
+            for (let index = 0; index < status.chunks; index++) {{
+                if (received.has(index)) continue;
+                const chunk = file.slice(index * status.chunk_size, (index + 1) * status.chunk_size);
+                const headers = {{'Content-Type': 'application/octet-stream'}};
+                const checksum = await sha256Hex(chunk);
+                if (checksum) headers['X-Chunk-SHA256'] = checksum;
+                for (let attempt = 1; ; attempt++) {{
+                    const response = await fetch('/admin/uploads/' + status.upload_id + '/chunks/' + index, {{method: 'PUT', headers: headers, body: chunk}}).catch(() => null);
+                    if (response && response.ok) break;
+                    if (attempt === 3) throw new Error('Chunk ' + index + ' failed, submit again to resume');
+                    await new Promise(resolve => setTimeout(resolve, 1000 * attempt));
+                }}
+                button.innerHTML = '<i class="fas fa-spinner fa-spin me-2"></i>Uploading ' + Math.round(100 * (index + 1) / status.chunks) + '%';
+            }}
+            const response = await fetch('/admin/uploads/' + status.upload_id + '/finalize', {{method: 'POST'}});
+            const result = await response.json();
+            if (!result.success) throw new Error(result.error);
+            localStorage.removeItem(resumeKey);
+        }}
+        
+        // Hash the folder, let the server say which files it lacks and send only those
+        async function putBlob(deltaId, entry) {{
+            for (let attempt = 1; ; attempt++) {{
+                const response = await fetch('/admin/deltas/' + deltaId + '/blobs/' + entry.sha256, {{method: 'PUT', headers: {{'Content-Type': 'application/octet-stream'}}, body: entry.file}}).catch(() => null);
+                if (response && response.ok) return;
+                if (attempt === 3) throw new Error(entry.path + ' failed to upload, submit again');
+                await new Promise(resolve => setTimeout(resolve, 1000 * attempt));
+            }}
+        }}
+        
+        async function uploadDelta(form, files, orderId) {{
+            if (!window.crypto || !crypto.subtle) throw new Error('Hashing files needs HTTPS, submit a ZIP instead');
+            const button = form.querySelector('button[type=submit]');
+            const entries = [];
+            for (const file of files) {{
+                const path = file.webkitRelativePath.split('/').slice(1).join('/') || file.name;
+                entries.push({{file: file, path: path, size: file.size, mtime: file.lastModified / 1000, sha256: await sha256Hex(file)}});
+                button.innerHTML = '<i class="fas fa-spinner fa-spin me-2"></i>Hashing ' + Math.round(100 * entries.length / files.length) + '%';
+            }}
+            let response = await fetch('/admin/deltas', {{
+                method: 'POST',
+                headers: {{'Content-Type': 'application/json'}},
+                body: JSON.stringify({{order_id: orderId, files: entries.map(entry => ({{path: entry.path, sha256: entry.sha256, size: entry.size, mtime: entry.mtime}}))}})
+            }});
+            const delta = await response.json();
+            if (!delta.success) throw new Error(delta.error);
+            const bySha = new Map(entries.map(entry => [entry.sha256, entry]));
+            async function send(missing) {{
+                for (let index = 0; index < missing.length; index++) {{
+                    const entry = bySha.get(missing[index]);
+                    if (entry.size > delta.max_blob_size) throw new Error(entry.path + ' is too large for a delta, submit a ZIP instead');
+                    await putBlob(delta.delta_id, entry);
+                    button.innerHTML = '<i class="fas fa-spinner fa-spin me-2"></i>Uploading ' + (index + 1) + ' of ' + missing.length;
+                }}
+            }}
+            await send(delta.missing);
+            for (let attempt = 1; ; attempt++) {{
+                response = await fetch('/admin/deltas/' + delta.delta_id + '/apply', {{method: 'POST'}});
+                const result = await response.json();
+                if (result.success) return delta;
+                if (!result.missing || attempt === 2) throw new Error(result.error);
+                await send(result.missing);  // removed from the store since the diff was taken
+            }}
+        }}
+        
+        document.getElementById('deltaForm').addEventListener('submit', async function (event) {{
+            event.preventDefault();
+            const orderId = document.getElementById('orderIdInput').value;
+            if (!orderId) {{
+                showNotification('error', 'No Order', 'Select an order first');
+                return;
+            }}
+            const button = this.querySelector('button[type=submit]');
+            const label = button.innerHTML;
+            button.disabled = true;
+            try {{
+                const delta = await uploadDelta(this, Array.from(this.site.files), orderId);
+                showNotification('success', 'Changes Uploaded', delta.changed + ' changed, ' + delta.added + ' added, ' + delta.removed + ' removed');
+                setTimeout(() => {{ window.location = '/admin/submit-folder?success=1'; }}, 1500);
+            }} catch (error) {{
+                showNotification('error', 'Upload Failed', error.message);
+                button.disabled = false;
+                button.innerHTML = label;
+            }}
+        }});
+        
+        document.getElementById('submitForm').addEventListener('submit', async function (event) {{
+            const file = this.folder.files[0];
+            const orderId = document.getElementById('orderIdInput').value;
+            if (!file || !orderId || !window.fetch) return;  // fall back to the plain form post
+            event.preventDefault();
+            const button = this.querySelector('button[type=submit]');
+            const label = button.innerHTML;
+            button.disabled = true;
+            try {{
+                await uploadChunked(this, file, orderId);
+                window.location = '/admin/submit-folder?success=1';
+            }} catch (error) {{
+                showNotification('error', 'Upload Failed', error.message);
+                button.disabled = false;
+                button.innerHTML = label;
+            }}
+        }});
     </script>
     """)
 
+# ---------------- CHUNKED UPLOADS ----------------
+# Large sites are sent as fixed-size chunks, each its own request below
+# MAX_CONTENT_LENGTH, hashed into a temporary file and only copied into the
+# preallocated staging file once its checksum matches. A failed upload
+# resumes by asking which chunks arrived. Protocol:
+#   POST /admin/uploads                    {"order_id", "filename", "size", "sha256"?}
+#   GET  /admin/uploads/<id>               -> chunks received so far
+#   PUT  /admin/uploads/<id>/chunks/<n>    raw bytes, X-Chunk-SHA256 header
+#   POST /admin/uploads/<id>/finalize      -> publishes the site like the form does
+def staging_path(upload_id):
+    return os.path.join(app.config['UPLOAD_STAGING_FOLDER'], f"{upload_id}.part")
+
+def get_upload(upload_id):
+    con = db()
+    cur = con.cursor()
+    cur.execute("SELECT id, order_id, filename, size, chunk_size, sha256, finalized FROM uploads WHERE id=?", (upload_id,))
+    return cur.fetchone()
+
+def upload_status(upload):
+    upload_id, order_db_id, filename, size, chunk_size, sha256, finalized = upload
+    con = db()
+    cur = con.cursor()
+    cur.execute("SELECT idx FROM upload_chunks WHERE upload_id=? ORDER BY idx", (upload_id,))
+    return {
+        "success": True,
+        "upload_id": upload_id,
+        "filename": filename,
+        "size": size,
+        "chunk_size": chunk_size,
+        "chunks": -(-size // chunk_size),
+        "received": [row[0] for row in cur.fetchall()],
+        "finalized": finalized is not None,
+    }
+
+def upload_error(message, status=400):
+    return jsonify({"success": False, "error": message}), status
+
+@app.route("/admin/uploads", methods=["POST"])
+@login_required
+def admin_upload_init():
+    if current_user.role != "admin":
+        return upload_error("Admin only", 403)
+    
+    data = request.get_json(silent=True) or {}
+    size = data.get("size")
+    filename = secure_filename(data.get("filename") or "")
+    if not isinstance(size, int) or size <= 0 or not filename:
+        return upload_error("filename and a positive size are required")
+    if size > app.config['SUBMISSION_MAX_SIZE']:
+        return upload_error("Upload is larger than SUBMISSION_MAX_SIZE", 413)
+    
+    con = db()
+    cur = con.cursor()
+    cur.execute("SELECT id FROM orders WHERE order_id=?", (data.get("order_id"),))
+    order = cur.fetchone()
+    if not order:
+        return upload_error("Order not found", 404)
+    
+    upload_id = uuid.uuid4().hex
+    os.makedirs(app.config['UPLOAD_STAGING_FOLDER'], exist_ok=True)
+    with open(staging_path(upload_id), "wb") as f:
+        f.truncate(size)  # sparse; chunks fill it in at their offsets in any order
+    cur.execute("""INSERT INTO uploads(id, order_id, filename, size, chunk_size, sha256, created_by, created)
+        VALUES(?,?,?,?,?,?,?,?)""", (upload_id, order[0], filename, size, app.config['UPLOAD_CHUNK_SIZE'],
+                                     data.get("sha256"), current_user.id, time.time()))
+    con.commit()
+    return jsonify(upload_status(get_upload(upload_id))), 201
+
+@app.route("/admin/uploads/<upload_id>")
+@login_required
+def admin_upload_status(upload_id):
+    if current_user.role != "admin":
+        return upload_error("Admin only", 403)
+    
+    upload = get_upload(upload_id)
+    if not upload:
+        return upload_error("Upload not found", 404)
+    return jsonify(upload_status(upload))
+
+@app.route("/admin/uploads/<upload_id>/chunks/<int:index>", methods=["PUT"])
+@login_required
+def admin_upload_chunk(upload_id, index):
+    if current_user.role != "admin":
+        return upload_error("Admin only", 403)
+    
+    upload = get_upload(upload_id)
+    if not upload:
+        return upload_error("Upload not found", 404)
+    upload_id, order_db_id, filename, size, chunk_size, sha256, finalized = upload
+    if finalized is not None:
+        return upload_error("Upload already finalized", 409)
+    offset = index * chunk_size
+    if offset >= size:
+        return upload_error("Chunk index out of range")
+    expected = min(chunk_size, size - offset)
+    if request.content_length != expected:
+        return upload_error(f"Chunk {index} must be {expected} bytes")
+    
+    # Verified before it touches the staging file, so a corrupt retry can't spoil a chunk that already arrived
+    digest = hashlib.sha256()
+    received = 0
+    with tempfile.TemporaryFile(dir=app.config['UPLOAD_STAGING_FOLDER']) as chunk:
+        for data in iter(lambda: request.stream.read(ZIP_CHUNK_SIZE), b""):
+            digest.update(data)
+            chunk.write(data)
+            received += len(data)
+        checksum = digest.hexdigest()
+        if received != expected:
+            return upload_error(f"Chunk {index} was truncated at {received} bytes")
+        if request.headers.get("X-Chunk-SHA256", checksum).lower() != checksum:
+            return upload_error(f"Checksum mismatch for chunk {index}", 422)
+        chunk.seek(0)
+        with open(staging_path(upload_id), "r+b") as f:
+            f.seek(offset)
+            shutil.copyfileobj(chunk, f, ZIP_CHUNK_SIZE)
+    
+    con = db()
+    cur = con.cursor()
+    cur.execute("INSERT OR REPLACE INTO upload_chunks(upload_id, idx, size, sha256) VALUES(?,?,?,?)",
+                (upload_id, index, received, checksum))
+    con.commit()
+    return jsonify({"success": True, "index": index, "sha256": checksum})
+
+@app.route("/admin/uploads/<upload_id>/finalize", methods=["POST"])
+@login_required
+def admin_upload_finalize(upload_id):
+    if current_user.role != "admin":
+        return upload_error("Admin only", 403)
+    
+    upload = get_upload(upload_id)
+    if not upload:
+        return upload_error("Upload not found", 404)
+    status = upload_status(upload)
+    upload_id, order_db_id, filename, size, chunk_size, sha256, finalized = upload
+    if finalized is not None:
+        return upload_error("Upload already finalized", 409)
+    missing = sorted(set(range(status["chunks"])) - set(status["received"]))
+    if missing:
+        return jsonify(dict(status, success=False, error="Chunks missing", missing=missing)), 409
+    
+    con = db()
+    cur = con.cursor()
+    # Claimed before the slow part, so of two finalize calls racing only one publishes
+    cur.execute("UPDATE uploads SET finalized=? WHERE id=? AND finalized IS NULL", (time.time(), upload_id))
+    claimed = cur.rowcount
+    con.commit()
+    if not claimed:
+        return upload_error("Upload already finalized", 409)
+    
+    path = staging_path(upload_id)
+    try:
+        if sha256:
+            digest = hashlib.sha256()
+            with open(path, "rb") as f:
+                for data in iter(lambda: f.read(1024 * 1024), b""):
+                    digest.update(data)
+            if digest.hexdigest() != sha256.lower():
+                cur.execute("UPDATE uploads SET finalized=NULL WHERE id=?", (upload_id,))
+                con.commit()
+                return upload_error("Checksum mismatch for the assembled file", 422)
+        
+        cur.execute("SELECT order_id FROM orders WHERE id=?", (order_db_id,))
+        order_id = cur.fetchone()[0]
+        website_folder = website_folder_path(order_db_id)
+        os.makedirs(website_folder, exist_ok=True)
+        file_path = os.path.join(website_folder, filename)
+        replace_site_file(lambda tmp_path: shutil.move(path, tmp_path), file_path)
+        queue_website_submission(cur, order_db_id, file_path)
+        cur.execute("DELETE FROM upload_chunks WHERE upload_id=?", (upload_id,))
+        con.commit()
+    except BaseException:
+        con.rollback()
+        if os.path.exists(path):  # nothing was published: let the admin finalize again
+            cur.execute("UPDATE uploads SET finalized=NULL WHERE id=?", (upload_id,))
+            con.commit()
+        raise
+    
+    return jsonify({"success": True, "order_id": order_id, "state": "queued"})
+
+@app.cli.command("prune-uploads")
+def prune_uploads_command():
+    """Delete chunked uploads and delta submissions that were never finished within UPLOAD_EXPIRY"""
+    con = db()
+    cur = con.cursor()
+    cur.execute("SELECT id FROM uploads WHERE finalized IS NULL AND created < ?",
+                (time.time() - app.config['UPLOAD_EXPIRY'],))
+    expired = [row[0] for row in cur.fetchall()]
+    for upload_id in expired:
+        if os.path.exists(staging_path(upload_id)):
+            os.remove(staging_path(upload_id))
+        cur.execute("DELETE FROM upload_chunks WHERE upload_id=?", (upload_id,))
+        cur.execute("DELETE FROM uploads WHERE id=?", (upload_id,))
+    # Blobs a delta uploaded but never applied are left to gc-blobs
+    cur.execute("DELETE FROM delta_submissions WHERE applied IS NULL AND created < ?",
+                (time.time() - app.config['UPLOAD_EXPIRY'],))
+    deltas = cur.rowcount
+    con.commit()
+    print(f"✓ Pruned {len(expired)} abandoned uploads and {deltas} abandoned delta submissions")
+
+# ---------------- DELTA SUBMISSIONS ----------------
+# Resubmitting a site after a small fix shouldn't mean uploading all of it
+# again. The browser hashes the folder and sends its manifest; the server
+# answers with the hashes the blob store lacks, only those files are
+# uploaded, and applying the delta links the new site together from blobs
+# and swaps it in like an extracted zip. Protocol:
+#   POST /admin/deltas                       {"order_id", "files": [{"path", "sha256", "size", "mtime"?}]}
+#                                            -> delta id, missing hashes and what changed
+#   PUT  /admin/deltas/<id>/blobs/<sha256>   raw file bytes, once per missing hash
+#   POST /admin/deltas/<id>/apply            -> queues the swap; poll /admin/submission-status
+SHA256_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+DELTA_MTIME_RANGE = (315532800, 4102444800)  # 1980 to 2100: inside what zip dates and time.localtime() accept
+
+def parse_delta_manifest(files):
+    """[(path, sha256, size, mtime)] from the posted file list, or UnsafeArchiveError"""
+    if not isinstance(files, list) or not files:
+        raise UnsafeArchiveError("files must be a non-empty list")
+    if len(files) > app.config['EXTRACT_MAX_ENTRIES']:
+        raise UnsafeArchiveError(f"{len(files)} files, limit is {app.config['EXTRACT_MAX_ENTRIES']}")
+    manifest = {}
+    total = 0
+    now = time.time()
+    for entry in files:
+        if not isinstance(entry, dict) or not isinstance(entry.get("path"), str):
+            raise UnsafeArchiveError("Every file needs a path")
+        path = safe_member_path(entry["path"])
+        sha256 = str(entry.get("sha256", "")).lower()
+        size = entry.get("size")
+        mtime = entry.get("mtime", now)
+        if not path or not SHA256_PATTERN.match(sha256):
+            raise UnsafeArchiveError(f"Invalid path or sha256 for {entry['path']}")
+        if (not isinstance(size, int) or isinstance(size, bool) or size < 0
+                or not isinstance(mtime, (int, float)) or isinstance(mtime, bool) or not math.isfinite(mtime)):
+            raise UnsafeArchiveError(f"Invalid size or mtime for {path}")
+        mtime = min(max(mtime, DELTA_MTIME_RANGE[0]), DELTA_MTIME_RANGE[1])
+        if os.path.exists(blob_path(sha256)):
+            size = os.path.getsize(blob_path(sha256))  # the client's claim only matters for blobs it still has to send
+        total += size
+        if total > app.config['EXTRACT_MAX_SIZE']:
+            raise UnsafeArchiveError(f"Site is larger than {app.config['EXTRACT_MAX_SIZE']} bytes")
+        manifest[path] = (path, sha256, size, float(mtime))
+    check_path_clashes(manifest)
+    return sorted(manifest.values())
+
+def missing_blobs(manifest):
+    return sorted({sha256 for path, sha256, size, mtime in manifest if not os.path.exists(blob_path(sha256))})
+
+def get_delta(delta_id):
+    con = db()
+    cur = con.cursor()
+    cur.execute("SELECT id, order_id, manifest, applied FROM delta_submissions WHERE id=?", (delta_id,))
+    return cur.fetchone()
+
+@app.route("/admin/deltas", methods=["POST"])
+@login_required
+def admin_delta_init():
+    if current_user.role != "admin":
+        return upload_error("Admin only", 403)
+    
+    data = request.get_json(silent=True) or {}
+    try:
+        manifest = parse_delta_manifest(data.get("files"))
+    except UnsafeArchiveError as e:
+        return upload_error(str(e))
+    
+    con = db()
+    cur = con.cursor()
+    cur.execute("SELECT id FROM orders WHERE order_id=?", (data.get("order_id"),))
+    order = cur.fetchone()
+    if not order:
+        return upload_error("Order not found", 404)
+    
+    current = {path: (sha256, mtime) for path, sha256, size, mtime in website_manifest(order[0])}
+    # An unchanged file keeps its date, so its archive entry can be reused as is
+    manifest = [(path, sha256, size, current[path][1] if current.get(path, (None,))[0] == sha256 else mtime)
+                for path, sha256, size, mtime in manifest]
+    delta_id = uuid.uuid4().hex
+    cur.execute("INSERT INTO delta_submissions(id, order_id, manifest, created_by, created) VALUES(?,?,?,?,?)",
+                (delta_id, order[0], json.dumps(manifest), current_user.id, time.time()))
+    con.commit()
+    missing = missing_blobs(manifest)
+    sizes = {sha256: size for path, sha256, size, mtime in manifest}
+    return jsonify({
+        "success": True,
+        "delta_id": delta_id,
+        "missing": missing,
+        "missing_bytes": sum(sizes[sha256] for sha256 in missing),
+        "max_blob_size": app.config['MAX_CONTENT_LENGTH'],
+        "changed": sum(path in current and current[path][0] != sha256 for path, sha256, size, mtime in manifest),
+        "added": sum(path not in current for path, sha256, size, mtime in manifest),
+        "removed": len(current.keys() - {entry[0] for entry in manifest}),
+    }), 201
+
+@app.route("/admin/deltas/<delta_id>/blobs/<sha256>", methods=["PUT"])
+@login_required
+def admin_delta_blob(delta_id, sha256):
+    if current_user.role != "admin":
+        return upload_error("Admin only", 403)
+    
+    delta = get_delta(delta_id)
+    if not delta:
+        return upload_error("Delta not found", 404)
+    if delta[3] is not None:
+        return upload_error("Delta already applied", 409)
+    sizes = {entry[1]: entry[2] for entry in json.loads(delta[2])}
+    if sha256 not in sizes:
+        return upload_error("Hash is not part of this delta", 404)
+    if request.content_length != sizes[sha256]:
+        return upload_error(f"Blob {sha256} must be {sizes[sha256]} bytes")
+    
+    received, size = store_blob(request.stream)
+    if received != sha256:
+        # Stored under the hash it really has; gc-blobs removes it if nothing uses it
+        return upload_error(f"Checksum mismatch: received {received}", 422)
+    return jsonify({"success": True, "sha256": sha256, "size": size})
+
+@app.route("/admin/deltas/<delta_id>/apply", methods=["POST"])
+@login_required
+def admin_delta_apply(delta_id):
+    if current_user.role != "admin":
+        return upload_error("Admin only", 403)
+    
+    delta = get_delta(delta_id)
+    if not delta:
+        return upload_error("Delta not found", 404)
+    delta_id, order_db_id, manifest, applied = delta
+    if applied is not None:
+        return upload_error("Delta already applied", 409)
+    missing = missing_blobs(json.loads(manifest))
+    if missing:
+        return jsonify({"success": False, "error": "Files missing", "missing": missing}), 409
+    
+    con = db()
+    cur = con.cursor()
+    cur.execute("SELECT order_id FROM orders WHERE id=?", (order_db_id,))
+    order_id = cur.fetchone()[0]
+    set_submission_state(cur, order_db_id, "queued")
+    enqueue_job(cur, "apply_delta", {"order_db_id": order_db_id, "delta_id": delta_id, "sender_id": current_user.id},
+                lane=submission_lane(order_db_id))
+    cur.execute("UPDATE delta_submissions SET applied=? WHERE id=?", (time.time(), delta_id))
+    con.commit()
+    return jsonify({"success": True, "order_id": order_id, "state": "queued"})
+
 # ---------------- ADMIN TEMPLATE MANAGEMENT ----------------
 @app.route("/admin/templates")
 @login_required
@@ -3601,13 +4942,15 @@ def admin_templates():
     
     con = db()
     cur = con.cursor()
-    cur.execute("SELECT * FROM templates ORDER BY id DESC")
+    cur.execute("""SELECT t.*, i.filename IS NOT NULL, v.path FROM templates t
+        LEFT JOIN images i ON i.filename = t.image_url
+        LEFT JOIN image_variants v ON v.filename = t.image_url AND v.variant = 'preview' AND v.format = 'webp'
+        ORDER BY t.id DESC""")
     templates = cur.fetchall()
-    con.close()
     
     templates_html = ""
     for template in templates:
-        id, name, description, category, features_str, original_price, discount_price, has_discount, tag, image_url, preview_url, status, created = template
+        id, name, description, category, features_str, original_price, discount_price, has_discount, tag, image_url, preview_url, status, created, image_registered, preview_path = template
         
         features = features_str.split(',')[:3] if features_str else []
         features_html = ", ".join(features)
@@ -3615,7 +4958,9 @@ def admin_templates():
         status_badge = "success" if status == 1 else "danger"
         status_text = "Active" if status == 1 else "Inactive"
         
-        if image_url and os.path.exists(os.path.join(app.config['UPLOAD_FOLDER'], image_url)):
+        if image_registered and preview_path:
+            image_preview = f'<picture><source type="image/webp" srcset="{image_variant_url(preview_path)}"><img src="/static/uploads/{image_url}" class="image-preview" alt="{name}" loading="lazy"></picture>'
+        elif image_registered:
             image_preview = f'<img src="/static/uploads/{image_url}" class="image-preview" alt="{name}">'
         else:
             image_preview = '<i class="fas fa-image text-muted"></i>'
@@ -3717,13 +5062,14 @@ def admin_add_template():
             
             con = db()
             cur = con.cursor()
+            if image_url and register_image(cur, image_url):
+                build_image_variants(cur, image_url)
             cur.execute("""INSERT INTO templates 
             (name, description, category, features, original_price, discount_price, has_discount, tag, image_url, preview_url, status)
             VALUES(?,?,?,?,?,?,?,?,?,?,?)""", 
             (name, description, category, features, original_price, discount_price, has_discount, tag, image_url, preview_url, 1))
             
             con.commit()
-            con.close()
             
             return redirect("/admin/templates")
         except Exception as e:
@@ -3846,22 +5192,22 @@ def admin_edit_template(template_id):
             
             # Handle file upload
             image_url = template[9]  # Keep existing image
+            old_image_url = image_url
+            image_uploaded = False
             if 'image' in request.files:
                 file = request.files['image']
                 if file and file.filename:
-                    # Delete old image if exists
-                    if image_url and os.path.exists(os.path.join(app.config['UPLOAD_FOLDER'], image_url)):
-                        try:
-                            os.remove(os.path.join(app.config['UPLOAD_FOLDER'], image_url))
-                        except:
-                            pass
-                    
                     filename = secure_filename(file.filename)
                     file.save(os.path.join(app.config['UPLOAD_FOLDER'], filename))
                     image_url = filename
+                    image_uploaded = True
             
             con = db()
             cur = con.cursor()
+            if image_url != old_image_url and old_image_url:
+                release_image(cur, old_image_url, template_id)
+            if image_uploaded and register_image(cur, image_url):
+                build_image_variants(cur, image_url)
             cur.execute("""UPDATE templates SET 
             name=?, description=?, category=?, features=?, original_price=?, discount_price=?, 
             has_discount=?, tag=?, image_url=?, preview_url=?, status=? WHERE id=?""", 
@@ -3869,7 +5215,6 @@ def admin_edit_template(template_id):
              has_discount, tag, image_url, preview_url, status, template_id))
             
             con.commit()
-            con.close()
             
             return redirect("/admin/templates")
         except Exception as e:
@@ -3987,19 +5332,13 @@ def admin_delete_template(template_id):
     if not template:
         return "Template not found", 404
     
-    # Delete image file if exists
     image_url = template[9]
-    if image_url and os.path.exists(os.path.join(app.config['UPLOAD_FOLDER'], image_url)):
-        try:
-            os.remove(os.path.join(app.config['UPLOAD_FOLDER'], image_url))
-        except:
-            pass
-    
     con = db()
     cur = con.cursor()
+    if image_url:
+        release_image(cur, image_url, template_id)
     cur.execute("DELETE FROM templates WHERE id=?", (template_id,))
     con.commit()
-    con.close()
     
     return redirect("/admin/templates")
 
@@ -4041,7 +5380,6 @@ def admin():
     """)
     recent_template_orders = cur.fetchall()
     
-    con.close()
     
     recent_orders_html = ""
     for order in recent_template_orders:
@@ -4163,8 +5501,11 @@ def admin_view_order_by_id(order_id):
     
     con = db()
     cur = con.cursor()
+    # Columns listed in the order order_details reads them; o.* shifts whenever orders gains a column
     cur.execute("""
-        SELECT o.*, u.fullname, u.email, u.whatsapp 
+        SELECT o.id, o.order_id, o.user_id, o.website_type, o.answers, o.budget, o.stage, o.status, o.created,
+               o.order_type, o.website_name, o.requirements, u.fullname, u.email, u.whatsapp,
+               o.folder_submitted, o.folder_submitted_at
         FROM orders o 
         JOIN users u ON o.user_id = u.id 
         WHERE o.order_id=?
@@ -4172,14 +5513,12 @@ def admin_view_order_by_id(order_id):
     order = cur.fetchone()
     
     if not order:
-        con.close()
         return "Order not found", 404
     
     # Get messages
     cur.execute("SELECT * FROM messages WHERE order_id=? ORDER BY created", (order[0],))
     messages = cur.fetchall()
     
-    con.close()
     
     order_details = {
         "id": order[0],
@@ -4225,7 +5564,7 @@ def admin_view_order_by_id(order_id):
         msg_class = "user-message" if msg[4] == "user" else "bot-message"
         sender_name = order_details["fullname"] if msg[4] == "user" else "You (Admin)"
         messages_html += f"""
-        <div class="chat-message {msg_class}">
+        <div class="chat-message {msg_class}" data-message-id="{msg[0]}">
             <small class="text-muted">{sender_name} • {msg[5]}</small>
             <p class="mb-0">{msg[3]}</p>
         </div>
@@ -4326,12 +5665,12 @@ def admin_view_order_by_id(order_id):
                         <div class="card-body">
                             <h5>Communication</h5>
                             <hr>
-                            <div style="height: 300px; overflow-y: auto; padding: 10px; background: #f8f9fa; border-radius: 10px;">
-                                {messages_html if messages_html else '<div class="text-center text-muted"><i class="fas fa-comments fa-3x mb-3"></i><p>No messages yet</p></div>'}
+                            <div id="messagesArea" data-chat-order="{order_details['order_id']}" data-user-label="{escape(order_details['fullname'])}" data-admin-label="You (Admin)" style="height: 300px; overflow-y: auto; padding: 10px; background: #f8f9fa; border-radius: 10px;">
+                                {messages_html if messages_html else '<div class="text-center text-muted" data-chat-empty><i class="fas fa-comments fa-3x mb-3"></i><p>No messages yet</p></div>'}
                             </div>
                             
                             <div class="mt-3">
-                                <form method="post" action="/admin/send-message/{order_details['id']}">
+                                <form method="post" action="/admin/send-message/{order_details['id']}" data-chat-form>
                                     <div class="input-group">
                                         <input type="text" name="message" class="form-control chat-input" placeholder="Type your message as admin..." required>
                                         <button class="chat-send-btn" type="submit">
@@ -4366,7 +5705,6 @@ def admin_orders():
     """)
     
     rows = cur.fetchall()
-    con.close()
     
     orders_html = ""
     for order in rows:
@@ -4456,19 +5794,11 @@ def admin_send_message(order_id):
         user_id = order_data[0]
         order_number = order_data[1]
         
-        # Add message
-        cur.execute("""INSERT INTO messages (order_id, user_id, message, sender) 
-                      VALUES(?,?,?,?)""", 
-                    (order_id, user_id, message, "admin"))
-        
-        # Add notification
-        cur.execute("""INSERT INTO notifications (user_id, message, sender_id) 
-                      VALUES(?,?,?)""", 
-                    (user_id, f"New message from admin regarding order {order_number}: {message}", current_user.id))
-        
+        # Add message and notify the customer
+        post_chat_message(cur, order_id, user_id, message, "admin")
         con.commit()
+        chat_hub.notify()
     
-    con.close()
     return redirect(f"/admin/view-order-by-id/{order_number}")
 
 @app.route("/admin/update/<int:id>", methods=["GET","POST"])
@@ -4497,12 +5827,11 @@ def update(id):
             
             # Add notification
             notification_msg = f"Your order {order_id} status has been updated: Stage - {stage}, Status - {status}"
-            cur.execute("INSERT INTO notifications(user_id,message,sender_id) VALUES(?,?,?)",
-                        (user_id, notification_msg, current_user.id))
+            cur.execute("INSERT INTO notifications(user_id,message,sender_id,order_ref) VALUES(?,?,?,?)",
+                        (user_id, notification_msg, current_user.id, id))
             
             con.commit()
         
-        con.close()
         return redirect("/admin/orders")
 
     return render_base_template("Update Order", """
@@ -4552,7 +5881,6 @@ def admin_users():
     cur = con.cursor()
     cur.execute("SELECT id, fullname, email, whatsapp, role, created FROM users ORDER BY id DESC")
     rows = cur.fetchall()
-    con.close()
     
     users_html = ""
     for user in rows:
@@ -4605,6 +5933,45 @@ def admin_users():
     </div>
     """)
 
+@app.route("/admin/db-stats")
+@login_required
+def admin_db_stats():
+    if current_user.role != "admin":
+        return redirect("/dashboard")
+
+    return jsonify(pool.stats())
+
+@app.route("/admin/cache-stats")
+@login_required
+def admin_cache_stats():
+    if current_user.role != "admin":
+        return redirect("/dashboard")
+
+    return jsonify({"fragments": fragment_cache.stats(), "conditional_get": conditional_stats.stats()})
+
+@app.route("/admin/submission-status/<order_id>")
+@login_required
+def admin_submission_status(order_id):
+    if current_user.role != "admin":
+        return redirect("/dashboard")
+
+    con = db()
+    cur = con.cursor()
+    cur.execute("SELECT submission_state, submission_error, folder_submitted FROM orders WHERE order_id=?", (order_id,))
+    order = cur.fetchone()
+    if not order:
+        return jsonify({"success": False, "error": "Order not found"}), 404
+    state, error, folder_submitted = order
+    return jsonify({"success": True, "state": state or ("ready" if folder_submitted else None), "error": error})
+
+@app.route("/admin/jobs")
+@login_required
+def admin_jobs():
+    if current_user.role != "admin":
+        return redirect("/dashboard")
+
+    return jsonify(dict(job_stats(), extraction=extraction_stats.stats()))
+
 @app.route("/logout")
 def logout():
     logout_user()
@@ -4624,5 +5991,13 @@ if __name__ == "__main__":
             with open(image_path, 'wb') as f:
                 pass
     
+    with app.app_context():
+        con = db()
+        cur = con.cursor()
+        registered, _ = scan_images(cur)
+        for filename in registered:
+            build_image_variants(cur, filename)
+        con.commit()
+    
     
     app.run(host="0.0.0.0", port=5000, debug=True)
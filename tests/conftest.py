@@ -0,0 +1,66 @@
+import io, os, sys, tempfile, threading, uuid, zipfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.chdir(tempfile.mkdtemp(prefix="webcraft-tests-"))  # main creates its database and folders in the cwd
+import main
+
+main.app.root_path = os.getcwd()  # send_file resolves the relative folders against root_path
+main.app.config['JOB_WORKER_THREADS'] = 0  # tests run queued jobs themselves with drain()
+
+def drain():
+    """Run every job that is due, in this thread"""
+    main.work_jobs("tests", threading.Event(), burst=True)
+
+def site_zip(files):
+    """In-memory zip of {name: contents}, ready to post as a submission"""
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as zipf:
+        for name, data in files.items():
+            zipf.writestr(name, data)
+    buf.seek(0)
+    return buf
+
+def submission_state(admin, order_id):
+    return admin.get(f"/admin/submission-status/{order_id}").json["state"]
+
+@pytest.fixture
+def app():
+    return main.app
+
+@pytest.fixture
+def admin(app):
+    client = app.test_client()
+    client.post("/login", data=dict(email=main.ADMIN_EMAIL, password=main.ADMIN_PASS))
+    return client
+
+@pytest.fixture
+def make_customer(app):
+    def make():
+        client = app.test_client()
+        email = f"{uuid.uuid4().hex[:12]}@example.com"
+        client.post("/signup", data=dict(fullname="Test Customer", email=email, whatsapp="0", gender="Male",
+                                         dob="2000-01-01", profession="QA", password="p", confirm_password="p"))
+        client.post("/login", data=dict(email=email, password="p"))
+        return client
+    return make
+
+@pytest.fixture
+def customer(make_customer):
+    return make_customer()
+
+@pytest.fixture
+def make_order(app):
+    def make(client, status="Granted", folder_submitted=0):
+        """Order template 1 as client; returns (order_id, orders.id)"""
+        client.post("/order-template/1", data=dict(website_name="Site", requirements=""))
+        with app.app_context():
+            con = main.db()
+            order_id, order_db_id = con.execute(
+                "SELECT order_id, id FROM orders ORDER BY id DESC LIMIT 1").fetchone()
+            con.execute("UPDATE orders SET status=?, folder_submitted=? WHERE id=?",
+                        (status, folder_submitted, order_db_id))
+            con.commit()
+        return order_id, order_db_id
+    return make
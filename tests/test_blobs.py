@@ -0,0 +1,26 @@
+import hashlib, io, os
+
+import main
+from conftest import drain, submission_state
+
+def stored_blobs():
+    for dirpath, dirnames, filenames in os.walk(main.app.config['BLOB_FOLDER']):
+        dirnames[:] = [name for name in dirnames if name != "tmp"]
+        for name in filenames:
+            yield name, os.path.join(dirpath, name)
+
+def test_resubmitting_a_linked_file_leaves_its_blob_alone(admin, customer, make_order):
+    order_id, order_db_id = make_order(customer)
+    for content in (b"<h1>first</h1>", b"<h1>second</h1>"):
+        response = admin.post("/admin/submit-folder", data=dict(order_id=order_id, folder=(io.BytesIO(content), "index.html")),
+                              content_type="multipart/form-data")
+        assert response.status_code == 302
+        drain()
+        assert submission_state(admin, order_id) == "ready"
+        with open(os.path.join(main.website_folder_path(order_db_id), "index.html"), "rb") as f:
+            assert f.read() == content
+    blobs = dict(stored_blobs())
+    assert hashlib.sha256(b"<h1>first</h1>").hexdigest() in blobs
+    for sha256, path in blobs.items():
+        with open(path, "rb") as f:
+            assert hashlib.sha256(f.read()).hexdigest() == sha256
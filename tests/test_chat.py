@@ -0,0 +1,42 @@
+import json
+
+import main
+
+def read_events(response, count):
+    """The first count chat events of a streamed response"""
+    events = []
+    for chunk in response.response:
+        chunk = chunk.decode() if isinstance(chunk, bytes) else chunk
+        if chunk.startswith("id: "):
+            events.append(json.loads(chunk.split("data: ", 1)[1]))
+            if len(events) == count:
+                break
+    return events
+
+def test_reconnect_catches_up_its_order_then_follows_the_hub(app, admin, customer, make_customer, make_order):
+    app.config.update(CHAT_POLL_INTERVAL=0.05, CHAT_HEARTBEAT=0.05, CHAT_STREAM_TIMEOUT=5)
+    order_id, order_db_id = make_order(customer)
+    other = make_customer()
+    other_order_id, _ = make_order(other)
+    first = customer.post(f"/chat/{order_id}/messages", json=dict(message="one")).json
+    other.post(f"/chat/{other_order_id}/messages", json=dict(message="elsewhere"))
+    customer.post(f"/chat/{order_id}/messages", json=dict(message="two"))
+
+    response = customer.get(f"/chat/{order_id}/events", headers={"Last-Event-ID": str(first["id"] - 1)}, buffered=False)
+    assert response.mimetype == "text/event-stream"
+    assert [event["message"] for event in read_events(response, 2)] == ["one", "two"]
+    other.post(f"/chat/{other_order_id}/messages", json=dict(message="still elsewhere"))
+    admin.post(f"/chat/{order_id}/messages", json=dict(message="three"))
+    assert [event["message"] for event in read_events(response, 1)] == ["three"]
+    response.close()
+
+def test_new_stream_starts_at_the_hub_mark(app, customer, make_order):
+    order_id, order_db_id = make_order(customer)
+    customer.post(f"/chat/{order_id}/messages", json=dict(message="before"))
+    with app.test_request_context():
+        subscription = main.chat_hub.subscribe(order_db_id)
+        try:
+            newest = main.db().execute("SELECT MAX(id) FROM messages").fetchone()[0]
+            assert subscription.last_id == newest
+        finally:
+            main.chat_hub.unsubscribe(subscription)
@@ -0,0 +1,54 @@
+import gzip
+
+import pytest
+from flask import Flask, Response
+
+import main
+
+PAGE = "<p>" + "compressible " * 500 + "</p>"
+
+@pytest.fixture
+def client():
+    """A small app behind CompressionMiddleware, so the routes below don't touch the real one"""
+    site = Flask(__name__)
+    site.config.update(COMPRESS_MIN_SIZE=1024, COMPRESS_MAX_SIZE=64 * 1024, COMPRESS_GZIP_LEVEL=6, COMPRESS_BROTLI_QUALITY=4)
+    site.streamed = []
+
+    @site.route("/page")
+    def page():
+        return PAGE
+
+    @site.route("/small")
+    def small():
+        return "<p>tiny</p>"
+
+    @site.route("/stream")
+    def stream():
+        def generate():
+            for n in range(3):
+                site.streamed.append(n)
+                yield PAGE
+        return Response(generate(), mimetype="text/html")
+
+    site.wsgi_app = main.CompressionMiddleware(site.wsgi_app, site)
+    return site.test_client()
+
+def test_large_page_is_compressed(client):
+    response = client.get("/page", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert gzip.decompress(response.data).decode() == PAGE
+
+@pytest.mark.parametrize("path, accept", [("/small", "gzip"), ("/page", "identity")])
+def test_identity_responses_still_vary(client, path, accept):
+    response = client.get(path, headers={"Accept-Encoding": accept})
+    assert "Content-Encoding" not in response.headers
+    assert "Accept-Encoding" in response.headers["Vary"]
+
+def test_streamed_response_is_not_buffered(client):
+    response = client.get("/stream", headers={"Accept-Encoding": "gzip"}, buffered=False)
+    assert "Content-Encoding" not in response.headers
+    chunks = iter(response.response)
+    assert next(chunks) == PAGE.encode()
+    assert client.application.streamed == [0]  # the rest is produced only as it is read
+    response.close()
@@ -0,0 +1,85 @@
+import hashlib, io, json, os, zipfile
+
+import pytest
+
+import main
+from conftest import drain, site_zip, submission_state
+
+def submit_delta(admin, order_id, files):
+    manifest = [dict(path=path, sha256=hashlib.sha256(data).hexdigest(), size=len(data)) for path, data in files.items()]
+    delta = admin.post("/admin/deltas", json=dict(order_id=order_id, files=manifest)).json
+    for path, data in files.items():
+        sha256 = hashlib.sha256(data).hexdigest()
+        if sha256 in delta["missing"]:
+            assert admin.put(f"/admin/deltas/{delta['delta_id']}/blobs/{sha256}", data=data).status_code == 200
+    return delta
+
+def test_delta_uploads_only_changed_files(admin, customer, make_order):
+    order_id, order_db_id = make_order(customer)
+    admin.post("/admin/submit-folder", data=dict(order_id=order_id, folder=(site_zip({"index.html": "v1", "style.css": "p{}"}), "site.zip")),
+               content_type="multipart/form-data")
+    drain()
+    delta = submit_delta(admin, order_id, {"index.html": b"v2 delta", "style.css": b"p{}"})
+    assert (delta["changed"], delta["added"], delta["removed"]) == (1, 0, 0)
+    assert delta["missing"] == [hashlib.sha256(b"v2 delta").hexdigest()]
+    assert admin.post(f"/admin/deltas/{delta['delta_id']}/apply").json["state"] == "queued"
+    drain()
+    assert submission_state(admin, order_id) == "ready"
+    archive = zipfile.ZipFile(io.BytesIO(customer.get(f"/download-website/{order_id}").data))
+    assert archive.read("index.html") == b"v2 delta" and archive.read("style.css") == b"p{}"
+
+def test_download_queued_build_does_not_swallow_delta_publish(app, admin, customer, make_order):
+    order_id, order_db_id = make_order(customer)
+    admin.post("/admin/submit-folder", data=dict(order_id=order_id, folder=(site_zip({"index.html": "v1"}), "site.zip")),
+               content_type="multipart/form-data")
+    drain()
+    delta = submit_delta(admin, order_id, {"index.html": b"v2 via delta"})
+    admin.post(f"/admin/deltas/{delta['delta_id']}/apply")
+    os.remove(main.archive_path(order_db_id))  # no prebuilt zip, so the download streams and queues one
+    assert customer.get(f"/download-website/{order_id}").status_code == 200  # queues a plain build first
+    drain()
+    assert submission_state(admin, order_id) == "ready"
+    with app.app_context():
+        con = main.db()
+        notified = con.execute("SELECT COUNT(*) FROM notifications WHERE order_ref=? AND message LIKE '%ready for download%'",
+                               (order_db_id,)).fetchone()[0]
+        pending = con.execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+    assert notified == 2 and pending == 0
+    archive = zipfile.ZipFile(io.BytesIO(customer.get(f"/download-website/{order_id}").data))
+    assert archive.read("index.html") == b"v2 via delta"
+
+@pytest.mark.parametrize("entry", [
+    dict(size=True), dict(size=-1), dict(mtime=float("nan")), dict(mtime=float("inf")), dict(mtime=True),
+])
+def test_delta_rejects_invalid_sizes_and_dates(admin, customer, make_order, entry):
+    order_id, order_db_id = make_order(customer)
+    data = b"<h1>hi</h1>"
+    file = dict(dict(path="index.html", sha256=hashlib.sha256(data).hexdigest(), size=len(data)), **entry)
+    response = admin.post("/admin/deltas", data=json.dumps(dict(order_id=order_id, files=[file])),
+                          content_type="application/json")
+    assert response.status_code == 400
+
+@pytest.mark.parametrize("mtime", [1e20, -1e20, 0])
+def test_delta_with_out_of_range_dates_still_publishes(admin, customer, make_order, mtime):
+    order_id, order_db_id = make_order(customer)
+    data = f"<h1>{mtime}</h1>".encode()
+    delta = admin.post("/admin/deltas", json=dict(order_id=order_id, files=[
+        dict(path="index.html", sha256=hashlib.sha256(data).hexdigest(), size=len(data), mtime=mtime)])).json
+    for sha256 in delta["missing"]:
+        admin.put(f"/admin/deltas/{delta['delta_id']}/blobs/{sha256}", data=data)
+    admin.post(f"/admin/deltas/{delta['delta_id']}/apply")
+    drain()
+    assert submission_state(admin, order_id) == "ready"
+    archive = zipfile.ZipFile(io.BytesIO(customer.get(f"/download-website/{order_id}").data))
+    assert archive.read("index.html") == data
+
+def test_delta_sizes_of_stored_blobs_come_from_the_store(admin, customer, make_order):
+    order_id, order_db_id = make_order(customer)
+    data = b"<h1>already stored</h1>"
+    submit_delta(admin, order_id, {"index.html": data})
+    delta = admin.post("/admin/deltas", json=dict(order_id=order_id, files=[
+        dict(path="index.html", sha256=hashlib.sha256(data).hexdigest(), size=10 ** 12)])).json
+    assert delta["success"] and delta["missing"] == []
+    with main.app.app_context():
+        manifest = json.loads(main.get_delta(delta["delta_id"])[2])
+    assert manifest[0][2] == len(data)
@@ -0,0 +1,60 @@
+import io, os, zipfile
+
+import main
+from conftest import drain, site_zip
+
+def published_site(admin, customer, make_order, files):
+    order_id, order_db_id = make_order(customer)
+    submit(admin, order_id, files)
+    return order_id
+
+def submit(admin, order_id, files):
+    admin.post("/admin/submit-folder", data=dict(order_id=order_id, folder=(site_zip(files), "site.zip")),
+               content_type="multipart/form-data")
+    drain()
+
+def test_range_of_a_prebuilt_archive_is_partial(admin, customer, make_order):
+    order_id = published_site(admin, customer, make_order, {"index.html": "<h1>hi</h1>" * 500})
+    full = customer.get(f"/download-website/{order_id}")
+    assert full.status_code == 200 and full.headers["Accept-Ranges"] == "bytes"
+    etag = full.headers["ETag"]
+
+    part = customer.get(f"/download-website/{order_id}", headers={"Range": "bytes=100-199", "If-Range": etag})
+    assert part.status_code == 206
+    assert part.headers["Content-Range"] == f"bytes 100-199/{len(full.data)}"
+    assert part.data == full.data[100:200]
+
+def test_stale_if_range_gets_the_whole_new_archive(admin, customer, make_order):
+    order_id = published_site(admin, customer, make_order, {"index.html": "first"})
+    old_etag = customer.get(f"/download-website/{order_id}").headers["ETag"]
+    submit(admin, order_id, {"index.html": "second"})
+
+    response = customer.get(f"/download-website/{order_id}", headers={"Range": "bytes=10-", "If-Range": old_etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != old_etag
+    assert zipfile.ZipFile(io.BytesIO(response.data)).read("index.html") == b"second"
+
+def test_range_before_the_archive_is_built(admin, customer, make_order):
+    order_id, order_db_id = make_order(customer, folder_submitted=1)  # no prebuilt archive yet
+    response = customer.get(f"/download-website/{order_id}", headers={"Range": "bytes=0-9"})
+    assert response.status_code == 206 and len(response.data) == 10
+    assert customer.get(f"/download-website/{order_id}").data[:10] == response.data
+    drain()
+
+def test_archive_builds_walk_the_folder_only_once_it_changed(app, admin, customer, make_order, monkeypatch):
+    order_id = published_site(admin, customer, make_order, {"index.html": "v1"})
+    with app.app_context():
+        order_db_id = main.db().execute("SELECT id FROM orders WHERE order_id=?", (order_id,)).fetchone()[0]
+    scans = []
+    scan = main._scan_site_folder
+    monkeypatch.setattr(main, "_scan_site_folder", lambda folder, rows: scans.append(folder) or scan(folder, rows))
+    with app.app_context():
+        main.build_website_archive(order_db_id)
+        assert scans == []
+        with open(os.path.join(main.website_folder_path(order_db_id), "extra.txt"), "w") as f:
+            f.write("added by hand")
+        path, content_hash = main.build_website_archive(order_db_id)
+        main.build_website_archive(order_db_id)
+    assert len(scans) == 1
+    with zipfile.ZipFile(path) as archive:
+        assert sorted(archive.namelist()) == ["extra.txt", "index.html"]
@@ -0,0 +1,73 @@
+import os, urllib.request
+
+import pytest
+from werkzeug.wsgi import wrap_file
+
+import main
+
+class StandInProxy:
+    """Minimal front proxy: performs X-Sendfile / X-Accel-Redirect like the real one"""
+
+    def __init__(self, wsgi_app, flask_app):
+        self.wsgi_app = wsgi_app
+        self.locations = {location: os.path.abspath(folder)
+                          for folder, location in flask_app.config['FILE_DELIVERY_LOCATIONS'].items()}
+        self.offloaded = 0
+
+    def __call__(self, environ, start_response):
+        captured = {}
+
+        def capture(status, headers, exc_info=None):
+            captured.update(status=status, headers=headers)
+            return lambda data: None
+
+        body = self.wsgi_app(environ, capture)
+        headers = dict((k.lower(), v) for k, v in captured["headers"])
+        path = headers.get("x-sendfile")
+        uri = headers.get("x-accel-redirect")
+        if uri:
+            location = next((loc for loc in self.locations if uri.startswith(loc)), None)
+            path = location and os.path.join(self.locations[location], urllib.request.url2pathname(uri[len(location):]))
+        if not path:
+            start_response(captured["status"], captured["headers"])
+            return body
+        if hasattr(body, "close"):
+            body.close()
+        self.offloaded += 1
+        size = os.path.getsize(path)
+        headers = [(k, v) for k, v in captured["headers"] if k.lower() not in ("x-sendfile", "x-accel-redirect", "content-length")]
+        start_response(captured["status"], headers + [("Content-Length", str(size))])
+        return wrap_file(environ, open(path, "rb"))
+
+@pytest.fixture
+def upload(app, tmp_path, monkeypatch):
+    """(URL, bytes) of a file in a temporary static/uploads folder"""
+    static_folder = tmp_path / "static"
+    upload_folder = static_folder / "uploads"
+    upload_folder.mkdir(parents=True)
+    monkeypatch.setattr(app, "static_folder", str(static_folder))
+    monkeypatch.setitem(app.config, 'UPLOAD_FOLDER', str(upload_folder))
+    monkeypatch.setitem(app.config, 'FILE_DELIVERY_LOCATIONS', {str(upload_folder): '/_protected/uploads/'})
+    payload = os.urandom(256 * 1024)
+    (upload_folder / "delivery check.bin").write_bytes(payload)
+    return "/static/uploads/delivery%20check.bin", payload
+
+@pytest.mark.parametrize("delivery", ["local", "x-sendfile", "x-accel-redirect"])
+def test_upload_is_delivered_and_revalidated(app, upload, monkeypatch, delivery):
+    url, payload = upload
+    monkeypatch.setitem(app.config, 'FILE_DELIVERY', delivery)
+    proxy = StandInProxy(app.wsgi_app, app)
+    monkeypatch.setattr(app, "wsgi_app", proxy)
+    client = app.test_client()
+    response = client.get(url)
+    assert response.status_code == 200 and response.data == payload
+    assert proxy.offloaded == (0 if delivery == "local" else 1)
+    revalidated = client.get(url, headers={"If-None-Match": response.headers["ETag"]})
+    assert revalidated.status_code == 304
+
+def test_offloaded_headers_name_the_internal_location(app, upload, monkeypatch):
+    url, payload = upload
+    monkeypatch.setitem(app.config, 'FILE_DELIVERY', "x-accel-redirect")
+    response = app.test_client().get(url)
+    assert response.headers["X-Accel-Redirect"] == "/_protected/uploads/delivery%20check.bin"
+    assert response.data == b""
@@ -0,0 +1,46 @@
+import os, subprocess, sys, textwrap
+
+import pytest
+
+pytest.importorskip("gevent")
+
+# Runs in a fresh interpreter: gevent has to patch the standard library before main is imported
+SCRIPT = textwrap.dedent("""
+    from gevent import monkey
+    monkey.patch_all()
+    import io, os, sys, time, zipfile
+    import gevent
+    sys.path.insert(0, sys.argv[1])
+    import main
+
+    site = io.BytesIO()
+    with zipfile.ZipFile(site, "w") as zipf:
+        for n in range(40):
+            zipf.writestr(f"assets/{n}.bin", os.urandom(512 * 1024))
+    with open("site.zip", "wb") as f:
+        f.write(site.getvalue())
+
+    gaps = []
+    def tick():
+        last = time.perf_counter()
+        while True:
+            gevent.sleep(0.005)
+            now = time.perf_counter()
+            gaps.append(now - last)
+            last = now
+    ticker = gevent.spawn(tick)
+    gevent.sleep(0.05)
+    with main.app.app_context():
+        main.extract_website_zip("site.zip", main.website_folder_path(1), main.archive_lock(1))
+        main.build_website_archive(1)
+    ticker.kill()
+    print(len(gaps), max(gaps))
+""")
+
+def test_archive_work_does_not_stall_the_event_loop(tmp_path):
+    result = subprocess.run([sys.executable, "-c", SCRIPT, os.path.dirname(os.path.dirname(os.path.abspath(__file__)))],
+                            cwd=tmp_path, capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+    ticks, longest_gap = result.stdout.split()[-2:]
+    # Greenlets kept running while 20 MB were extracted, hashed and zipped
+    assert int(ticks) > 10 and float(longest_gap) < 0.5
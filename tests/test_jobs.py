@@ -0,0 +1,99 @@
+import io, json, zipfile
+
+import main
+from conftest import drain, site_zip, submission_state
+
+def test_submission_is_extracted_archived_and_published(app, admin, customer, make_order):
+    order_id, order_db_id = make_order(customer)
+    admin.post("/admin/submit-folder", data=dict(order_id=order_id, folder=(site_zip({"index.html": "hi"}), "site.zip")),
+               content_type="multipart/form-data")
+    assert submission_state(admin, order_id) == "queued"
+    drain()
+    assert submission_state(admin, order_id) == "ready"
+    assert customer.get(f"/download-website/{order_id}").status_code == 200
+    with app.app_context():
+        notified = main.db().execute("SELECT COUNT(*) FROM notifications WHERE order_ref=? AND message LIKE '%ready for download%'",
+                                     (order_db_id,)).fetchone()[0]
+    assert notified == 1
+
+def test_download_queued_build_does_not_swallow_publish(app, admin, customer, make_order):
+    # A resubmission: the customer can already download while the new zip waits in the queue
+    order_id, order_db_id = make_order(customer, folder_submitted=1)
+    admin.post("/admin/submit-folder", data=dict(order_id=order_id, folder=(site_zip({"index.html": "v2"}), "site.zip")),
+               content_type="multipart/form-data")
+    assert customer.get(f"/download-website/{order_id}").status_code == 200  # streams, queues a plain build
+    with app.app_context():
+        kinds = main.db().execute("SELECT kind FROM jobs ORDER BY id").fetchall()
+    assert [kind for (kind,) in kinds] == ["extract_submission", "build_archive"]
+    drain()
+    assert submission_state(admin, order_id) == "ready"
+    with app.app_context():
+        con = main.db()
+        notified = con.execute("SELECT COUNT(*) FROM notifications WHERE order_ref=? AND message LIKE '%ready for download%'",
+                               (order_db_id,)).fetchone()[0]
+        pending = con.execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+    assert notified == 1 and pending == 0
+    archive = zipfile.ZipFile(io.BytesIO(customer.get(f"/download-website/{order_id}").data))
+    assert archive.read("index.html") == b"v2"
+
+def test_resubmission_during_a_running_publish_build_is_published(app, admin, customer, make_order, monkeypatch):
+    order_id, order_db_id = make_order(customer)
+    build = main.build_website_archive
+    resubmitted = []
+
+    def build_then_resubmit(build_order_db_id):
+        result = build(build_order_db_id)
+        if not resubmitted:
+            # The first publish build has archived v1 and still holds its claim
+            resubmitted.append(True)
+            admin.post("/admin/submit-folder", data=dict(order_id=order_id, folder=(site_zip({"index.html": "v2"}), "site.zip")),
+                       content_type="multipart/form-data")
+            drain()
+        return result
+
+    monkeypatch.setattr(main, "build_website_archive", build_then_resubmit)
+    admin.post("/admin/submit-folder", data=dict(order_id=order_id, folder=(site_zip({"index.html": "v1"}), "site.zip")),
+               content_type="multipart/form-data")
+    drain()
+    assert submission_state(admin, order_id) == "ready"
+    archive = zipfile.ZipFile(io.BytesIO(customer.get(f"/download-website/{order_id}").data))
+    assert archive.read("index.html") == b"v2"
+    with app.app_context():
+        assert main.db().execute("SELECT COUNT(*) FROM jobs").fetchone()[0] == 0
+
+def test_submission_jobs_of_one_order_run_one_at_a_time(app, admin, customer, make_order):
+    order_id, order_db_id = make_order(customer)
+    other_order_id, _ = make_order(customer)
+    for target in (order_id, order_id, other_order_id):
+        admin.post("/admin/submit-folder", data=dict(order_id=target, folder=(site_zip({"index.html": "hi"}), "site.zip")),
+                   content_type="multipart/form-data")
+    with app.app_context():
+        first = main.claim_job("a")
+        second = main.claim_job("b")
+        assert json.loads(first[2])["order_db_id"] == order_db_id
+        assert json.loads(second[2])["order_db_id"] != order_db_id  # the order's next extraction waits
+        assert main.claim_job("c") is None
+        main.db().execute("UPDATE jobs SET locked_by=NULL, locked_until=NULL")
+        main.db().commit()
+    drain()
+    assert submission_state(admin, order_id) == "ready"
+
+def test_job_that_outlived_its_claim_is_not_acknowledged(app, customer, make_order, caplog):
+    order_id, order_db_id = make_order(customer)
+    with app.app_context():
+        con = main.db()
+        main.enqueue_job(con.cursor(), "notify_submission", {"order_db_id": order_db_id})
+        con.commit()
+        job = main.claim_job("slow")
+        # The visibility timeout passes and another worker claims the job
+        con.execute("UPDATE jobs SET locked_until=0 WHERE id=?", (job[0],))
+        con.commit()
+        assert main.claim_job("fast")[0] == job[0]
+        assert main.run_job(job, "slow") is False
+        assert con.execute("SELECT locked_by FROM jobs WHERE id=?", (job[0],)).fetchone() == ("fast",)
+        notified = con.execute("SELECT COUNT(*) FROM notifications WHERE order_ref=?", (order_db_id,)).fetchone()[0]
+        con.execute("UPDATE jobs SET locked_by=NULL, locked_until=NULL")  # "fast" is only pretend
+        con.commit()
+    assert notified == 0
+    assert "outlived its claim" in caplog.text
+    drain()
@@ -0,0 +1,31 @@
+import uuid
+
+import main
+
+def seed_orders(app, order_db_id, count):
+    """Copies of the order for the same customer, each with an unread notification; returns every order_id"""
+    with app.app_context():
+        con = main.db()
+        for _ in range(count):
+            con.execute("""INSERT INTO orders(order_id, user_id, website_type, stage, status, order_type, website_name, requirements)
+                SELECT ?, user_id, website_type, stage, status, order_type, website_name, requirements FROM orders WHERE id=?""",
+                        (uuid.uuid4().hex[:8].upper(), order_db_id))
+        user_id = con.execute("SELECT user_id FROM orders WHERE id=?", (order_db_id,)).fetchone()[0]
+        con.execute("""INSERT INTO notifications(user_id, message, order_ref)
+            SELECT user_id, 'Order updated', id FROM orders WHERE user_id=?""", (user_id,))
+        con.commit()
+        return [row[0] for row in con.execute("SELECT order_id FROM orders WHERE user_id=?", (user_id,))]
+
+def test_orders_page_statements_do_not_grow_with_orders(app, make_customer, make_order, monkeypatch):
+    monkeypatch.setitem(app.config, 'DB_COUNT_STATEMENTS', True)
+    monkeypatch.setitem(app.config, 'ORDERS_PAGE_SIZE', 100)
+    counts = []
+    for orders in (3, 30):
+        client = make_customer()
+        _, order_db_id = make_order(client)
+        order_ids = seed_orders(app, order_db_id, orders - 1)
+        response = client.get("/orders")
+        assert response.status_code == 200
+        assert len(order_ids) == orders and all(order_id.encode() in response.data for order_id in order_ids)
+        counts.append(int(response.headers["X-DB-Statements"]))
+    assert counts[0] == counts[1]
@@ -0,0 +1,125 @@
+import hashlib, re, sqlite3
+
+import pytest
+
+import main
+from conftest import drain, site_zip
+
+# Statements that read a whole table on purpose: the admin listings and the
+# dashboard totals show every row, and the job tables only ever hold the
+# queue's backlog. Anything else that scans a table fails the test.
+FULL_LISTINGS = [
+    r"SELECT o\.id, o\.order_id, .* FROM orders o JOIN users u ON o\.user_id = u\.id ORDER BY o\.id DESC$",
+    r"SELECT id, fullname, email, whatsapp, role, created FROM users ORDER BY id DESC$",
+    r"SELECT t\.\*, .* FROM templates t LEFT JOIN images i .* ORDER BY t\.id DESC$",
+    r"SELECT COUNT\(\*\)(, .*)? FROM (jobs|dead_jobs)$",
+    r"SELECT id, kind, attempts, last_error, failed FROM dead_jobs ORDER BY failed DESC LIMIT \d+$",
+]
+
+class TracingPool(main.ConnectionPool):
+    """ConnectionPool that records every statement its connections run"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.statements = set()
+
+    def acquire(self):
+        # close_db() clears the callback on release, so set it on every checkout
+        con = super().acquire()
+        con.set_trace_callback(self.statements.add)
+        return con
+
+def drive_routes(pool, admin, customer):
+    """Use the site the way a customer and the admin do, from ordering to download"""
+    for path in ("/", "/dashboard", "/order-template/1", "/custom-web"):
+        customer.get(path)
+    customer.post("/order-template/1", data=dict(website_name="Traced", requirements=""))
+    customer.post("/submit-custom-order", data=dict(website_type="Blog", budget="100", answers="{}"))
+    with sqlite3.connect(pool.path) as con:  # untraced, so the test's own lookup isn't checked
+        order_db_id, order_id = con.execute("SELECT id, order_id FROM orders WHERE website_name='Traced'").fetchone()
+    customer.post(f"/send-message/{order_id}", data=dict(message="Hello"))
+    customer.post(f"/chat/{order_id}/messages", json=dict(message="Over chat"))
+
+    admin.get(f"/admin/update/{order_db_id}")
+    admin.post(f"/admin/update/{order_db_id}", data=dict(stage="Development", status="Granted"))
+    admin.post(f"/admin/send-message/{order_db_id}", data=dict(message="On it"))
+    admin.get("/admin/submit-folder")
+    admin.post("/admin/submit-folder", data=dict(order_id=order_id, folder=(site_zip({"index.html": "v1"}), "site.zip")),
+               content_type="multipart/form-data")
+    drain()
+    customer.get(f"/download-website/{order_id}")
+
+    # A chunked upload, then a delta resubmission
+    data = site_zip({"index.html": "v2", "style.css": "p{}"}).getvalue()
+    upload = admin.post("/admin/uploads", json=dict(order_id=order_id, filename="site.zip", size=len(data),
+                                                    sha256=hashlib.sha256(data).hexdigest())).json
+    admin.put(f"/admin/uploads/{upload['upload_id']}/chunks/0", data=data,
+              headers={"X-Chunk-SHA256": hashlib.sha256(data).hexdigest()})
+    admin.get(f"/admin/uploads/{upload['upload_id']}")
+    admin.post(f"/admin/uploads/{upload['upload_id']}/finalize")
+    drain()
+    page = b"v3"
+    sha256 = hashlib.sha256(page).hexdigest()
+    delta = admin.post("/admin/deltas", json=dict(order_id=order_id, files=[
+        dict(path="index.html", sha256=sha256, size=len(page)),
+        dict(path="style.css", sha256=hashlib.sha256(b"p{}").hexdigest(), size=3)])).json
+    admin.put(f"/admin/deltas/{delta['delta_id']}/blobs/{sha256}", data=page)
+    admin.post(f"/admin/deltas/{delta['delta_id']}/apply")
+    drain()
+
+    for path in ("/admin", "/admin/orders", "/admin/users", "/admin/templates", "/admin/edit-template/1",
+                 f"/admin/view-order-by-id/{order_id}", f"/admin/submission-status/{order_id}",
+                 "/admin/jobs", "/admin/db-stats", "/admin/cache-stats"):
+        admin.get(path)
+    for path in ("/orders", f"/order-details/{order_id}", "/account", "/your-web", "/notifications",
+                 f"/download-website/{order_id}", "/logout"):
+        customer.get(path)
+
+@pytest.fixture(scope="module")
+def route_statements(tmp_path_factory):
+    """Connection to a database built from nothing, and every statement the routes ran against it"""
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        pool = TracingPool(str(tmp_path_factory.mktemp("fresh") / "database.db"), 1, main.STORAGE_PROFILES["wal"])
+        monkeypatch.setattr(main, "pool", pool)
+        with main.app.app_context():
+            main.init_db()
+        pool.statements.clear()
+
+        admin = main.app.test_client()
+        admin.post("/login", data=dict(email=main.ADMIN_EMAIL, password=main.ADMIN_PASS))
+        customer = main.app.test_client()
+        customer.post("/signup", data=dict(fullname="Traced Customer", email="traced@example.com", whatsapp="0",
+                                           gender="Male", dob="2000-01-01", profession="QA", password="p",
+                                           confirm_password="p"))
+        customer.post("/login", data=dict(email="traced@example.com", password="p"))
+        drive_routes(pool, admin, customer)
+
+        statements = sorted(" ".join(sql.split()) for sql in pool.statements
+                            if re.match(r"\s*(SELECT|INSERT|UPDATE|DELETE|WITH)\b", sql, re.I))
+        with sqlite3.connect(pool.path) as con:
+            con.execute("PRAGMA foreign_keys=ON")  # so the plans include the foreign key checks
+            yield con, statements
+
+def test_routes_ran_the_hot_queries(route_statements):
+    con, statements = route_statements
+    for table in ("users", "orders", "notifications", "messages", "jobs", "uploads", "delta_submissions",
+                  "website_manifests", "website_archives", "user_counters"):
+        assert any(re.search(rf"\b{table}\b", sql) for sql in statements), table
+
+def test_route_statements_use_an_index(route_statements):
+    con, statements = route_statements
+    scans = {}
+    for sql in statements:
+        if any(re.match(pattern, sql) for pattern in FULL_LISTINGS):
+            continue
+        plan = [row[-1] for row in con.execute("EXPLAIN QUERY PLAN " + sql)]
+        # A covering index scan reads the index in order and never visits the table
+        full = [step for step in plan if step.startswith("SCAN ") and "INDEX" not in step]
+        if full:
+            scans[sql] = full
+    assert not scans
+
+def test_fresh_database_has_every_migration(route_statements):
+    con, statements = route_statements
+    applied = [row[0] for row in con.execute("SELECT version FROM schema_version ORDER BY version")]
+    assert applied == sorted(version for version, step in main.MIGRATIONS)
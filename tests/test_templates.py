@@ -0,0 +1,59 @@
+import io, os
+
+import pytest
+
+import main
+
+PNG = bytes.fromhex("89504e470d0a1a0a0000000d4948445200000001000000010806000000"
+                    "1f15c4890000000d49444154789c6360000002000154a24f5d0000000049454e44ae426082")
+
+def add_template(app, admin, name, image_name):
+    admin.post("/admin/add-template", data=dict(name=name, description="d", category="c", features="f",
+                                                original_price="10", discount_price="8",
+                                                image=(io.BytesIO(PNG), image_name)),
+               content_type="multipart/form-data")
+    with app.app_context():
+        return main.db().execute("SELECT id FROM templates WHERE name=?", (name,)).fetchone()[0]
+
+def image_state(app, filename):
+    """(file on disk, registered) for an upload"""
+    with app.app_context():
+        registered = main.db().execute("SELECT 1 FROM images WHERE filename=?", (filename,)).fetchone() is not None
+    return os.path.exists(os.path.join(app.config['UPLOAD_FOLDER'], filename)), registered
+
+def test_shared_image_outlives_all_but_the_last_template(app, admin):
+    first = add_template(app, admin, "Shared A", "shared.png")
+    second = add_template(app, admin, "Shared B", "shared.png")
+    assert image_state(app, "shared.png") == (True, True)
+    admin.get(f"/admin/delete-template/{first}")
+    assert image_state(app, "shared.png") == (True, True)
+    admin.get(f"/admin/delete-template/{second}")
+    assert image_state(app, "shared.png") == (False, False)
+
+def test_replacing_a_shared_image_keeps_it_for_the_other_template(app, admin):
+    first = add_template(app, admin, "Edit A", "kept.png")
+    add_template(app, admin, "Edit B", "kept.png")
+    admin.post(f"/admin/edit-template/{first}", data=dict(name="Edit A", description="d", category="c", features="f",
+                                                          original_price="10", discount_price="8",
+                                                          image=(io.BytesIO(PNG), "replacement.png")),
+               content_type="multipart/form-data")
+    assert image_state(app, "replacement.png") == (True, True)
+    assert image_state(app, "kept.png") == (True, True)
+
+def test_small_upload_covers_high_densities_in_both_srcsets():
+    # 600px wide: big enough for the 400px card, too small for the 800px one
+    image = main.ImageInfo("small.jpg", 600, 300, {"card": {"webp": ("a.webp", 400), "jpg": ("a.jpg", 400)}})
+    html = main.picture_html(image, "Small", ["card", "card2x"], "400px")
+    webp, own = html.split('srcset="')[1:]
+    assert "/static/uploads/small.jpg 600w" in webp.split('"')[0]
+    assert "/static/uploads/small.jpg 600w" in own.split('"')[0]
+
+@pytest.mark.skipif(main.Image is None, reason="Pillow is not installed")
+@pytest.mark.parametrize("mode", ["P", "LA", "CMYK", "I;16"])
+def test_variants_are_built_whatever_the_image_mode(app, mode):
+    filename = f"mode-{mode.replace(';', '')}.tiff"  # TIFF keeps every mode and gets PNG variants
+    main.Image.new(mode, (900, 450)).save(os.path.join(app.config['UPLOAD_FOLDER'], filename))
+    with app.app_context():
+        con = main.db()
+        assert main.build_image_variants(con.cursor(), filename) == 2 * len(main.IMAGE_VARIANTS)
+        con.rollback()
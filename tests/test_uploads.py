@@ -0,0 +1,105 @@
+import hashlib, io, os, zipfile
+
+import pytest
+
+import main
+from conftest import drain, submission_state
+
+CHUNK_SIZE = 64 * 1024
+
+@pytest.fixture(autouse=True)
+def small_chunks(app, monkeypatch):
+    monkeypatch.setitem(app.config, 'UPLOAD_CHUNK_SIZE', CHUNK_SIZE)
+
+def site_archive(size):
+    """A zip of about size bytes that barely compresses"""
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_STORED) as zipf:
+        zipf.writestr("index.html", "<h1>chunked</h1>")
+        zipf.writestr("assets/noise.bin", os.urandom(size))
+    return buf.getvalue()
+
+def chunks(data):
+    return [data[offset:offset + CHUNK_SIZE] for offset in range(0, len(data), CHUNK_SIZE)]
+
+def start_upload(admin, order_id, data, sha256=None):
+    response = admin.post("/admin/uploads", json=dict(order_id=order_id, filename="site.zip", size=len(data),
+                                                      sha256=sha256 or hashlib.sha256(data).hexdigest()))
+    assert response.status_code == 201
+    return response.json["upload_id"]
+
+def put_chunk(admin, upload_id, index, data, sha256=None):
+    return admin.put(f"/admin/uploads/{upload_id}/chunks/{index}", data=data,
+                     headers={"X-Chunk-SHA256": sha256 or hashlib.sha256(data).hexdigest()})
+
+def test_bad_checksum_leaves_the_received_chunk_intact(admin, customer, make_order):
+    order_id, order_db_id = make_order(customer)
+    data = site_archive(3 * CHUNK_SIZE)
+    upload_id = start_upload(admin, order_id, data)
+    parts = chunks(data)
+    for index, part in enumerate(parts):
+        assert put_chunk(admin, upload_id, index, part).status_code == 200
+    corrupt = bytes(len(parts[1]))
+    assert put_chunk(admin, upload_id, 1, corrupt, sha256=hashlib.sha256(parts[1]).hexdigest()).status_code == 422
+    assert admin.get(f"/admin/uploads/{upload_id}").json["received"] == list(range(len(parts)))
+    with open(main.staging_path(upload_id), "rb") as f:
+        assert f.read() == data
+    assert admin.post(f"/admin/uploads/{upload_id}/finalize").json["state"] == "queued"
+    drain()
+    assert submission_state(admin, order_id) == "ready"
+
+def test_finalize_publishes_once(app, admin, customer, make_order, monkeypatch):
+    order_id, order_db_id = make_order(customer)
+    data = site_archive(CHUNK_SIZE)
+    upload_id = start_upload(admin, order_id, data)
+    for index, part in enumerate(chunks(data)):
+        put_chunk(admin, upload_id, index, part)
+    with app.app_context():
+        stale = main.get_upload(upload_id)
+        stale_status = main.upload_status(stale)
+    assert admin.post(f"/admin/uploads/{upload_id}/finalize").status_code == 200
+    # A second finalize that read the upload before the first one claimed it
+    monkeypatch.setattr(main, "get_upload", lambda upload_id: stale)
+    monkeypatch.setattr(main, "upload_status", lambda upload: stale_status)
+    response = admin.post(f"/admin/uploads/{upload_id}/finalize")
+    assert response.status_code == 409 and response.json["error"] == "Upload already finalized"
+    with app.app_context():
+        queued = main.db().execute("SELECT COUNT(*) FROM jobs WHERE kind='extract_submission'").fetchone()[0]
+    assert queued == 1
+    drain()
+
+def test_upload_resumes_after_a_missing_chunk(admin, customer, make_order):
+    order_id, order_db_id = make_order(customer)
+    data = site_archive(32 * CHUNK_SIZE)
+    upload_id = start_upload(admin, order_id, data)
+    parts = chunks(data)
+    lost = {3, len(parts) - 1}
+    for index, part in enumerate(parts):
+        if index not in lost:
+            assert put_chunk(admin, upload_id, index, part).status_code == 200
+    response = admin.post(f"/admin/uploads/{upload_id}/finalize")
+    assert response.status_code == 409 and response.json["missing"] == sorted(lost)
+    # What a client does after reconnecting: ask what arrived and send the rest
+    received = set(admin.get(f"/admin/uploads/{upload_id}").json["received"])
+    for index in sorted(set(range(len(parts))) - received):
+        assert put_chunk(admin, upload_id, index, parts[index]).status_code == 200
+    assert admin.post(f"/admin/uploads/{upload_id}/finalize").status_code == 200
+    drain()
+    assert submission_state(admin, order_id) == "ready"
+    archive = zipfile.ZipFile(io.BytesIO(customer.get(f"/download-website/{order_id}").data))
+    assert archive.read("assets/noise.bin") == zipfile.ZipFile(io.BytesIO(data)).read("assets/noise.bin")
+
+def test_finalize_rejects_a_sha256_mismatch(app, admin, customer, make_order):
+    order_id, order_db_id = make_order(customer)
+    data = site_archive(2 * CHUNK_SIZE)
+    upload_id = start_upload(admin, order_id, data, sha256=hashlib.sha256(b"something else").hexdigest())
+    for index, part in enumerate(chunks(data)):
+        put_chunk(admin, upload_id, index, part)
+    response = admin.post(f"/admin/uploads/{upload_id}/finalize")
+    assert response.status_code == 422
+    status = admin.get(f"/admin/uploads/{upload_id}").json
+    assert not status["finalized"] and status["received"] == list(range(status["chunks"]))
+    with app.app_context():
+        queued = main.db().execute("SELECT COUNT(*) FROM jobs WHERE kind='extract_submission'").fetchone()[0]
+    assert queued == 0
+    assert os.path.exists(main.staging_path(upload_id))
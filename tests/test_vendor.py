@@ -0,0 +1,27 @@
+import os, re
+
+import main
+
+def test_build_vendor_fetches_once_and_counts_only_this_build(app, tmp_path, monkeypatch):
+    source = tmp_path / "source"
+    source.mkdir()
+    for name in main.VENDOR_SOURCES:
+        # Not real fonts, so subset_font ships them whole
+        (source / name).write_bytes(b".btn{color:red}" if name.endswith(".css") else name.encode() * 10)
+    vendor = tmp_path / "vendor"
+    vendor.mkdir()
+    (vendor / "fa-solid-900.0123456789ab.woff2").write_bytes(bytes(100000))  # left behind by an earlier build
+    monkeypatch.setattr(main, "VENDOR_FOLDER", str(vendor))
+    fetches = []
+    fetch = main.fetch_vendor_sources
+    monkeypatch.setattr(main, "fetch_vendor_sources", lambda source_dir=None: fetches.append(source_dir) or fetch(source_dir))
+
+    result = app.test_cli_runner().invoke(args=["build-vendor", "--source", str(source)])
+    assert result.exit_code == 0, result.output
+    assert fetches == [str(source)]
+
+    built_names = re.findall(r"^\S+\s+(\S+)$", result.output, re.M)
+    assert "fa-solid-900.woff2" in result.output and "poppins-400.woff2" in result.output
+    upstream, built = map(int, re.search(r"(\d+) bytes upstream -> (\d+) bytes", result.output).groups())
+    assert upstream == sum(os.path.getsize(source / name) for name in main.VENDOR_SOURCES)
+    assert built == sum(os.path.getsize(vendor / name) for name in built_names)